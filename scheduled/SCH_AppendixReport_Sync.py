@@ -1,6 +1,5 @@
 import os
 import sys
-import shutil
 import datetime 
 import logging
 from pathlib import Path
@@ -9,7 +8,7 @@ from arcgis.gis import GIS
 
 sys.path.insert(0,str(Path(__file__).resolve().parents[1]))
 
-from src.functions import email
+from src.functions import email, transfer
 from src.constants.paths import  LOG_DIR, INTRANET_APPENDIX_H_DIR, SHAREPOINT_LOCAL_DIR, SHAREPOINT_APPENDIX_H_LOCAL_DIR
 #######################################################################################################################
 ## Globals
@@ -69,14 +68,12 @@ def main():
                 dst = os.path.join(SHAREPOINT_APPENDIX_H_LOCAL_DIR, wb)
                 logger.info(f"Destination: {dst}")
 
+                ## Copied in chunks to a temporary name, resumed if a previous run was interrupted and checked against the source SHA-256.
                 try:
-                    shutil.copy(src, dst)
-                    if os.path.exists(dst):
-                        logger.info(f"Copy Successful")
-                    else:
-                        logger.warning(f"Copy Failed")
+                    transfer.copyFile(src, dst)
+                    logger.info(f"Copy Successful")
                 except Exception as e:
-                    logger.error("Cannot Copy!!")
+                    logger.error(f"Cannot Copy!! {e}")
 
         
         email_message="""
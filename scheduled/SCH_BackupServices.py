@@ -23,6 +23,8 @@ backup_dir = INTRANET_BACKUP_DIR
 agol_folder_names = ["Measures", "Alternatives"]
 include_exclude_list = ["SAFER Mitigation Measures (HDR 2025)", "Alternative Extents", "Alternative"]#, "Data", "Exisitng Infrastructure", "Future Projects", "H&H", "Half Layers (2025-04-29)", "Hazardous, Toxic, Radioactive Waste (HTRW)", "Measures", "Real Estate"]  ## list of the category specific Geodatabase names that should be evaluated. If left blank all fgdbs will be evaluated
 include_exclude = "Include"
+delta = True ## Change tracking layers only pull the edits made since the last run
+store_dir = None ## Set to INTRANET_BACKUP_STORE_DIR to chunk the backups into the deduplicated store instead of zipping and copying them to backup_dir
 #######################################################################################################################
 ## Logging
 
@@ -83,7 +85,9 @@ if __name__ == "__main__":
                                                             backup_dir=backup_dir,
                                                             include_exclude_flag=include_exclude,
                                                             scheduled=scheduled,
-                                                            include_exclude_list=include_exclude_list
+                                                            include_exclude_list=include_exclude_list,
+                                                            delta=delta,
+                                                            store_dir=store_dir
                                                             )
     
 
@@ -92,7 +96,7 @@ if __name__ == "__main__":
     ## If the email from parameter is entered, there will be an attempt to send an email with the excel report and log file.
     if email_from:
         logger.info("Sending Email...")
-        result = email.sendEmail(sendTo=email_to, sendFrom=email_from, subject=email_subject, message_text=email_message+"Backup Directory: {}".format(backup_dir), text_type=email_text_type, attachments=attachements_list)
+        result = email.sendEmail(sendTo=email_to, sendFrom=email_from, subject=email_subject, message_text=email_message+("Backup Store: {}".format(store_dir) if store_dir else "Backup Directory: {}".format(backup_dir)), text_type=email_text_type, attachments=attachements_list)
         logger.info(result)
     
 
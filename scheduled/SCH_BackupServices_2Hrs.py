@@ -23,6 +23,7 @@ backup_dir = INTRANET_BACKUP_DIR
 agol_folder_names = ["Alternatives"]
 include_exclude_list = ["Alternative Extents", "Alternative"]#, "Data", "Exisitng Infrastructure", "Future Projects", "H&H", "Half Layers (2025-04-29)", "Hazardous, Toxic, Radioactive Waste (HTRW)", "Measures", "Real Estate"]  ## list of the category specific Geodatabase names that should be evaluated. If left blank all fgdbs will be evaluated
 include_exclude = "Include"
+incremental = True ## Only layers edited since the last successful backup are exported
 #######################################################################################################################
 ## Logging
 
@@ -83,7 +84,8 @@ if __name__ == "__main__":
                                                             backup_dir=backup_dir,
                                                             include_exclude_flag=include_exclude,
                                                             scheduled=scheduled,
-                                                            include_exclude_list=include_exclude_list
+                                                            include_exclude_list=include_exclude_list,
+                                                            incremental=incremental
                                                             )
     
 
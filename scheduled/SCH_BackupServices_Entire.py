@@ -13,7 +13,7 @@ sys.path.insert(0,str(Path(__file__).resolve().parents[1]))
 from src.functions import utility, email
 from src.tools.backupmanagement import TOOL_BackupServices
 from src.constants.paths import  PORTAL_URL, INTRANET_BACKUP_DIR, LOG_DIR
-from src.constants.values import PROJECT_SPATIAL_REFERENCE
+from src.constants.values import PROJECT_SPATIAL_REFERENCE, BACKUP_WORKERS
 #######################################################################################################################
 DATETIME_STR = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
 LOG_FILE = os.path.join(LOG_DIR, "Scheduled", "BackupServices_Entire", f"BackupServices_{DATETIME_STR}_Scheduled.log")
@@ -23,6 +23,7 @@ backup_dir = None#INTRANET_BACKUP_DIR
 folder_avoid_list = []
 include_exclude_list = []#, "Data", "Exisitng Infrastructure", "Future Projects", "H&H", "Half Layers (2025-04-29)", "Hazardous, Toxic, Radioactive Waste (HTRW)", "Measures", "Real Estate"]  ## list of the category specific Geodatabase names that should be evaluated. If left blank all fgdbs will be evaluated
 include_exclude = "All"
+workers = BACKUP_WORKERS ## Number of processes exporting layers at the same time. 1 exports serially.
 #######################################################################################################################
 ## Logging
 
@@ -81,7 +82,8 @@ if __name__ == "__main__":
                                                             backup_dir=backup_dir,
                                                             include_exclude_flag=include_exclude,
                                                             scheduled=scheduled,
-                                                            include_exclude_list=include_exclude_list
+                                                            include_exclude_list=include_exclude_list,
+                                                            workers=workers
                                                             )
     
 
@@ -1,6 +1,5 @@
 import os
 import sys
-import shutil
 import datetime 
 import logging
 from pathlib import Path
@@ -9,7 +8,7 @@ from importlib import reload
 
 sys.path.insert(0,str(Path(__file__).resolve().parents[1]))
 
-from src.functions import utility
+from src.functions import utility, transfer
 from src.constants.paths import  LOG_DIR, INTRANET_LOG_DIR
 #######################################################################################################################
 ## Globals
@@ -82,14 +81,12 @@ def main():
                     dst = os.path.join(intranet_folder_path, log_file)
                     logger.info(f"Destination: {dst}")
 
+                    ## Copied in chunks to a temporary name, resumed if a previous run was interrupted and checked against the source SHA-256.
                     try:
-                        shutil.copy(src, dst)
-                        if os.path.exists(dst):
-                            logger.info(f"Copy Successful")
-                        else:
-                            logger.warning(f"Copy Failed")
+                        transfer.copyFile(src, dst)
+                        logger.info(f"Copy Successful")
                     except Exception as e:
-                        logger.error("Cannot Copy!!")
+                        logger.error(f"Cannot Copy!! {e}")
 
         
         email_message="""
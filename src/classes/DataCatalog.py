@@ -1,31 +1,270 @@
 import arcpy
 import os
+import sys
+import pickle
+import hashlib
+import logging
 import requests
+import pandas as pd
 from arcpy import metadata as md
 from pandas import DataFrame
-
-def getCatalogRows(catalog_df:DataFrame, web_app_categories:list=None,include_exclude:str="Include"):
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.classes.gdbinventory import getGdbInventory
+from src.classes.portalitems import getItemCache
+from src.constants.paths import CATALOG_CACHE_DIR
+from src.constants.values import SHEET_NAME, CATALOG_DTYPES
+from src.functions.lint import lintCatalog, hasSpecialCharacters, AGOL_ITEM_ID_RE
+#################################################################################################################################################################################
+logger = logging.getLogger("root.datacatalog")
+#################################################################################################################################################################################
+## Catalogs already loaded in this process, keyed by cache file. Used by the toolbox parameter validation which loads the catalog repeatedly.
+_LOADED_CATALOGS = {}
+#################################################################################################################################################################################
+
+def _fileHash(file_path)->str:
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024*1024), b""):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+
+def _catalogStamp(catalog_path, previous_stamp:dict=None)->dict:
+    """
+    Purpose: Returns the size, mtime and SHA-256 of the workbook. The hash is reused from the previous stamp when the size and mtime haven't changed.
+    """
+    stat = os.stat(catalog_path)
+    stamp = {"size":stat.st_size, "mtime":stat.st_mtime_ns}
+    if previous_stamp and previous_stamp["size"] == stamp["size"] and previous_stamp["mtime"] == stamp["mtime"]:
+        stamp["sha256"] = previous_stamp["sha256"]
+    else:
+        stamp["sha256"] = _fileHash(catalog_path)
+
+    return stamp
+
+
+def loadCatalog(catalog_path, sheet_name:str=SHEET_NAME, dtypes:dict=CATALOG_DTYPES)->DataFrame:
+    """
+    Loads the columns used by the tools from the Data Catalog workbook.
+    The parsed DataFrame is cached next to the outputs (CatalogCache) and reused until the workbook's size, mtime or content hash changes.
+    Args: Data Catalog Path (Excel), Sheet Name, Dictionary of Column Name to dtype
+    Returns: Pandas DataFrame
+    """
+    catalog_path = os.path.abspath(str(catalog_path).replace("'", ""))
+    cache_key = hashlib.sha1(f"{os.path.normcase(catalog_path)}|{sheet_name}|{sorted(dtypes.items())}".encode("utf-8")).hexdigest()
+    cache_file = os.path.join(CATALOG_CACHE_DIR, f"{Path(catalog_path).stem}_{cache_key[:12]}.pkl")
+
+    cached = _LOADED_CATALOGS.get(cache_file)
+    if cached is None and os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                cached = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"!! Failed to read Data Catalog cache...{e}")
+            cached = None
+
+    stamp = _catalogStamp(catalog_path, cached["stamp"] if cached else None)
+    if cached and cached["stamp"]["sha256"] == stamp["sha256"]:
+        logger.debug(f"Data Catalog loaded from cache: {cache_file}")
+        if cached["stamp"] != stamp:
+            cached["stamp"] = stamp
+            _writeCatalogCache(cache_file, cached)
+        _LOADED_CATALOGS[cache_file] = cached
+        return cached["df"].copy()
+
+    logger.info(f"Reading Data Catalog: {catalog_path} [{sheet_name}]")
+    catalog_df = pd.read_excel(io=catalog_path,
+                               sheet_name=sheet_name,
+                               header=0,
+                               usecols=lambda c: c in dtypes,
+                               dtype={c:("object" if d == "category" else d) for c, d in dtypes.items()})
+    for column, dtype in dtypes.items():
+        if dtype == "category" and column in catalog_df.columns:
+            catalog_df[column] = catalog_df[column].astype("category")
+
+    cached = {"stamp":stamp, "df":catalog_df}
+    _writeCatalogCache(cache_file, cached)
+    _LOADED_CATALOGS[cache_file] = cached
+
+    return catalog_df.copy()
+
+
+def _writeCatalogCache(cache_file:str, cached:dict)->None:
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        temp_file = f"{cache_file}.tmp"
+        with open(temp_file, "wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except Exception as e:
+        logger.warning(f"!! Failed to write Data Catalog cache...{e}")
+
+    return
+
+
+class CatalogRowView(tuple):
+    """
+    Lightweight, read-only view of a Data Catalog row. Values are looked up by column name (row["Table Name"]) like a pandas Series,
+    without allocating a Series for every row.
+    """
+    __slots__ = ()
+    _positions = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._positions[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        position = self._positions.get(key)
+        return default if position is None else tuple.__getitem__(self, position)
+
+    def keys(self)->list:
+        return list(self._positions.keys())
+
+    def toDictionary(self)->dict:
+        return dict(zip(self._positions.keys(), self))
+
+
+def _catalogRowViewType(columns)->type:
+    return type("CatalogRowView", (CatalogRowView,), {"__slots__":(), "_positions":{c:i for i, c in enumerate(columns)}})
+
+
+def normaliseCategories(categories):
+    """
+    Purpose: Strips the spaces and ampersands from the 'Initial Screening Criteria' values so they match the Feature Dataset names.
+    """
+    return categories.astype("object").str.replace(" ", "", regex=False).str.replace("&", "", regex=False)
+
+
+def filterCatalog(catalog_df:DataFrame, web_app_categories:list=None,include_exclude:str="Include")->DataFrame:
+    """
+    Purpose: Returns the Data Catalog rows that are included (or not excluded) by the Web App Categories.
+    """
     if web_app_categories:
+        category_mask = normaliseCategories(catalog_df["Initial Screening Criteria"]).isin(web_app_categories)
         if include_exclude == "Exclude":
-            return [r for r in catalog_df.iterrows() if r[1]["Initial Screening Criteria"].replace(' ','').replace('&','') not in web_app_categories]
-        elif include_exclude == "Include":
-            return [r for r in catalog_df.iterrows() if r[1]["Initial Screening Criteria"].replace(' ','').replace('&','') in web_app_categories]
+            category_mask = ~category_mask
+        catalog_df = catalog_df.loc[category_mask.to_numpy()]
+
+    return catalog_df
+
+
+def getCatalogRows(catalog_df:DataFrame, web_app_categories:list=None,include_exclude:str="Include"):
+    """
+    Filters the Data Catalog on the Web App Categories and yields (index, CatalogRowView) pairs.
+    Args: Data Catalog DataFrame, Feature Dataset names to filter on, 'Include' or 'Exclude'
+    Returns: Generator of (DataFrame Index, CatalogRowView)
+    """
+    catalog_df = filterCatalog(catalog_df, web_app_categories, include_exclude)
+
+    row_view = _catalogRowViewType(catalog_df.columns)
+
+    return ((index, row_view(values)) for index, values in zip(catalog_df.index, catalog_df.itertuples(index=False, name=None)))
+
+
+def resolveCatalogItems(catalog_df:DataFrame, gis_conn)->dict:
+    """
+    Purpose: Retrieves every AGOL Item listed in the Data Catalog with batched searches and stores them in the shared item cache.
+    """
+    item_ids = [i for i in catalog_df["AGOL Item ID"].dropna().unique() if isinstance(i, str)]
+
+    return getItemCache(gis_conn).resolve(item_ids)
+
+
+def validateCatalog(catalog_df:DataFrame, gdb_path, gis_conn)->list:
+    """
+    Validates every row of the Data Catalog in one pass, before any row is processed.
+    The lint rules run over whole columns (see functions/lint.py). The existence checks run as set lookups against the GDB inventory
+    and the shared item cache, so only well formed AGOL Item IDs are looked up.
+    Args: Data Catalog DataFrame, File GDB Path, GIS Connection
+    Returns: List of dictionaries describing each problem. Severity is 'Error' or 'Warning'.
+    """
+    problems = []
+
+    if not gdb_path or not os.path.exists(str(gdb_path)):
+        problems.append({"Excel Index":None, "Table Name":None, "Column":"File GDB Path", "Severity":"Error", "Problem":f"File GDB Path: {gdb_path} does not exist."})
+        return problems
+
+    lint_df = lintCatalog(catalog_df)
+    problems.extend(lint_df[["Excel Index", "Table Name", "Column", "Severity", "Problem"]].to_dict("records"))
+
+    excel_index = catalog_df.index.to_series(index=catalog_df.index) + 2
+    table_names = catalog_df["Table Name"]
+    item_ids = catalog_df["AGOL Item ID"].where(catalog_df["AGOL Item ID"].map(lambda i: isinstance(i, str) and bool(AGOL_ITEM_ID_RE.match(i))))
+
+    resolved = getItemCache(gis_conn).resolve(list(item_ids.dropna().unique()))
+    invalid_ids = item_ids.notna() & item_ids.map(lambda i: i in resolved and not resolved[i])
+    unchecked_ids = item_ids.notna() & ~item_ids.map(lambda i: i in resolved)
+
+    inventory = getGdbInventory(gdb_path)
+    missing_local = ~table_names.map(lambda t: t in inventory if isinstance(t, str) else False)
+
+    ## An ID whose lookup failed (e.g. a timeout) is only a warning. It is looked up again on the next run rather than reported as invalid.
+    for mask, column, severity, problem in [(invalid_ids, "AGOL Item ID", "Error", "'AGOL Item ID' is invalid."),
+                                            (unchecked_ids, "AGOL Item ID", "Warning", "'AGOL Item ID' could not be checked. The portal lookup failed."),
+                                            (missing_local, "Table Name", "Error", "'Table Name' Does Not Exist.")]:
+        for index in catalog_df.index[mask.to_numpy()]:
+            problems.append({"Excel Index":int(excel_index[index]),
+                             "Table Name":table_names[index],
+                             "Column":column,
+                             "Severity":severity,
+                             "Problem":f"The input at index: {int(excel_index[index])} {problem}"})
+
+    return sorted(problems, key=lambda p: p["Excel Index"])
+
+
+def checkCatalog(catalog_df:DataFrame, gdb_path, gis_conn)->list:
+    """
+    Purpose: Runs validateCatalog and raises a single ValueError listing every error, so a run fails before any processing instead of part way through.
+    Warnings are logged and returned.
+    """
+    problems = validateCatalog(catalog_df, gdb_path, gis_conn)
+    errors = [p for p in problems if p["Severity"] == "Error"]
+
+    for problem in problems:
+        if problem["Severity"] == "Error":
+            logger.error(problem["Problem"])
+            arcpy.AddError(problem["Problem"])
         else:
-            return [r for r in catalog_df.iterrows() if r[1]["Initial Screening Criteria"].replace(' ','').replace('&','') in web_app_categories]
+            logger.warning(problem["Problem"])
+            arcpy.AddWarning(problem["Problem"])
 
-    else:
-        return catalog_df.iterrows()
+    if errors:
+        raise ValueError(f"The Data Catalog has {len(errors)} error(s):\n" + "\n".join([p["Problem"] for p in errors]))
+
+    return problems
 
 
+class MetadataSnapshot():
+    """
+    Read-only copy of the metadata items used by the catalog tools. All items are read from a single arcpy Metadata object.
+    """
+    __slots__ = ("title", "summary", "description", "credits", "accessConstraints", "tags")
+
+    def __init__(self, item_path):
+        md_ = md.Metadata(item_path)
+        for md_item in self.__slots__:
+            setattr(self, md_item, getattr(md_, md_item))
+
+    def toDictionary(self)->dict:
+        return {md_item:getattr(self, md_item) for md_item in self.__slots__}
 
 
 class DataCatalogRow():
-    def __init__(self, c_row, index, gdb_path, gis_conn):
+    def __init__(self, c_row, index, gdb_path, gis_conn, validate:bool=True):
         self._excel_index = index + 2 
         self._gis_conn = gis_conn
         self._gdb_path = gdb_path
         self._c_row = c_row
-        self._validateRow(c_row, self.excel_index, gdb_path=gdb_path, gis_conn=gis_conn)
+        self._md_snapshot = None
+        ## Rows from a catalog that has already been through validateCatalog don't need to be validated again.
+        if validate:
+            self._validateRow(c_row, self.excel_index, gdb_path=gdb_path, gis_conn=gis_conn)
 
     ################ Getter/Setters ################
     ## Getter Excel Index
@@ -112,7 +351,10 @@ class DataCatalogRow():
         if not os.path.exists(kwargs["gdb_path"]):
             raise ValueError(f"File GDB Path: {kwargs['gdb_path']} does not exist.")
         
-        if self.agol_item_id and not self.gis_conn.content.get(self.agol_item_id):
+        item_cache = getItemCache(self.gis_conn)
+        if self.agol_item_id and not item_cache.get(self.agol_item_id):
+            if self.agol_item_id not in item_cache:
+                raise ValueError(f"The input at index: {index} 'AGOL Item ID' could not be checked. The portal lookup failed.")
             raise ValueError(f"The input at index: {index} 'AGOL Item ID' is invalid.")
         
         if self._checkSpecialChar(row["Table Name"]):
@@ -125,28 +367,18 @@ class DataCatalogRow():
         
     @staticmethod
     def _getLocalExist(gdb_path, table_name):
-        arcpy.env.workspace = gdb_path
         if not gdb_path:
             return False
 
-
-        item_list = []
-        datasets = [d for d in arcpy.ListDatasets(feature_type="Feature")]
-        datasets.append(None)
-        [item_list.append(os.path.join(gdb_path, featureclass)) for dataset in datasets for featureclass in arcpy.ListFeatureClasses(feature_dataset=dataset)]
-        [item_list.append(os.path.join(gdb_path, raster)) for raster in arcpy.ListRasters()]
-
-        if os.path.join(gdb_path, table_name) in item_list:
-            return True
-        else:
-            return False
+        ## The inventory is built once per File GDB and only rebuilt when the GDB changes on disk.
+        return getGdbInventory(gdb_path).exists(table_name)
 
     @staticmethod
     def _getServiceExist(gis_conn, item_id):
         if type(item_id) == float or not item_id:
             return False
 
-        result = gis_conn.content.get(item_id)
+        result = getItemCache(gis_conn).get(item_id)
         
         if result:
             return True
@@ -162,7 +394,7 @@ class DataCatalogRow():
         if not item_id:
             return None
         else:
-            result = self._gis_conn.content.get(item_id)
+            result = getItemCache(self._gis_conn).get(item_id)
             if result:
                 return result
             else:
@@ -170,10 +402,18 @@ class DataCatalogRow():
     
 
     ### Metadata Methods ###
+    @property
+    def md_snapshot(self)->MetadataSnapshot:
+        ## The local metadata is only opened once per row. Anything that saves the item's metadata needs to call invalidateMetadata.
+        if self._md_snapshot is None:
+            self._md_snapshot = MetadataSnapshot(self.gdb_item_path)
+        return self._md_snapshot
+
+    def invalidateMetadata(self)->None:
+        self._md_snapshot = None
+
     def _getGdbItemMetadata(self, category):
-        md_ = md.Metadata(self.gdb_item_path)
-        
-        return getattr(md_, category)
+        return getattr(self.md_snapshot, category)
 
 
     def createServiceMetadataDictionary(self):
@@ -189,17 +429,18 @@ class DataCatalogRow():
     
 
     def formatTags_list(self):
-        if type(self.md_tags) == str:
-            tags = self.md_tags.split(",")
+        md_tags = self.md_tags
+        if type(md_tags) == str:
+            tags = md_tags.split(",")
 
-        elif type(self.md_tags) == float or self.md_tags is None:
+        elif type(md_tags) == float or md_tags is None:
             tags = []
 
-        elif type(self.md_tags) == list:
-            tags_cleaned = [t.strip() for t in self.md_tags]
+        elif type(md_tags) == list:
+            tags_cleaned = [t.strip() for t in md_tags]
             tags_sorted =  sorted(tags_cleaned)
             tags = ",".join(tags_sorted)
-            tags = ",".join(self.md_tags)
+            tags = ",".join(md_tags)
 
         formatted_tags = [t.strip() for t in tags]
         
@@ -207,17 +448,18 @@ class DataCatalogRow():
     
 
     def formatTags_str(self):
-        if type(self.md_tags) == list:
-            tags_cleaned = [t.strip() for t in self.md_tags]
+        md_tags = self.md_tags
+        if type(md_tags) == list:
+            tags_cleaned = [t.strip() for t in md_tags]
             tags_sorted =  sorted(tags_cleaned)
             tags = ",".join(tags_sorted)
-            #tags = ",".join(self.md_tags)
+            #tags = ",".join(md_tags)
 
-        elif type(self.md_tags) == float or self.md_tags is None:
+        elif type(md_tags) == float or md_tags is None:
             tags = None
 
-        elif type(self.md_tags) == str:
-            tags_list = self.md_tags.split(",")
+        elif type(md_tags) == str:
+            tags_list = md_tags.split(",")
             tags_cleaned = [t.strip() for t in tags_list]
             tags_sorted =  sorted(tags_cleaned)
             tags = ",".join(tags_sorted)
@@ -253,14 +495,5 @@ class DataCatalogRow():
         """
         Purpose: Checks for Special characters from a string. 
         """
-        string = str(string)
-        count = 0
-        scs = ':<>–/\" |?*\'%);(^#@!&-'
-        for char in string:
-            if char in scs:
-                count+=1
-        if count > 0:
-            return True
-        else:
-            return False
+        return hasSpecialCharacters(string)
         
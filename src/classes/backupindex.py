@@ -0,0 +1,272 @@
+import os
+import re
+import sys
+import json
+import zlib
+import struct
+import logging
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+#################################################################################################################################################################################
+logger = logging.getLogger("root.backupindex")
+#################################################################################################################################################################################
+## Name of the index member written at the end of every Backup Services archive.
+INDEX_NAME = "backup_index.json"
+INDEX_VERSION = 1
+
+## File GDB field types that can appear in the system catalog (GDB_SystemCatalog, a00000001.gdbtable).
+_OBJECTID = 6
+_STRING = 4
+_FIXED_WIDTH = {0:"<h", 1:"<i", 2:"<f", 3:"<d", 5:"<d", 13:"<q"}
+_TABLE_FILE = re.compile(r"^a([0-9a-fA-F]{8})\.")
+## Attachments are stored in '<Feature Class>__ATTACH'. The relationship class itself is a GDB_Items row, so it comes back with the system tables.
+_ATTACH_SUFFIX = "__attach"
+_READ_SIZE = 1024 * 1024
+#################################################################################################################################################################################
+
+def _varUInt(data:bytes, pos:int)->tuple:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _catalogFields(data:bytes)->list:
+    ## Field descriptions start at the offset stored in the table header: size, version, flags, field count, then each field.
+    pos = struct.unpack_from("<q", data, 32)[0] + 12
+    field_count = struct.unpack_from("<h", data, pos)[0]
+    pos += 2
+
+    fields = []
+    for _ in range(field_count):
+        name = data[pos+1:pos+1+2*data[pos]].decode("utf-16-le")
+        pos += 1 + 2*data[pos]
+        pos += 1 + 2*data[pos] ## Alias
+        field_type = data[pos]
+        pos += 1
+
+        if field_type == _OBJECTID:
+            flag = data[pos+1]
+            pos += 2
+        elif field_type == _STRING:
+            flag = data[pos+4]
+            default_length, pos = _varUInt(data, pos+5)
+            pos += default_length
+        elif field_type in _FIXED_WIDTH:
+            flag = data[pos+1]
+            pos += 3 + data[pos+2]
+        else:
+            raise ValueError(f"Unsupported System Catalog Field Type: {field_type}")
+
+        fields.append((name, field_type, bool(flag & 1)))
+
+    return fields
+
+
+def _rowOffsets(tablx:bytes)->list:
+    ## The .gdbtablx file holds the offset of every row in 1024 row blocks. A bitmap after the offsets lists the blocks present when rows are sparse.
+    block_count, row_count, offset_size = struct.unpack_from("<iii", tablx, 4)
+    trailer = 16 + block_count * 1024 * offset_size
+    bitmap_words = struct.unpack_from("<i", tablx, trailer)[0] if len(tablx) >= trailer + 4 else 0
+
+    if bitmap_words:
+        bits = struct.unpack_from(f"<{bitmap_words}I", tablx, trailer + 16)
+        blocks = [b for b in range(bitmap_words * 32) if bits[b // 32] & (1 << (b % 32))][:block_count]
+    else:
+        blocks = list(range(block_count))
+
+    offsets = []
+    for slot, block in enumerate(blocks):
+        for row in range(1024):
+            position = 16 + (slot * 1024 + row) * offset_size
+            offset = int.from_bytes(tablx[position:position+offset_size], "little")
+            if offset:
+                offsets.append((block * 1024 + row + 1, offset))
+
+    return offsets
+
+
+def readSystemCatalog(gdb_path:str)->dict:
+    """
+    Reads the table names and table IDs from a File GDB's system catalog. Table n is stored in the files 'a<n as 8 hex digits>.*'.
+    Only the 10.x File GDB format is read.
+    Args: File GDB Path
+    Returns: Dictionary of casefolded Table Name: Table ID
+    """
+    with open(os.path.join(gdb_path, "a00000001.gdbtable"), "rb") as f:
+        data = f.read()
+    with open(os.path.join(gdb_path, "a00000001.gdbtablx"), "rb") as f:
+        tablx = f.read()
+
+    if struct.unpack_from("<i", data, 0)[0] != 3:
+        raise ValueError(f"Unsupported File GDB Version: {gdb_path}")
+
+    fields = _catalogFields(data)
+    nullable_count = len([f for f in fields if f[1] != _OBJECTID and f[2]])
+
+    catalog = {}
+    for table_id, offset in _rowOffsets(tablx):
+        size = struct.unpack_from("<i", data, offset)[0]
+        if size <= 0:
+            continue
+
+        pos = offset + 4
+        null_flags = data[pos:pos + (nullable_count + 7) // 8]
+        pos += len(null_flags)
+        row = {}
+        nullable_index = 0
+        for name, field_type, nullable in fields:
+            if field_type == _OBJECTID:
+                continue
+            if nullable:
+                is_null = null_flags[nullable_index // 8] & (1 << (nullable_index % 8))
+                nullable_index += 1
+                if is_null:
+                    row[name] = None
+                    continue
+            if field_type == _STRING:
+                length, pos = _varUInt(data, pos)
+                row[name] = data[pos:pos+length].decode("utf-8")
+                pos += length
+            else:
+                row[name] = struct.unpack_from(_FIXED_WIDTH[field_type], data, pos)[0]
+                pos += struct.calcsize(_FIXED_WIDTH[field_type])
+
+        if row.get("Name"):
+            catalog[row["Name"].casefold()] = table_id
+
+    return catalog
+
+
+def _fileEntry(entry:dict)->dict:
+    return {k:entry[k] for k in ["arcname", "method", "data_offset", "compressed_size", "size", "crc"]}
+
+
+def buildIndex(entries:list, gdb_name:str, catalog:dict, layers:list)->dict:
+    """
+    Builds the archive index: AGOL Folder -> Layer -> Feature Class -> the byte ranges of that Feature Class's files in the archive.
+    The File GDB system tables ('GDB_*') and the non-table files are listed separately since every restore needs them.
+    A layer's attachment table and the tables in its 'Related Tables' (relationship classes) are indexed with the layer. Related tables
+    missing from the catalog are listed under 'Missing Tables'.
+    Args: Written archive entries (archive.writeArchive), File GDB name in the archive, System Catalog (readSystemCatalog), List of layer dictionaries from the backup
+    Returns: Index Dictionary
+    """
+    gdb_entries = {}
+    system = []
+    for entry in entries:
+        parts = entry["arcname"].split("/")
+        if parts[0] != gdb_name or len(parts) != 2:
+            continue
+        table_file = _TABLE_FILE.match(parts[1])
+        if not table_file:
+            system.append(_fileEntry(entry))
+            continue
+        gdb_entries.setdefault(int(table_file.group(1), 16), []).append(_fileEntry(entry))
+
+    system_ids = {table_id for name, table_id in catalog.items() if name.startswith("gdb_")}
+    for table_id in sorted(system_ids):
+        system.extend(gdb_entries.get(table_id, []))
+
+    folders = {}
+    for layer in layers:
+        table_id = catalog.get(str(layer["Feature Class Name"]).casefold())
+        dataset = os.path.dirname(str(layer.get("Feature Class Path") or ""))
+
+        related = [t for t in layer.get("Related Tables") or [] if t.casefold() != str(layer["Feature Class Name"]).casefold()]
+        attach_name = f"{layer['Feature Class Name']}{_ATTACH_SUFFIX}".casefold()
+        if attach_name in catalog and attach_name not in [t.casefold() for t in related]:
+            related.append(f"{layer['Feature Class Name']}__ATTACH")
+        related_ids = {t:catalog.get(t.casefold()) for t in related}
+
+        files = list(gdb_entries.get(table_id, []))
+        for related_id in dict.fromkeys(i for i in related_ids.values() if i is not None and i != table_id):
+            files.extend(gdb_entries.get(related_id, []))
+
+        folders.setdefault(layer.get("Folder Name") or "", {})[layer["Layer Name"]] = {"Feature Class":layer["Feature Class Name"],
+                                                                                       "Feature Dataset":None if dataset.lower().endswith(".gdb") else os.path.basename(dataset) or None,
+                                                                                       "Layer URL":layer.get("Layer URL"),
+                                                                                       "Service Item Id":layer.get("Service Item Id"),
+                                                                                       "Table ID":table_id,
+                                                                                       "Related Tables":[t for t, i in related_ids.items() if i is not None],
+                                                                                       "Missing Tables":[t for t, i in related_ids.items() if i is None],
+                                                                                       "Files":files}
+
+    return {"version":INDEX_VERSION, "gdb":gdb_name, "system":system, "folders":folders}
+
+
+def readIndex(archive_path:str)->dict:
+    """
+    Purpose: Reads the index from the archive. Only the central directory and the index member are read.
+    """
+    with zipfile.ZipFile(archive_path) as z:
+        return json.loads(z.read(INDEX_NAME))
+
+
+def findLayer(index:dict, layer_name:str, folder_name:str=None)->dict:
+    matches = [layer for folder, layers in index["folders"].items() if folder_name in [None, folder]
+               for name, layer in layers.items() if layer_name in [name, layer["Feature Class"]]]
+    if not matches:
+        raise KeyError(f"Layer Not In Backup: {layer_name}")
+    if len(matches) > 1:
+        raise KeyError(f"Layer Name Is In More Than One Folder. Pass the Folder Name: {layer_name}")
+
+    return matches[0]
+
+
+def _extractEntry(archive, entry:dict, out_path:str)->None:
+    ## Reads exactly the member's byte range and inflates it on the fly. The CRC is checked against the index.
+    archive.seek(entry["data_offset"])
+    remaining = entry["compressed_size"]
+    decompressor = zlib.decompressobj(-15) if entry["method"] == 8 else None
+    crc = 0
+    with open(out_path, "wb") as out:
+        while remaining:
+            data = archive.read(min(_READ_SIZE, remaining))
+            if not data:
+                raise EOFError(f"Archive Ended Before {entry['arcname']}")
+            remaining -= len(data)
+            if decompressor:
+                data = decompressor.decompress(data)
+            crc = zlib.crc32(data, crc)
+            out.write(data)
+        if decompressor:
+            data = decompressor.flush()
+            crc = zlib.crc32(data, crc)
+            out.write(data)
+
+    if crc != entry["crc"]:
+        raise ValueError(f"CRC Check Failed: {entry['arcname']}")
+
+    return
+
+
+def restoreLayer(archive_path:str, out_dir:str, layer_name:str, folder_name:str=None, index:dict=None)->str:
+    """
+    Extracts one layer's Feature Class (and the File GDB system tables) from a backup archive without reading the rest of it.
+    The restored File GDB only holds that Feature Class's tables, its attachment table and its related tables.
+    Args: Archive Path, Output Directory, Layer Name (or Feature Class Name), AGOL Folder Name if the layer name isn't unique, Index (read from the archive if not given)
+    Returns: Restored File GDB Path
+    """
+    index = index or readIndex(archive_path)
+    layer = findLayer(index, layer_name, folder_name)
+    if not layer["Files"]:
+        raise KeyError(f"No Tables Indexed For: {layer_name}")
+    if layer["Missing Tables"]:
+        logger.warning(f"Related Tables Not Found In Backup: {layer_name} | {layer['Missing Tables']}")
+
+    gdb_path = os.path.join(out_dir, index["gdb"])
+    os.makedirs(gdb_path, exist_ok=True)
+    with open(archive_path, "rb") as archive:
+        for entry in index["system"] + layer["Files"]:
+            _extractEntry(archive, entry, os.path.join(gdb_path, entry["arcname"].split("/")[-1]))
+
+    logger.info(f"Layer Restored: {layer_name} | Feature Class: {layer['Feature Class']} | Files: {len(index['system']) + len(layer['Files'])} | GDB: {gdb_path}")
+
+    return gdb_path
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import logging
+import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.constants.paths import BACKUP_MANIFEST_PATH
+#################################################################################################################################################################################
+logger = logging.getLogger("root.backupmanifest")
+#################################################################################################################################################################################
+## Statuses written to the 'Backup Status' column of the Backup Services report.
+EXPORTED = "Exported"
+DELTA = "Delta"
+UNCHANGED = "Unchanged"
+#################################################################################################################################################################################
+
+class BackupManifest():
+    """
+    JSON record of every layer in the last successful backup, keyed by Layer URL. Each entry holds the layer's data and schema
+    edit dates at the time it was exported and the backup archive that holds that copy.
+    A layer is unchanged when both edit dates match the manifest, so its copy in the earlier archive is still current.
+    """
+    def __init__(self, manifest_path=BACKUP_MANIFEST_PATH):
+        self.manifest_path = str(manifest_path)
+        self.layers = self._load()
+        self._pending = {}
+
+    def _load(self)->dict:
+        if not os.path.exists(self.manifest_path):
+            logger.info(f"No Previous Backup Manifest: {self.manifest_path}")
+            return {}
+
+        try:
+            with open(self.manifest_path) as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"!! Failed to read Backup Manifest...{e}")
+            return {}
+
+        logger.info(f"Backup Manifest: {self.manifest_path} | Layers: {len(data.get('layers', {}))}")
+
+        return data.get("layers", {})
+
+    def __len__(self)->int:
+        return len(self.layers)
+
+    def previous(self, layer_url:str)->dict:
+        return self.layers.get(layer_url)
+
+    def isUnchanged(self, layer_url:str, data_edit_date, schema_edit_date)->bool:
+        """
+        Purpose: Layers without edit tracking have no edit dates and are never treated as unchanged.
+        """
+        entry = self.layers.get(layer_url)
+        if entry is None or data_edit_date is None or schema_edit_date is None:
+            return False
+
+        return entry["Data Edit Date"] == data_edit_date and entry["Schema Edit Date"] == schema_edit_date
+
+    def record(self, out_dict:dict, data_edit_date, schema_edit_date, backup_archive:str, run_id:str)->None:
+        """
+        Purpose: Stages the entry for an exported layer. Staged entries are only written by commit, once the backup has succeeded.
+        """
+        self._pending[out_dict["Layer URL"]] = {"Layer Name":out_dict["Layer Name"],
+                                                "Folder Name":out_dict.get("Folder Name"),
+                                                "Service Item Id":out_dict["Service Item Id"],
+                                                "Feature Class Name":out_dict["Feature Class Name"],
+                                                "Feature Class Path":out_dict["Feature Class Path"],
+                                                "Data Edit Date":data_edit_date,
+                                                "Schema Edit Date":schema_edit_date,
+                                                "Backup Archive":backup_archive,
+                                                "Backup Run":run_id}
+
+        return
+
+    def commit(self)->None:
+        """
+        Purpose: Moves the staged entries into the manifest and saves it. Layers that were skipped keep their previous entry.
+        """
+        self.layers.update(self._pending)
+        self._pending = {}
+
+        data = {"saved":datetime.datetime.now().isoformat(timespec="seconds"),
+                "layers":self.layers}
+
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp_path, self.manifest_path)
+        logger.info(f"Backup Manifest Saved: {self.manifest_path} | Layers: {len(self.layers)}")
+
+        return
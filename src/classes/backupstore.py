@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import zlib
+import hashlib
+import logging
+import datetime
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.constants.values import BACKUP_STORE_CHUNK_SIZE, BACKUP_STORE_MIN_CHUNK_SIZE, BACKUP_STORE_MAX_CHUNK_SIZE
+#################################################################################################################################################################################
+logger = logging.getLogger("root.backupstore")
+#################################################################################################################################################################################
+## Chunks are stored zlib compressed ('<hash>.z') unless compressing doesn't make them smaller ('<hash>').
+_COMPRESSED_SUFFIX = ".z"
+
+## Gear hash table for the chunk boundaries. Derived from SHA-256 so the boundaries never change between runs or Python versions.
+_GEAR = np.array([int.from_bytes(hashlib.sha256(bytes([b])).digest()[:4], "little") for b in range(256)], dtype=np.uint32)
+_WINDOW = 64
+_READ_SIZE = 4 * 1024 * 1024
+#################################################################################################################################################################################
+
+def chunkBoundaries(file_obj, average:int=BACKUP_STORE_CHUNK_SIZE, minimum:int=BACKUP_STORE_MIN_CHUNK_SIZE, maximum:int=BACKUP_STORE_MAX_CHUNK_SIZE):
+    """
+    Splits a file into content-defined chunks. A chunk ends after a byte where the hash of the preceding _WINDOW bytes has its low
+    log2(average) bits all zero, so the boundaries move with the content. Rows inserted early in a table only change the chunks
+    around the insert, not every chunk after it as fixed offsets would.
+    Args: Binary file object, Average chunk size (a power of two), Minimum chunk size, Maximum chunk size
+    Returns: Generator of chunk bytes
+    """
+    mask = np.uint32(average - 1)
+
+    pending = bytearray()
+    context = b""
+    while True:
+        data = file_obj.read(_READ_SIZE)
+        if not data:
+            break
+
+        ## The window hash is the sum of the gear values of its bytes, so the hash at every position of the block comes from one cumulative sum.
+        # The tail of the previous block is carried over so windows spanning two blocks hash the same as anywhere else.
+        block = np.frombuffer(context + data, dtype=np.uint8)
+        sums = np.zeros(len(block) + 1, dtype=np.uint32)
+        np.cumsum(_GEAR[block], dtype=np.uint32, out=sums[1:])
+        hashes = sums[_WINDOW:] - sums[:-_WINDOW]
+        candidates = np.flatnonzero((hashes & mask) == 0) + _WINDOW - len(context)
+
+        start = len(pending)
+        pending += data
+        cut = 0
+        for candidate in candidates.tolist():
+            end = start + candidate
+            while end - cut > maximum:
+                yield bytes(pending[cut:cut+maximum])
+                cut += maximum
+            if end - cut >= minimum:
+                yield bytes(pending[cut:end])
+                cut = end
+        while len(pending) - cut > maximum:
+            yield bytes(pending[cut:cut+maximum])
+            cut += maximum
+
+        del pending[:cut]
+        context = (context + data)[-(_WINDOW - 1):]
+
+    if pending:
+        yield bytes(pending)
+
+
+class BackupStore():
+    """
+    Content-addressed store of backup files. Every file is split into content-defined chunks (see chunkBoundaries) named by their
+    SHA-256, and a chunk is only written the first time it is seen. Each backup is a small JSON manifest listing its files and their
+    chunk hashes, so an unchanged Feature Class costs nothing to store again and a changed one mostly reuses its old chunks.
+
+    Layout:
+        <store_dir>/chunks/<first 2 hash characters>/<hash>[.z]
+        <store_dir>/manifests/<backup name>.json
+    """
+    def __init__(self, store_dir, chunk_size:int=BACKUP_STORE_CHUNK_SIZE, min_chunk_size:int=BACKUP_STORE_MIN_CHUNK_SIZE, max_chunk_size:int=BACKUP_STORE_MAX_CHUNK_SIZE):
+        self.store_dir = str(store_dir)
+        self.chunk_dir = os.path.join(self.store_dir, "chunks")
+        self.manifest_dir = os.path.join(self.store_dir, "manifests")
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+    def manifestPath(self, backup_name:str)->str:
+        return os.path.join(self.manifest_dir, f"{backup_name}.json")
+
+    def listBackups(self)->list:
+        return sorted([f[:-5] for f in os.listdir(self.manifest_dir) if f.endswith(".json")])
+
+    def _chunkPath(self, chunk_hash:str)->str:
+        return os.path.join(self.chunk_dir, chunk_hash[:2], chunk_hash)
+
+    def hasChunk(self, chunk_hash:str)->bool:
+        path = self._chunkPath(chunk_hash)
+        return os.path.exists(path + _COMPRESSED_SUFFIX) or os.path.exists(path)
+
+    def putChunk(self, data:bytes)->tuple:
+        """
+        Writes the chunk if the store doesn't already have it.
+        Args: Chunk bytes
+        Returns: (SHA-256 of the chunk, Number of bytes written to the store)
+        """
+        chunk_hash = hashlib.sha256(data).hexdigest()
+        if self.hasChunk(chunk_hash):
+            return chunk_hash, 0
+
+        compressed = zlib.compress(data, 6)
+        path = self._chunkPath(chunk_hash)
+        if len(compressed) < len(data):
+            path, data = path + _COMPRESSED_SUFFIX, compressed
+
+        ## Written under a temporary name first so an interrupted write never leaves a partial chunk behind a valid name.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        return chunk_hash, len(data)
+
+    def getChunk(self, chunk_hash:str)->bytes:
+        path = self._chunkPath(chunk_hash)
+        if os.path.exists(path + _COMPRESSED_SUFFIX):
+            with open(path + _COMPRESSED_SUFFIX, "rb") as f:
+                data = zlib.decompress(f.read())
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+
+        if hashlib.sha256(data).hexdigest() != chunk_hash:
+            raise ValueError(f"Chunk Failed Verification: {chunk_hash}")
+
+        return data
+
+    def putFile(self, file_path:str)->dict:
+        """
+        Purpose: Chunks a file into the store. Returns its manifest entry (without the archive path) and the bytes written.
+        """
+        chunks = []
+        size = 0
+        written = 0
+        with open(file_path, "rb") as f:
+            for data in chunkBoundaries(f, self.chunk_size, self.min_chunk_size, self.max_chunk_size):
+                chunk_hash, chunk_written = self.putChunk(data)
+                chunks.append(chunk_hash)
+                size += len(data)
+                written += chunk_written
+
+        return {"size":size, "chunks":chunks}, written
+
+    def putBackup(self, backup_name:str, gdb_path:str, extra_files:list=None, properties:dict=None)->str:
+        """
+        Stores a File GDB (and any extra files, e.g. the Excel report) as a backup.
+        Args: Backup Name, File GDB Path, List of extra file paths, Dictionary of values saved with the manifest
+        Returns: Manifest Path
+        """
+        gdb_name = os.path.basename(gdb_path.rstrip("\\/"))
+        sources = []
+        for root, dirs, files in os.walk(gdb_path):
+            for file in sorted(files):
+                if not file.endswith(".lock"):
+                    file_path = os.path.join(root, file)
+                    sources.append((file_path, Path(gdb_name, os.path.relpath(file_path, gdb_path)).as_posix()))
+        for file_path in extra_files or []:
+            sources.append((file_path, os.path.basename(file_path)))
+
+        entries = []
+        total = 0
+        written = 0
+        for file_path, archive_path in sources:
+            entry, file_written = self.putFile(file_path)
+            entry["path"] = archive_path
+            entries.append(entry)
+            total += entry["size"]
+            written += file_written
+
+        manifest = {"backup":backup_name,
+                    "created":datetime.datetime.now().isoformat(timespec="seconds"),
+                    "gdb":gdb_name,
+                    "chunking":{"average":self.chunk_size, "minimum":self.min_chunk_size, "maximum":self.max_chunk_size},
+                    "properties":properties or {},
+                    "files":entries}
+
+        manifest_path = self.manifestPath(backup_name)
+        temp_path = f"{manifest_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(temp_path, manifest_path)
+
+        logger.info(f"Backup Stored: {backup_name} | Files: {len(entries)} | Size: {total/1024/1024:.1f} MB | Written: {written/1024/1024:.1f} MB")
+
+        return manifest_path
+
+    def restoreBackup(self, backup_name:str, out_dir:str, paths:list=None)->list:
+        """
+        Reassembles a backup's files under out_dir. Every chunk is verified against its hash as it is read.
+        Args: Backup Name (or Manifest Path), Output Directory, Optional list of archive paths (or path prefixes) to restore
+        Returns: List of restored file paths
+        """
+        manifest_path = backup_name if backup_name.endswith(".json") else self.manifestPath(backup_name)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        restored = []
+        for entry in manifest["files"]:
+            if paths and not any(entry["path"] == p or entry["path"].startswith(p.rstrip("/") + "/") for p in paths):
+                continue
+
+            out_path = os.path.join(out_dir, *entry["path"].split("/"))
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, "wb") as f:
+                for chunk_hash in entry["chunks"]:
+                    f.write(self.getChunk(chunk_hash))
+            restored.append(out_path)
+
+        logger.info(f"Backup Restored: {manifest['backup']} | Files: {len(restored)} | Output: {out_dir}")
+
+        return restored
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import hashlib
+import logging
+import datetime
+import pandas as pd
+from pandas import DataFrame
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.constants.paths import CATALOG_SNAPSHOT_DIR
+from src.constants.values import CATALOG_COLUMNS
+#################################################################################################################################################################################
+logger = logging.getLogger("root.catalogsnapshot")
+#################################################################################################################################################################################
+
+class CatalogSnapshot():
+    """
+    Stores a fingerprint of every Data Catalog row (keyed by 'Table Name') from the last run of a tool.
+    Comparing the current catalog against it gives the rows that were added, changed or removed since that run.
+    """
+    def __init__(self, tool_name:str, catalog_path, columns:list=CATALOG_COLUMNS, snapshot_dir=CATALOG_SNAPSHOT_DIR):
+        self.tool_name = tool_name
+        self.catalog_path = os.path.abspath(str(catalog_path).replace("'", ""))
+        self.columns = columns
+        catalog_key = hashlib.sha1(os.path.normcase(self.catalog_path).encode("utf-8")).hexdigest()[:12]
+        self.snapshot_path = os.path.join(snapshot_dir, f"{tool_name}_{Path(self.catalog_path).stem}_{catalog_key}.json")
+        self.fingerprints = self._load()
+
+    def _load(self)->dict:
+        if not os.path.exists(self.snapshot_path):
+            logger.info(f"No Previous Catalog Snapshot: {self.snapshot_path}")
+            return {}
+
+        try:
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"!! Failed to read Catalog Snapshot...{e}")
+            return {}
+
+        ## A change in the fingerprinted columns makes every stored fingerprint meaningless.
+        if data.get("columns") != list(self.columns):
+            logger.info(f"Catalog Snapshot columns changed. All rows will be treated as added.")
+            return {}
+
+        return data.get("rows", {})
+
+    def fingerprintRows(self, catalog_df:DataFrame)->pd.Series:
+        """
+        Purpose: Returns a stable hash of the fingerprinted columns for each row, indexed by 'Table Name'.
+        """
+        columns = [c for c in self.columns if c in catalog_df.columns]
+        values = catalog_df[columns].astype("object").where(catalog_df[columns].notna(), None)
+        hashes = pd.util.hash_pandas_object(values, index=False)
+
+        return pd.Series(hashes.map("{:016x}".format).to_numpy(), index=catalog_df["Table Name"].to_numpy())
+
+    def diff(self, catalog_df:DataFrame)->dict:
+        """
+        Compares the catalog against the previous snapshot.
+        Args: Data Catalog DataFrame
+        Returns: Dictionary of 'added', 'changed', 'removed' and 'unchanged' lists of Table Names
+        """
+        current = self.fingerprintRows(catalog_df)
+        current = current[~current.index.duplicated(keep="last")]
+        previous = pd.Series(self.fingerprints, dtype="object")
+
+        in_previous = current.index.isin(previous.index)
+        added = current.index[~in_previous]
+        common = current.index[in_previous]
+        changed_mask = current[common].to_numpy() != previous[common].to_numpy()
+
+        changes = {"added":list(added),
+                   "changed":list(common[changed_mask]),
+                   "removed":list(previous.index[~previous.index.isin(current.index)]),
+                   "unchanged":list(common[~changed_mask])}
+
+        logger.info(f"Catalog Changes: Added {len(changes['added'])} | Changed {len(changes['changed'])} | Removed {len(changes['removed'])} | Unchanged {len(changes['unchanged'])}")
+
+        return changes
+
+    def filterChanged(self, catalog_df:DataFrame, changes:dict=None)->DataFrame:
+        """
+        Purpose: Returns only the rows that were added or changed since the previous snapshot.
+        """
+        changes = changes or self.diff(catalog_df)
+
+        return catalog_df.loc[catalog_df["Table Name"].isin(changes["added"] + changes["changed"]).to_numpy()]
+
+    def update(self, processed_df:DataFrame, removed:list=None, failed:list=None)->None:
+        """
+        Purpose: Records the rows that were processed in this run. Rows outside a filtered run keep their previous fingerprint.
+        Failed rows lose their fingerprint, so the next run sees them as added and processes them again.
+        """
+        self.fingerprints.update(self.fingerprintRows(processed_df).to_dict())
+        for table_name in (removed or []) + (failed or []):
+            self.fingerprints.pop(table_name, None)
+
+        return
+
+    def save(self)->None:
+        data = {"tool":self.tool_name,
+                "catalog_path":self.catalog_path,
+                "saved":datetime.datetime.now().isoformat(timespec="seconds"),
+                "columns":list(self.columns),
+                "rows":self.fingerprints}
+
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp_path, self.snapshot_path)
+        logger.info(f"Catalog Snapshot Saved: {self.snapshot_path}")
+
+        return
@@ -0,0 +1,227 @@
+import os
+import sys
+import sqlite3
+import hashlib
+import logging
+import datetime
+from pathlib import Path
+
+import arcpy
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.constants.paths import CHANGE_TRACKING_LEDGER_PATH, CHANGE_TRACKING_BASELINE_GDB
+from src.constants.values import PROJECT_SPATIAL_REFERENCE
+from src.functions.changetracking import normaliseGlobalId, serviceServerGens, supportsDelta, extractChanges, planChanges, objectIdPairs
+#################################################################################################################################################################################
+logger = logging.getLogger("root.deltabackup")
+#################################################################################################################################################################################
+_CREATE_TABLES = ["""
+CREATE TABLE IF NOT EXISTS layer_generations (
+    layer_url TEXT PRIMARY KEY,
+    server_gen INTEGER NOT NULL,
+    baseline TEXT NOT NULL,
+    updated TEXT
+)
+""","""
+CREATE TABLE IF NOT EXISTS layer_objects (
+    layer_url TEXT NOT NULL,
+    object_id INTEGER NOT NULL,
+    global_id TEXT NOT NULL,
+    PRIMARY KEY (layer_url, object_id)
+)
+"""]
+#################################################################################################################################################################################
+
+def baselinePath(layer_url:str, baseline_gdb=CHANGE_TRACKING_BASELINE_GDB)->str:
+    ## One baseline Feature Class per layer. The name is derived from the Layer URL so it never collides.
+    return os.path.join(str(baseline_gdb), f"L_{hashlib.sha1(layer_url.encode('utf-8')).hexdigest()[:16]}")
+
+
+class ChangeTrackingLedger():
+    """
+    SQLite record of the server generation each change tracking layer was last backed up at, and of the ObjectID to GlobalID
+    pairs in its baseline (extractChanges reports deletes by ObjectID).
+    """
+    def __init__(self, ledger_path=CHANGE_TRACKING_LEDGER_PATH):
+        self.ledger_path = str(ledger_path)
+        os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.ledger_path)
+        for statement in _CREATE_TABLES:
+            self.conn.execute(statement)
+        self.conn.commit()
+        self._generations = {row[0]:(row[1], row[2]) for row in self.conn.execute("SELECT layer_url, server_gen, baseline FROM layer_generations")}
+        logger.info(f"Change Tracking Ledger: {self.ledger_path} | Layers: {len(self._generations)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self)->int:
+        return len(self._generations)
+
+    def generation(self, layer_url:str)->tuple:
+        """
+        Purpose: Returns (serverGen, Baseline Path) for the layer, or None if it has no usable baseline.
+        """
+        entry = self._generations.get(layer_url)
+        if entry is None or not arcpy.Exists(entry[1]):
+            return None
+
+        return entry
+
+    def setGeneration(self, layer_url:str, server_gen:int, baseline:str)->None:
+        updated = datetime.datetime.now().isoformat(timespec="seconds")
+        self.conn.execute("INSERT OR REPLACE INTO layer_generations (layer_url, server_gen, baseline, updated) VALUES (?, ?, ?, ?)",
+                          (layer_url, server_gen, baseline, updated))
+        self.conn.commit()
+        self._generations[layer_url] = (server_gen, baseline)
+
+        return
+
+    def resetObjects(self, layer_url:str)->None:
+        self.conn.execute("DELETE FROM layer_objects WHERE layer_url = ?", (layer_url,))
+
+    def mapObjectIds(self, layer_url:str, pairs)->None:
+        self.conn.executemany("INSERT OR REPLACE INTO layer_objects (layer_url, object_id, global_id) VALUES (?, ?, ?)",
+                              [(layer_url, int(object_id), normaliseGlobalId(global_id)) for object_id, global_id in pairs])
+
+    def globalIds(self, layer_url:str, object_ids:list)->list:
+        global_ids = []
+        for start in range(0, len(object_ids), 500):
+            batch = [int(o) for o in object_ids[start:start+500]]
+            rows = self.conn.execute(f"SELECT global_id FROM layer_objects WHERE layer_url = ? AND object_id IN ({','.join('?'*len(batch))})", [layer_url] + batch)
+            global_ids.extend([row[0] for row in rows])
+
+        return global_ids
+
+    def forgetObjects(self, layer_url:str, object_ids:list)->None:
+        self.conn.executemany("DELETE FROM layer_objects WHERE layer_url = ? AND object_id = ?", [(layer_url, int(o)) for o in object_ids])
+
+    def commit(self)->None:
+        self.conn.commit()
+
+    def rollback(self)->None:
+        self.conn.rollback()
+
+    def close(self)->None:
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+        return
+
+
+def applyChanges(baseline:str, sl_obj, remove:set, features:list)->None:
+    """
+    Applies a change set to a copy of the baseline and swaps the copy in once both the deletes and the append have succeeded.
+    A failure part way through leaves the baseline as it was, so the same change set is requested again on the next run.
+    Args: Baseline Feature Class, ServiceLayer, GlobalIDs to remove (planChanges), Features to append
+    """
+    pending = f"{baseline}_pending"
+    if arcpy.Exists(pending):
+        arcpy.management.Delete(pending)
+    arcpy.management.Copy(baseline, pending)
+
+    try:
+        _removeRows(pending, sl_obj.layerProperties["globalIdField"], remove)
+        _appendFeatures(pending, sl_obj, features)
+    except Exception:
+        arcpy.management.Delete(pending)
+        raise
+
+    ## If the run stops between the delete and the rename the baseline is missing, and ledger.generation sends the layer to a full export.
+    arcpy.management.Delete(baseline)
+    arcpy.management.Rename(pending, baseline)
+
+    return
+
+
+def _removeRows(featureclass_path:str, global_id_field:str, remove:set)->None:
+    if not remove:
+        return
+
+    with arcpy.da.UpdateCursor(featureclass_path, [global_id_field]) as cursor:
+        for row in cursor:
+            if normaliseGlobalId(row[0]) in remove:
+                cursor.deleteRow()
+
+    return
+
+
+def _appendFeatures(featureclass_path:str, sl_obj, features:list)->None:
+    ## The REST features are appended with their GlobalIDs preserved.
+    if not features:
+        return
+
+    featureset_json = {"geometryType":sl_obj.layerProperties["geometryType"],
+                       "spatialReference":{"wkid":sl_obj.layerSpatialReferenceWkid},
+                       "fields":sl_obj.layerFields,
+                       "features":features}
+    featureset = arcpy.AsShape(featureset_json, True)
+    with arcpy.EnvManager(outputCoordinateSystem=PROJECT_SPATIAL_REFERENCE, preserveGlobalIds=True):
+        arcpy.management.Append(inputs=featureset, target=featureclass_path, schema_type="NO_TEST")
+
+    return
+
+
+def ensureBaselineGdb(baseline_gdb=CHANGE_TRACKING_BASELINE_GDB)->None:
+    if not arcpy.Exists(str(baseline_gdb)):
+        os.makedirs(os.path.dirname(str(baseline_gdb)), exist_ok=True)
+        arcpy.management.CreateFileGDB(os.path.dirname(str(baseline_gdb)), os.path.basename(str(baseline_gdb)))
+
+    return
+
+
+def seedBaseline(gis_conn, sl_obj, featureclass_path:str, server_gen:int, ledger:ChangeTrackingLedger, baseline_gdb=CHANGE_TRACKING_BASELINE_GDB)->None:
+    """
+    Copies a full export into the layer's baseline and records the server generation read before the export.
+    Edits made during the export are returned again by the next extractChanges and replayed.
+    Args: GIS Connection, ServiceLayer, Exported Feature Class, serverGen read before the export, ChangeTrackingLedger, Baseline File GDB
+    """
+    ensureBaselineGdb(baseline_gdb)
+    baseline = baselinePath(sl_obj.layerUrl, baseline_gdb)
+    arcpy.management.Copy(featureclass_path, baseline)
+
+    ledger.resetObjects(sl_obj.layerUrl)
+    ledger.mapObjectIds(sl_obj.layerUrl, objectIdPairs(gis_conn, sl_obj))
+    ledger.setGeneration(sl_obj.layerUrl, server_gen, baseline)
+    logger.info(f"Baseline Seeded: {sl_obj.layerName} | serverGen: {server_gen}")
+
+    return
+
+
+def deltaBackup(gis_conn, sl_obj, featureclass_path:str, ledger:ChangeTrackingLedger)->dict:
+    """
+    Brings the layer's baseline up to date with the changes since its last backup and copies it to the backup Feature Class.
+    Args: GIS Connection, ServiceLayer, Backup Feature Class Path, ChangeTrackingLedger
+    Returns: Dictionary of the change counts and the new serverGen
+    """
+    server_gen, baseline = ledger.generation(sl_obj.layerUrl)
+    changes = extractChanges(gis_conn, sl_obj, server_gen)
+
+    object_id_field = sl_obj.layerProperties["objectIdField"]
+    global_id_field = sl_obj.layerProperties["globalIdField"]
+    ## deleteIds are ObjectIDs. Their GlobalIDs come from the pairs recorded when the features were backed up.
+    deleted_global_ids = ledger.globalIds(sl_obj.layerUrl, changes["deleteIds"])
+    remove, features = planChanges(changes, deleted_global_ids, global_id_field)
+
+    ## The ledger only moves to the new serverGen once the baseline and the backup copy are both written.
+    applyChanges(baseline, sl_obj, remove, features)
+    arcpy.management.Copy(baseline, featureclass_path)
+
+    try:
+        ledger.forgetObjects(sl_obj.layerUrl, changes["deleteIds"])
+        ledger.mapObjectIds(sl_obj.layerUrl, [(f["attributes"][object_id_field], f["attributes"][global_id_field]) for f in features])
+        ledger.setGeneration(sl_obj.layerUrl, changes["serverGen"], baseline)
+    except Exception:
+        ledger.rollback()
+        raise
+
+    counts = {"Adds":len(changes["adds"]), "Updates":len(changes["updates"]), "Deletes":len(changes["deleteIds"]), "serverGen":changes["serverGen"]}
+    logger.info(f"Delta Applied: {sl_obj.layerName} | {counts}")
+
+    return counts
@@ -0,0 +1,109 @@
+import os
+import sys
+import logging
+from pathlib import Path
+
+import arcpy
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+#################################################################################################################################################################################
+logger = logging.getLogger("root.gdbinventory")
+#################################################################################################################################################################################
+## Process-wide cache of inventories keyed by the normalised File GDB path.
+_INVENTORIES = {}
+
+## GDB_Items system table. It is rewritten whenever an item is created, renamed or deleted.
+_GDB_ITEMS_TABLE = "a00000004.gdbtable"
+#################################################################################################################################################################################
+
+def _normalisePath(gdb_path)->str:
+    return os.path.normcase(os.path.abspath(str(gdb_path).replace("'", "")))
+
+
+def _modificationStamp(gdb_path:str)->tuple:
+    """
+    Purpose: Returns a cheap stamp that changes whenever items are added to, removed from or renamed in the File GDB.
+    """
+    stamp = []
+    for path in [gdb_path, os.path.join(gdb_path, _GDB_ITEMS_TABLE)]:
+        try:
+            stat = os.stat(path)
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append(None)
+
+    return tuple(stamp)
+
+
+class GdbInventory():
+    """
+    Snapshot of the Feature Classes and Rasters stored in a File GDB.
+    Item names map to the Feature Dataset they belong to (None for the GDB root), so existence checks are a single set lookup.
+    """
+    def __init__(self, gdb_path):
+        self.gdb_path = str(gdb_path).replace("'", "")
+        self.stamp = None
+        self.datasets = []
+        self.featureclasses = {}
+        self.rasters = set()
+        self.build()
+
+    def build(self)->None:
+        self.stamp = _modificationStamp(self.gdb_path)
+        self.datasets = []
+        self.featureclasses = {}
+        self.rasters = set()
+
+        with arcpy.EnvManager(workspace=self.gdb_path):
+            self.datasets = [d for d in arcpy.ListDatasets(feature_type="Feature") or []]
+            for dataset in self.datasets + [None]:
+                for featureclass in arcpy.ListFeatureClasses(feature_dataset=dataset) or []:
+                    self.featureclasses[featureclass] = dataset
+            self.rasters = set(arcpy.ListRasters() or [])
+
+        logger.debug(f"Inventory Built: {self.gdb_path} | Datasets: {len(self.datasets)} | Feature Classes: {len(self.featureclasses)} | Rasters: {len(self.rasters)}")
+
+        return
+
+    @property
+    def isStale(self)->bool:
+        return _modificationStamp(self.gdb_path) != self.stamp
+
+    def __contains__(self, item_name)->bool:
+        return item_name in self.featureclasses or item_name in self.rasters
+
+    def exists(self, item_name)->bool:
+        return item_name in self
+
+    def getDataset(self, item_name):
+        """
+        Purpose: Returns the Feature Dataset the item is stored in. None is returned for root level items and rasters.
+        """
+        return self.featureclasses.get(item_name)
+
+    def featureClassList(self)->list:
+        return list(self.featureclasses.keys())
+
+    def rasterList(self)->list:
+        return list(self.rasters)
+
+    def itemList(self)->list:
+        return self.featureClassList() + self.rasterList()
+
+
+def getGdbInventory(gdb_path, refresh:bool=False)->GdbInventory:
+    """
+    Returns the cached inventory for the File GDB. The inventory is rebuilt when the GDB modification stamp changes or refresh is True.
+    """
+    key = _normalisePath(gdb_path)
+    inventory = _INVENTORIES.get(key)
+
+    if inventory is None or refresh or inventory.isStale:
+        inventory = GdbInventory(gdb_path)
+        _INVENTORIES[key] = inventory
+
+    return inventory
+
+
+def clearGdbInventories()->None:
+    _INVENTORIES.clear()
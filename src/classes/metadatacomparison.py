@@ -0,0 +1,98 @@
+import re
+import sys
+import logging
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.constants.values import DF_COLUMNS, SERVICE_ITEM_LOOKUP
+#################################################################################################################################################################################
+logger = logging.getLogger("root.metadatacomparison")
+#################################################################################################################################################################################
+HTML_TAG_RE = re.compile(r"<.*?>")
+
+DOES_NOT_EXIST = "Dataset Doesn't Exist"
+MISSING = "Missing"
+#################################################################################################################################################################################
+
+def normaliseText(series:pd.Series)->pd.Series:
+    """
+    Purpose: Canonical form used for comparing metadata. Strips HTML tags, lower-cases, standardises quotes and trims whitespace.
+    Empty values are returned as NA.
+    """
+    text = series.astype("object").where(series.notna() & (series.astype(str) != ""), None)
+    normalised = (text.dropna().astype(str)
+                  .str.replace(HTML_TAG_RE, "", regex=True)
+                  .str.lower()
+                  .str.replace('"', "'", regex=False)
+                  .str.strip())
+
+    return normalised.reindex(series.index)
+
+
+def fingerprintText(series:pd.Series)->np.ndarray:
+    """
+    Purpose: Stable 64 bit hash of each normalised value. NA values hash to 0.
+    """
+    hashes = np.zeros(len(series), dtype="uint64")
+    present = series.notna().to_numpy()
+    if present.any():
+        hashes[present] = pd.util.hash_pandas_object(series[present], index=False).to_numpy()
+
+    return hashes
+
+
+_MISSING_FINGERPRINT = fingerprintText(pd.Series([MISSING.lower()]))[0]
+_DOES_NOT_EXIST_FINGERPRINT = fingerprintText(pd.Series([DOES_NOT_EXIST.lower()]))[0]
+
+
+class MetadataComparison():
+    """
+    Local and Service metadata for every Data Catalog row, compared field by field.
+    Values are collected per row and normalised, fingerprinted and matched as whole columns when the table is built.
+    """
+    def __init__(self, md_items:list=list(SERVICE_ITEM_LOOKUP.keys())):
+        self.md_items = md_items
+        self.records = {}
+
+    def __len__(self)->int:
+        return len(self.records)
+
+    def addRecord(self, table_name:str, record:dict)->None:
+        """
+        Purpose: Adds the 'Local - Exist', 'Service - Exist', 'Local - <md_item>' and 'Service - <md_item>' values for one row.
+        """
+        self.records[table_name] = record
+
+        return
+
+    def toDataFrame(self, columns:list=DF_COLUMNS)->DataFrame:
+        """
+        Builds the comparison table. A field matches when both sides have the same value, or when only one side exists and it isn't 'Missing'.
+        A field that is 'Missing' on every side that exists does not match.
+        Returns: DataFrame indexed by Table Name
+        """
+        df = DataFrame.from_dict(self.records, orient="index")
+        if df.empty:
+            return DataFrame(columns=columns)
+
+        for md_item in self.md_items:
+            local_fp = fingerprintText(normaliseText(df[f"Local - {md_item}"]))
+            service_fp = fingerprintText(normaliseText(df[f"Service - {md_item}"]))
+
+            local_valid = (local_fp != 0) & (local_fp != _DOES_NOT_EXIST_FINGERPRINT)
+            service_valid = (service_fp != 0) & (service_fp != _DOES_NOT_EXIST_FINGERPRINT)
+
+            both = local_valid & service_valid & (local_fp == service_fp) & (local_fp != _MISSING_FINGERPRINT)
+            local_only = local_valid & ~service_valid & (local_fp != _MISSING_FINGERPRINT)
+            service_only = ~local_valid & service_valid & (service_fp != _MISSING_FINGERPRINT)
+            neither = ~local_valid & ~service_valid
+
+            df[f"{md_item} - Match"] = both | local_only | service_only | neither
+
+        logger.info(f"Metadata Compared: {len(df)} Rows")
+
+        return df.reindex(columns=columns)
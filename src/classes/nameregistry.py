@@ -0,0 +1,71 @@
+import sys
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.classes.gdbinventory import getGdbInventory
+#################################################################################################################################################################################
+logger = logging.getLogger("root.nameregistry")
+#################################################################################################################################################################################
+## Characters replaced with "_" in exported Feature Class names.
+INVALID_NAME_CHARACTERS = "!@#$%^&*()[] {};:,./<>?\\|`~-=_+"
+_NAME_TRANSLATION = {ord(c): "_" for c in INVALID_NAME_CHARACTERS}
+#################################################################################################################################################################################
+
+def sanitizeName(name:str)->str:
+    return str(name).translate(_NAME_TRANSLATION)
+
+
+class FeatureClassNameRegistry():
+    """
+    Hands out unique Feature Class names for a File GDB. The registry is seeded once with the names already in the GDB
+    and every name handed out is recorded, so no listing is needed per export.
+    Names are compared casefolded because File GDB names are not case sensitive.
+    """
+    def __init__(self, existing_names=()):
+        self._taken = set()
+        self._counters = {}
+        for name in existing_names:
+            self.record(name)
+
+    @classmethod
+    def fromWorkspace(cls, gdb_path):
+        """
+        Purpose: Seeds the registry with the Feature Datasets, Feature Classes and Rasters in the File GDB.
+        """
+        inventory = getGdbInventory(gdb_path, refresh=True)
+        registry = cls(inventory.datasets + inventory.itemList())
+        logger.info(f"Name Registry Seeded: {gdb_path} | Names: {len(registry)}")
+
+        return registry
+
+    def __contains__(self, name)->bool:
+        return str(name).casefold() in self._taken
+
+    def __len__(self)->int:
+        return len(self._taken)
+
+    def record(self, name:str)->None:
+        self._taken.add(str(name).casefold())
+
+    def reserve(self, name:str)->str:
+        """
+        Returns a sanitized name that isn't in use and records it. Collisions get the next '_<n>' suffix for that base name.
+        Args: Layer Name
+        Returns: Feature Class Name
+        """
+        base_name = sanitizeName(name)
+        candidate = base_name
+
+        if candidate in self:
+            base_key = base_name.casefold()
+            count = self._counters.get(base_key, 0)
+            while candidate in self:
+                count += 1
+                candidate = f"{base_name}_{count}"
+            self._counters[base_key] = count
+
+        self.record(candidate)
+
+        return candidate
@@ -0,0 +1,104 @@
+import sys
+import logging
+from pathlib import Path
+
+from arcgis.gis import GIS, Item
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+#################################################################################################################################################################################
+logger = logging.getLogger("root.portalitems")
+#################################################################################################################################################################################
+## Number of Item IDs sent in a single search. Keeps the query string well under the portal's URL length limit.
+SEARCH_CHUNK_SIZE = 50
+
+## One cache per GIS connection, shared by every DataCatalogRow built with that connection.
+_ITEM_CACHES = {}
+#################################################################################################################################################################################
+
+class PortalItemCache():
+    """
+    Holds the portal Items retrieved for a GIS connection. Missing items are cached as None so an invalid Item ID is only looked up once.
+    Lookups that fail (timeouts, expired tokens, server errors) are not cached, so the ID is looked up again next time.
+    """
+    def __init__(self, gis_conn:GIS):
+        self.gis_conn = gis_conn
+        self._items = {}
+
+    def __contains__(self, item_id)->bool:
+        return item_id in self._items
+
+    def __len__(self)->int:
+        return len(self._items)
+
+    def add(self, items:list)->None:
+        """
+        Purpose: Seeds the cache with Items that have already been retrieved (e.g. from a content search).
+        """
+        for item in items:
+            self._items[item.id] = item
+
+        return
+
+    def resolve(self, item_ids:list, chunk_size:int=SEARCH_CHUNK_SIZE)->dict:
+        """
+        Retrieves the Items in batched 'id:(a OR b OR ...)' searches. IDs that are not returned by the search are retried individually,
+        which covers items the search index hasn't picked up yet.
+        Args: List of AGOL Item IDs, Number of IDs per search
+        Returns: Dictionary of Item ID to Item (None if the item doesn't exist). IDs whose lookup failed are left out.
+        """
+        unresolved = list(dict.fromkeys([i for i in item_ids if i and isinstance(i, str) and i not in self._items]))
+        logger.info(f"Resolving {len(unresolved)} Portal Items in {-(-len(unresolved)//chunk_size)} Searches...")
+
+        for start in range(0, len(unresolved), chunk_size):
+            chunk = unresolved[start:start+chunk_size]
+            query = f"id:({' OR '.join(chunk)})"
+            try:
+                results = self.gis_conn.content.search(query=query, max_items=len(chunk), outside_org=True)
+            except Exception as e:
+                logger.warning(f"!! Bulk Item Search Failed...{e}")
+                results = []
+
+            self.add([r for r in results if r.id in chunk])
+
+        for item_id in [i for i in unresolved if i not in self._items]:
+            self._getItem(item_id)
+
+        return {item_id:self._items.get(item_id) for item_id in item_ids if item_id in self._items}
+
+    def get(self, item_id)->Item:
+        if not item_id or not isinstance(item_id, str):
+            return None
+
+        if item_id not in self._items:
+            return self._getItem(item_id)
+
+        return self._items[item_id]
+
+    def invalidate(self, item_id=None)->None:
+        if item_id is None:
+            self._items.clear()
+        else:
+            self._items.pop(item_id, None)
+
+        return
+
+    def _getItem(self, item_id:str)->Item:
+        ## Only a lookup that completed is cached. content.get returns None when the item doesn't exist.
+        try:
+            item = self.gis_conn.content.get(item_id)
+        except Exception as e:
+            logger.warning(f"!! Failed to retrieve Item {item_id}. Not Cached...{e}")
+            return None
+
+        self._items[item_id] = item
+
+        return item
+
+
+def getItemCache(gis_conn:GIS)->PortalItemCache:
+    cache = _ITEM_CACHES.get(id(gis_conn))
+    if cache is None or cache.gis_conn is not gis_conn:
+        cache = PortalItemCache(gis_conn)
+        _ITEM_CACHES[id(gis_conn)] = cache
+
+    return cache
@@ -0,0 +1,99 @@
+import os
+import sys
+import logging
+from pathlib import Path
+
+import arcpy
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.constants.paths import SHP_DIR
+from src.constants.values import PROJECT_SPATIAL_REFERENCE
+#################################################################################################################################################################################
+logger = logging.getLogger("root.projectboundary")
+#################################################################################################################################################################################
+## Process-wide cache of project boundaries keyed by WKID.
+_BOUNDARIES = {}
+#################################################################################################################################################################################
+
+def boundaryPath(wkid)->str:
+    return os.path.join(SHP_DIR, "project_boundaries", str(wkid), "projectboundary.shp")
+
+
+class ProjectBoundary():
+    """
+    Project boundary geometry and extent in a single spatial reference.
+    """
+    __slots__ = ("wkid", "geometry", "extent")
+
+    def __init__(self, wkid:int, geometry:arcpy.Geometry):
+        self.wkid = wkid
+        self.geometry = geometry
+        self.extent = geometry.extent
+
+    def envelopeJson(self)->dict:
+        """
+        Purpose: Returns the extent as an Esri JSON envelope for REST query filters.
+        """
+        return {"xmin":self.extent.XMin, "ymin":self.extent.YMin, "xmax":self.extent.XMax, "ymax":self.extent.YMax, "spatialReference":{"wkid":self.wkid}}
+
+
+def _readBoundaryGeometry(shp_path:str)->arcpy.Geometry:
+    with arcpy.da.SearchCursor(shp_path, ["SHAPE@"]) as cursor:
+        return next(cursor)[0]
+
+
+def getProjectBoundary(wkid)->ProjectBoundary:
+    """
+    Returns the project boundary in the requested spatial reference. The boundary is read from disk or projected in memory
+    once per WKID and reused for every layer afterwards.
+    Args: WKID of the spatial reference
+    Returns: ProjectBoundary
+    """
+    wkid = int(wkid)
+    boundary = _BOUNDARIES.get(wkid)
+    if boundary is not None:
+        return boundary
+
+    ## Boundaries that were already projected to disk are reused so their geometry matches earlier runs.
+    shp_path = boundaryPath(wkid)
+    if os.path.exists(shp_path):
+        geometry = _readBoundaryGeometry(shp_path)
+    elif wkid == PROJECT_SPATIAL_REFERENCE.factoryCode:
+        raise FileNotFoundError(shp_path)
+    else:
+        logger.info(f"Projecting Project Boundary to {wkid}...")
+        base_geometry = getProjectBoundary(PROJECT_SPATIAL_REFERENCE.factoryCode).geometry
+        geometry = base_geometry.projectAs(arcpy.SpatialReference(wkid))
+
+    boundary = ProjectBoundary(wkid, geometry)
+    _BOUNDARIES[wkid] = boundary
+
+    return boundary
+
+
+def writeProjectBoundaries(wkids)->list:
+    """
+    Precomputes the project boundary for each WKID. Boundaries missing from disk are projected from the base boundary and
+    written next to it, so later runs and the parallel export workers read them instead of projecting them again.
+    Args: Iterable of WKIDs (e.g. the spatial references of the layers about to be exported)
+    Returns: List of ProjectBoundary
+    """
+    base_path = boundaryPath(PROJECT_SPATIAL_REFERENCE.factoryCode)
+    if not os.path.exists(base_path):
+        raise FileNotFoundError(base_path)
+
+    boundaries = []
+    for wkid in sorted({int(w) for w in wkids}):
+        shp_path = boundaryPath(wkid)
+        if not os.path.exists(shp_path):
+            logger.info(f"Writing Project Boundary for {wkid}...")
+            os.makedirs(os.path.dirname(shp_path), exist_ok=True)
+            arcpy.management.Project(base_path, shp_path, arcpy.SpatialReference(wkid))
+        boundaries.append(getProjectBoundary(wkid))
+
+    return boundaries
+
+
+def clearProjectBoundaries()->None:
+    _BOUNDARIES.clear()
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import logging
+import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.constants.paths import METADATA_LEDGER_PATH
+#################################################################################################################################################################################
+logger = logging.getLogger("root.pushledger")
+#################################################################################################################################################################################
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS metadata_pushes (
+    table_name TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    metadata_hash TEXT NOT NULL,
+    item_modified INTEGER,
+    run_id TEXT,
+    pushed TEXT,
+    PRIMARY KEY (table_name, item_id)
+)
+"""
+#################################################################################################################################################################################
+
+def metadataHash(metadata:dict)->str:
+    """
+    Purpose: Stable hash of a metadata dictionary. Tags are sorted so their order doesn't change the hash.
+    """
+    canonical = {}
+    for key, value in metadata.items():
+        if isinstance(value, list):
+            value = sorted([str(v).strip() for v in value])
+        canonical[key] = value if value else None
+
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class MetadataPushLedger():
+    """
+    SQLite record of the metadata last pushed to each AGOL item, keyed by Table Name and AGOL Item ID.
+    An item is current when the hash of its source metadata and the item's 'modified' stamp both match the last push.
+    """
+    def __init__(self, ledger_path=METADATA_LEDGER_PATH):
+        self.ledger_path = str(ledger_path)
+        os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.ledger_path)
+        self.conn.execute(_CREATE_TABLE)
+        self.conn.commit()
+        self._entries = {(row[0], row[1]):(row[2], row[3]) for row in self.conn.execute("SELECT table_name, item_id, metadata_hash, item_modified FROM metadata_pushes")}
+        logger.info(f"Metadata Push Ledger: {self.ledger_path} | Entries: {len(self._entries)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self)->int:
+        return len(self._entries)
+
+    def isCurrent(self, table_name:str, item_id:str, metadata_hash:str, item_modified)->bool:
+        entry = self._entries.get((table_name, item_id))
+        if entry is None:
+            return False
+
+        return entry[0] == metadata_hash and entry[1] == item_modified
+
+    def record(self, table_name:str, item_id:str, metadata_hash:str, item_modified, run_id:str)->None:
+        pushed = datetime.datetime.now().isoformat(timespec="seconds")
+        self.conn.execute("INSERT OR REPLACE INTO metadata_pushes (table_name, item_id, metadata_hash, item_modified, run_id, pushed) VALUES (?, ?, ?, ?, ?, ?)",
+                          (table_name, item_id, metadata_hash, item_modified, run_id, pushed))
+        self._entries[(table_name, item_id)] = (metadata_hash, item_modified)
+
+        return
+
+    def commit(self)->None:
+        self.conn.commit()
+
+    def close(self)->None:
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+        return
@@ -7,55 +7,213 @@ import pandas as pd
 from pathlib import Path
 
 import arcpy
-from arcgis.gis import Item
+from arcgis.gis import GIS, Item
+from arcgis.features import FeatureLayer
+from arcgis._impl.common._mixins import PropertyMap
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
 from src.functions import meta
-from src.constants.paths import SHP_DIR, PORTAL_ITEM_URL
-from src.constants.values import PROJECT_SPATIAL_REFERENCE
+from src.classes.nameregistry import FeatureClassNameRegistry
+from src.classes.projectboundary import ProjectBoundary, boundaryPath, getProjectBoundary
+from src.constants.paths import PORTAL_ITEM_URL
+from src.constants.values import PROJECT_SPATIAL_REFERENCE, RECORD_CHUNK_SIZE, FIELD_DTYPES
 #################################################################################################################################################################################
 logger = logging.getLogger("root.servicelayer")
 #################################################################################################################################################################################
 
+def serviceLayers(gis_conn:GIS, portal_obj:Item)->list:
+    """
+    Builds a ServiceLayer for every layer in a Feature Service from a single '<service>/layers' request.
+    Falls back to the item's layers (one request per layer) if the service definition can't be retrieved.
+    Args: GIS Connection, Feature Service Portal Item
+    Returns: List of ServiceLayer objects
+    """
+    service_url = portal_obj.url.rstrip("/")
+    try:
+        service_json = gis_conn._con.get(f"{service_url}/layers", {"f":"json"})
+        if "error" in service_json:
+            raise ValueError(service_json["error"])
+
+        return [ServiceLayer(gis_conn, FeatureLayer(f"{service_url}/{layer_json['id']}", gis=gis_conn), portal_obj, layer_properties=PropertyMap(layer_json)) for layer_json in service_json.get("layers", [])]
+    
+    except Exception as e:
+        logger.warning(f"!! Failed to retrieve Service Definition {service_url}...{e}")
+        return [ServiceLayer(gis_conn, layer_obj, portal_obj) for layer_obj in portal_obj.layers]
+
+
+class LazyAttribute():
+    """
+    Read-only attribute computed on first access and stored in the instance slot '_<name>'.
+    Works with __slots__ classes, which have no instance __dict__ for functools.cached_property to use.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.slot = f"_{func.__name__}"
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            value = self.func(instance)
+            setattr(instance, self.slot, value)
+            return value
+
+
+## Attributes derived from the layer and portal item JSON. Each one is computed on first access.
+_LAZY_ATTRIBUTES = ("layerProperties", "isMultilayer", "isHosted", "parentServiceName", "parentServiceUrl", "parentId", "portalItemUrl",
+                    "portalTitle", "portalCategories", "portalCategory", "portalCreatedDate", "portalModifiedDate", "portalDescription",
+                    "portalSummary", "portalTags", "portalCredits", "portalTermsOfUse", "layerName", "layerUrl", "layerId", "layerPortalUrl",
+                    "editingInfo", "layerSchemaEditDate", "layerDataEditDate", "layerPropertiesEditDate", "layerFields", "layerDescription",
+                    "layerCredits", "layerSpatialReferenceWkid", "projectBoundaryPath", "projectBoundary", "excelSheetName")
+
+
 class ServiceLayer():
-    def __init__(self, gis_conn, layer_obj, portal_obj):
-        self.logger = logging.getLogger("root.servicelayer.ServiceLayer")
+    __slots__ = ("gis_conn", "layer", "parentPortalItem") + tuple(f"_{name}" for name in _LAZY_ATTRIBUTES)
+
+    logger = logging.getLogger("root.servicelayer.ServiceLayer")
+
+    def __init__(self, gis_conn, layer_obj, portal_obj, layer_properties:PropertyMap=None):
         self.gis_conn = gis_conn
         self.layer = layer_obj
-        self.layerProperties = self.layer.properties
         self.parentPortalItem = portal_obj
-        self.isMultilayer = True if "Multilayer" in self.parentPortalItem["typeKeywords"] else False
-        self.isHosted = True if "Hosted Service" in self.parentPortalItem["typeKeywords"] else False
-        self.parentServiceName = self.parentPortalItem.name
-        self.parentServiceUrl = self.parentPortalItem.url
-        self.parentId = portal_obj.id
-        self.portalItemUrl = f"{PORTAL_ITEM_URL}{self.parentId}"
-        self.portalTitle = self.parentPortalItem.title
-        self.portalCategories = self.parentPortalItem.categories
-        self.portalCategory = self.portalCategories[0].split("/")[-1] if self.portalCategories else None
-        self.portalCreatedDate = self.parentPortalItem.created ## Return Epoch
-        self.portalModifiedDate = self.parentPortalItem.modified ## Return Epoch
-        self.portalDescription = self.parentPortalItem.description
-        self.portalSummary = self.parentPortalItem.snippet
-        self.portalTags = self.parentPortalItem.tags
-        self.portalCredits = self.parentPortalItem.accessInformation
-        self.portalTermsOfUse = self.parentPortalItem.licenseInfo
-        self.layerName = self.layerProperties["name"]
-        self.layerUrl = layer_obj.url
-        self.layerId = self.layerProperties["id"]
-        self.layerPortalUrl = f"{self.portalItemUrl}&sublayer={self.layerId}"
-        self.layerSchemaEditDate = self.layerProperties["editingInfo"]["schemaLastEditDate"] if hasattr(self.layerProperties,"editingInfo") else None ## Return Epoch
-        self.layerDataEditDate = self.layerProperties["editingInfo"]["dataLastEditDate"] if hasattr(self.layerProperties,"editingInfo") else None## Return Epoch
-        self.layerPropertiesEditDate = self.layerProperties["editingInfo"]["lastEditDate"] if hasattr(self.layerProperties,"editingInfo") else None## Return Epoch
-        self.layerFields = self.layerProperties["fields"]  ## Returns a list of dictionaries 
-        self.layerDescription = self.layerProperties["description"]
-        self.layerCredits = self.layerProperties["copyrightText"]
-        self.layerSpatialReferenceWkid = self.layerProperties["spatialReference"]["latestWkid"] if hasattr(self.layerProperties, "spatialReference") else self.layerProperties["sourceSpatialReference"]["latestWkid"]
-        self.projectBoundaryPath = os.path.join(SHP_DIR, "project_boundaries",str(self.layerSpatialReferenceWkid), "projectboundary.shp") if self.isHosted else os.path.join(SHP_DIR, "project_boundaries",str(self.layerSpatialReferenceWkid), "projectboundary.shp")
+        ## The layer JSON is passed in when it has already been retrieved with the rest of the service (see serviceLayers).
+        if layer_properties is not None:
+            self._layerProperties = layer_properties
 
+    def __repr__(self):
+        return f"<ServiceLayer {self.layer.url}>"
 
-    @property
+    ### Layer/Portal Item Attributes ###
+    @LazyAttribute
+    def layerProperties(self):
+        return self.layer.properties
+
+    @LazyAttribute
+    def isMultilayer(self)->bool:
+        return True if "Multilayer" in self.parentPortalItem["typeKeywords"] else False
+
+    @LazyAttribute
+    def isHosted(self)->bool:
+        return True if "Hosted Service" in self.parentPortalItem["typeKeywords"] else False
+
+    @LazyAttribute
+    def parentServiceName(self):
+        return self.parentPortalItem.name
+
+    @LazyAttribute
+    def parentServiceUrl(self):
+        return self.parentPortalItem.url
+
+    @LazyAttribute
+    def parentId(self):
+        return self.parentPortalItem.id
+
+    @LazyAttribute
+    def portalItemUrl(self):
+        return f"{PORTAL_ITEM_URL}{self.parentId}"
+
+    @LazyAttribute
+    def portalTitle(self):
+        return self.parentPortalItem.title
+
+    @LazyAttribute
+    def portalCategories(self):
+        return self.parentPortalItem.categories
+
+    @LazyAttribute
+    def portalCategory(self):
+        return self.portalCategories[0].split("/")[-1] if self.portalCategories else None
+
+    @LazyAttribute
+    def portalCreatedDate(self):
+        return self.parentPortalItem.created ## Return Epoch
+
+    @LazyAttribute
+    def portalModifiedDate(self):
+        return self.parentPortalItem.modified ## Return Epoch
+
+    @LazyAttribute
+    def portalDescription(self):
+        return self.parentPortalItem.description
+
+    @LazyAttribute
+    def portalSummary(self):
+        return self.parentPortalItem.snippet
+
+    @LazyAttribute
+    def portalTags(self):
+        return self.parentPortalItem.tags
+
+    @LazyAttribute
+    def portalCredits(self):
+        return self.parentPortalItem.accessInformation
+
+    @LazyAttribute
+    def portalTermsOfUse(self):
+        return self.parentPortalItem.licenseInfo
+
+    @LazyAttribute
+    def layerName(self):
+        return self.layerProperties["name"]
+
+    @LazyAttribute
+    def layerUrl(self):
+        return self.layer.url
+
+    @LazyAttribute
+    def layerId(self):
+        return self.layerProperties["id"]
+
+    @LazyAttribute
+    def layerPortalUrl(self):
+        return f"{self.portalItemUrl}&sublayer={self.layerId}"
+
+    @LazyAttribute
+    def editingInfo(self):
+        return self.layerProperties["editingInfo"] if hasattr(self.layerProperties,"editingInfo") else None
+
+    @LazyAttribute
+    def layerSchemaEditDate(self):
+        return self.editingInfo["schemaLastEditDate"] if self.editingInfo else None ## Return Epoch
+
+    @LazyAttribute
+    def layerDataEditDate(self):
+        return self.editingInfo["dataLastEditDate"] if self.editingInfo else None ## Return Epoch
+
+    @LazyAttribute
+    def layerPropertiesEditDate(self):
+        return self.editingInfo["lastEditDate"] if self.editingInfo else None ## Return Epoch
+
+    @LazyAttribute
+    def layerFields(self):
+        return self.layerProperties["fields"]  ## Returns a list of dictionaries 
+
+    @LazyAttribute
+    def layerDescription(self):
+        return self.layerProperties["description"]
+
+    @LazyAttribute
+    def layerCredits(self):
+        return self.layerProperties["copyrightText"]
+
+    @LazyAttribute
+    def layerSpatialReferenceWkid(self):
+        return self.layerProperties["spatialReference"]["latestWkid"] if hasattr(self.layerProperties, "spatialReference") else self.layerProperties["sourceSpatialReference"]["latestWkid"]
+
+    @LazyAttribute
+    def projectBoundaryPath(self):
+        return boundaryPath(self.layerSpatialReferenceWkid)
+
+    @LazyAttribute
+    def projectBoundary(self)->ProjectBoundary:
+        ## Shared by every layer in the same spatial reference. Read or projected once per process.
+        return getProjectBoundary(self.layerSpatialReferenceWkid)
+
+    @LazyAttribute
     def excelSheetName(self):
         formatted = self.layerName.translate({ord(c): "" for c in "_ ,()|/\\"})
         excelSheetName=formatted[0:31]
@@ -122,15 +280,97 @@ class ServiceLayer():
         return out_dict
 
     def recordDf(self)->pd.DataFrame:
-        self._handleProjectBoundaryShp()
-        shp_geom = [i[0] for i in arcpy.da.SearchCursor(self.projectBoundaryPath, ["SHAPE@"])][0]
-        spatial_rel = "ENVELOPE_INTERSECTS"
+        return pd.concat(list(self.iterRecordChunks()), ignore_index=True)
+
+    def iterRecordChunks(self, chunk_size:int=RECORD_CHUNK_SIZE):
+        """
+        Streams the layer's records inside the project boundary envelope as DataFrames of at most chunk_size rows.
+        Pages through the REST query with resultOffset/resultRecordCount and filters by the boundary envelope on the server.
+        Layers that don't support pagination are paged by ObjectID instead (see _iterObjectIdPages).
+        Column dtypes are taken from the layer fields, so memory stays bounded no matter how large the layer is.
+        Args: Maximum number of records per chunk (capped at the layer's maxRecordCount)
+        Returns: Generator of DataFrames. At least one (possibly empty) DataFrame is yielded.
+        """
         fields = [field["name"] for field in self.layerFields]
-        df_columns = [f'{field["name"]} ({field["alias"]})' for field in self.layerFields]
-        records = [list(row) for row in arcpy.da.SearchCursor(self.layerUrl.replace("'",""), [fields], spatial_filter=shp_geom, spatial_relationship=spatial_rel)]
-        df = pd.DataFrame(data=records, columns=df_columns)
+        page_size = min(chunk_size, self.layerProperties["maxRecordCount"]) if hasattr(self.layerProperties, "maxRecordCount") else chunk_size
+
+        query = {"where":"1=1",
+                 "outFields":",".join(fields),
+                 "returnGeometry":"false",
+                 "geometry":json.dumps(self.projectBoundary.envelopeJson()),
+                 "geometryType":"esriGeometryEnvelope",
+                 "inSR":self.layerSpatialReferenceWkid,
+                 "spatialRel":"esriSpatialRelEnvelopeIntersects",
+                 "f":"json"}
+
+        if not self.supportsPagination:
+            self.logger.info(f"Pagination Not Supported. Paging by ObjectID: {self.layerUrl}")
+            yield from self._iterObjectIdPages(query, fields, page_size)
+            return
+
+        query.update({"orderByFields":self.layerProperties["objectIdField"] if hasattr(self.layerProperties, "objectIdField") else "",
+                      "resultRecordCount":page_size})
+
+        offset = 0
+        while True:
+            query["resultOffset"] = offset
+            result = self._query(query)
+
+            features = result.get("features", [])
+            if features or offset == 0:
+                yield self._recordChunk([feature["attributes"] for feature in features], fields)
+
+            offset += len(features)
+            self.logger.debug(f"Records Read: {offset}")
+            if not features or not result.get("exceededTransferLimit", False):
+                break
+
+    @property
+    def supportsPagination(self)->bool:
+        if not hasattr(self.layerProperties, "advancedQueryCapabilities"):
+            return False
+        capabilities = self.layerProperties["advancedQueryCapabilities"]
+
+        return bool(capabilities["supportsPagination"]) if "supportsPagination" in capabilities else False
+
+    def _iterObjectIdPages(self, query:dict, fields:list, page_size:int):
+        ## The ObjectIDs matching the query aren't limited by maxRecordCount, so they are read in one request and the records are requested page_size IDs at a time.
+        result = self._query(dict(query, returnIdsOnly="true", outFields=""))
+        object_ids = sorted(result.get("objectIds") or [])
+        if not object_ids:
+            yield self._recordChunk([], fields)
+            return
+
+        for start in range(0, len(object_ids), page_size):
+            result = self._query(dict(query, objectIds=",".join(str(i) for i in object_ids[start:start+page_size])))
+            yield self._recordChunk([feature["attributes"] for feature in result.get("features", [])], fields)
+            self.logger.debug(f"Records Read: {min(start + page_size, len(object_ids))}/{len(object_ids)}")
+
+    def _query(self, query:dict)->dict:
+        result = self.gis_conn._con.post(f"{self.layerUrl}/query", query)
+        if "error" in result:
+            raise RuntimeError(f"Query Failed: {self.layerUrl} {result['error']}")
+
+        return result
+
+    def _recordChunk(self, records:list, fields:list)->pd.DataFrame:
+        df = pd.DataFrame.from_records(records, columns=fields)
+        for field in self.layerFields:
+            dtype = FIELD_DTYPES.get(field["type"], "object")
+            if dtype == "datetime64[ms]":
+                df[field["name"]] = pd.to_datetime(df[field["name"]], unit="ms")
+            else:
+                df[field["name"]] = df[field["name"]].astype(dtype)
+
+        df.columns = self.recordColumns
 
         return df
+
+    @property
+    def recordColumns(self)->list:
+        ## The column names of the record DataFrames: "Name (Alias)".
+        return [f'{field["name"]} ({field["alias"]})' for field in self.layerFields]
+
     
 
     @staticmethod
@@ -144,63 +384,52 @@ class ServiceLayer():
             return "No Available Date"
     
 
-    def _handleProjectBoundaryShp(self):
-        base_shp = os.path.join(SHP_DIR,"project_boundaries", str(PROJECT_SPATIAL_REFERENCE.factoryCode), "projectboundary.shp")
-    
-        if os.path.exists(self.projectBoundaryPath):
-            pass
+    def exportTask(self, out_workspace, name_registry:FeatureClassNameRegistry=None)->dict:
+        """
+        Reserves the Feature Class name for the layer and returns everything needed to export it.
+        The dictionary only holds plain values so it can be sent to a worker process.
+        Args: Output Workspace (File GDB or Feature Dataset), FeatureClassNameRegistry
+        Returns: Dictionary of the export and Feature Class metadata values
+        """
+        metadata_dict = {}
+        ## The backup run passes in one registry for the whole GDB. Without one the current workspace is listed.
+        if name_registry is None:
+            name_registry = FeatureClassNameRegistry.fromWorkspace(arcpy.env.workspace)
+        formatted_layer_name = name_registry.reserve(self.layerName)
+        ## Need to add logic to replace leading digits
 
-        else:
-            self.logger.info("Creating New Shapefile...")
-            if not os.path.exists(os.path.dirname(self.projectBoundaryPath)):
-                os.makedirs(os.path.dirname(self.projectBoundaryPath))
-            arcpy.management.Project(base_shp, self.projectBoundaryPath, arcpy.SpatialReference(self.layerSpatialReferenceWkid))
+        metadata_dict["Feature Class Name"]=formatted_layer_name
+        metadata_dict["Feature Class Path"]=os.path.join(out_workspace, formatted_layer_name)
+        metadata_dict["Layer Name"]=self.layerName
+        metadata_dict["Layer URL"]=self.layerUrl
+        metadata_dict["Service Item Id"]=self.parentId
+        metadata_dict["Service Credits"]=self.portalCredits
+        metadata_dict["Spatial Reference"]=self.layerSpatialReferenceWkid
 
-        return 
-    
-    
-    
+        return metadata_dict
 
-    def exportLayer(self, out_workspace):
-        metadata_dict = {}
-        feature_names = [f for dataset in arcpy.ListDatasets(feature_type="Feature") for f in arcpy.ListFeatureClasses(feature_dataset=dataset)]
-        formatted_layer_name = self.layerName.translate({ord(c): "_" for c in "!@#$%^&*()[] {};:,./<>?\|`~-=_+"})
-        ## Need to add logic to replace leading digits
+    def exportLayer(self, out_workspace, name_registry:FeatureClassNameRegistry=None):
+        metadata_dict = self.exportTask(out_workspace, name_registry)
         
-        count = 1
-        while True:
-            if formatted_layer_name not in feature_names:
-                break
-            else:
-                if count==1:
-                    formatted_layer_name = f"{formatted_layer_name}_{count}"
-                else:
-                    formatted_layer_name = f"{formatted_layer_name.rsplit('_',1)[0]}_{count}"
-
-                count+=1
-        self.logger.info(f"Formatted Name: {formatted_layer_name}")
+        self.logger.info(f"Formatted Name: {metadata_dict['Feature Class Name']}")
         self.logger.info(f"Layer Spatial Reference: {self.layerSpatialReferenceWkid}")
-        self._handleProjectBoundaryShp()
-
         try:
             self.logger.info("Exporting...")
-            featureclass_path = os.path.join(out_workspace, formatted_layer_name)
-            with arcpy.EnvManager(outputCoordinateSystem=PROJECT_SPATIAL_REFERENCE, preserveGlobalIds=True, extent=self.projectBoundaryPath):
-                arcpy.conversion.ExportFeatures(in_features=self.layerUrl,
-                                                out_features=featureclass_path)
+            exportFeatures(self.layerUrl, metadata_dict["Feature Class Path"], self.layerSpatialReferenceWkid)
         except Exception as f:
             self.logger.error(f"{self.layerName:30s} {self.parentId:30s}")
             arcpy.AddWarning(f"Layer Failed to Export:\n{self.layerName:30s} {self.parentId:30s}")
-
-        metadata_dict["Feature Class Name"]=formatted_layer_name
-        metadata_dict["Feature Class Path"]=featureclass_path
-        metadata_dict["Layer Name"]=self.layerName
-        metadata_dict["Layer URL"]=self.layerUrl
-        metadata_dict["Service Item Id"]=self.parentId
-        metadata_dict["Service Credits"]=self.portalCredits
+            raise
 
         return metadata_dict
 
-        
 
+def exportFeatures(layer_url:str, featureclass_path:str, wkid)->None:
+    """
+    Purpose: Exports the layer's features inside the project boundary to the Feature Class in the project spatial reference. GlobalIDs are preserved.
+    """
+    with arcpy.EnvManager(outputCoordinateSystem=PROJECT_SPATIAL_REFERENCE, preserveGlobalIds=True, extent=getProjectBoundary(wkid).extent):
+        arcpy.conversion.ExportFeatures(in_features=layer_url,
+                                        out_features=featureclass_path)
 
+    return
@@ -15,6 +15,22 @@ SHP_DIR = Path(ROOT_DIR, "src", "shp")
 
 OUTPUTS_DIR = Path(ROOT_DIR, "outputs")
 
+CATALOG_CACHE_DIR = Path(OUTPUTS_DIR, "CatalogCache")
+
+CATALOG_SNAPSHOT_DIR = Path(OUTPUTS_DIR, "CatalogSnapshots")
+
+MD_ITEM_CACHE_PATH = Path(CATALOG_CACHE_DIR, "md_item_cache")
+
+METADATA_LEDGER_PATH = Path(OUTPUTS_DIR, "MetadataLedger", "metadata_push_ledger.sqlite")
+
+BACKUP_MANIFEST_PATH = Path(OUTPUTS_DIR, "BackupServices", "manifest", "backup_manifest.json")
+
+CHANGE_TRACKING_DIR = Path(OUTPUTS_DIR, "BackupServices", "changetracking")
+
+CHANGE_TRACKING_LEDGER_PATH = Path(CHANGE_TRACKING_DIR, "change_tracking.sqlite")
+
+CHANGE_TRACKING_BASELINE_GDB = Path(CHANGE_TRACKING_DIR, "Baseline.gdb")
+
 ## AGOL Paths
 PORTAL_URL = "https://hcfcd-safer.maps.arcgis.com/"
 
@@ -40,6 +56,8 @@ INTRANET_ARCHIVE = Path(INTRANET_ROOT_DIR, "7.2_WIP","Data","_Archive")
 
 INTRANET_BACKUP_DIR = os.path.join(INTRANET_ARCHIVE, "BackupServices")
 
+INTRANET_BACKUP_STORE_DIR = os.path.join(INTRANET_ARCHIVE, "BackupStore")
+
 INTRANET_APPENDIX_H_DIR = os.path.join(INTRANET_ARCHIVE, "AppendixReports")
 
 INTRANET_APPENDIX_E_DIR = os.path.join(INTRANET_ARCHIVE, "DataCatalog")
@@ -1,13 +1,95 @@
-import arcpy
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-PROJECT_SPATIAL_REFERENCE = arcpy.SpatialReference(2278)
+## arcpy is only needed for the spatial reference. Without it (outside the ArcGIS Pro environment, e.g. the tests) the other values still import.
+try:
+    import arcpy
+    PROJECT_SPATIAL_REFERENCE = arcpy.SpatialReference(2278)
+except ImportError:
+    PROJECT_SPATIAL_REFERENCE = None
 
 SHEET_NAME = "Test Data Catalog"
 
+## Data Catalog columns read by the catalog tools and the dtypes they are loaded with.
+CATALOG_DTYPES = {"Initial Screening Criteria":"category",
+                  "Data Name":"object",
+                  "Table Name":"object",
+                  "Provider":"object",
+                  "AGOL Item ID":"object"}
+
+CATALOG_COLUMNS = list(CATALOG_DTYPES.keys())
+
+## Characters that are not allowed in a Data Catalog 'Table Name'.
+SPECIAL_CHARACTERS = ':<>–/\" |?*\'%);(^#@!&-'
+
+LINT_SHEET_NAME = "CatalogLint"
+
+## Number of converted metadata strings held in memory by meta.formatMdItem.
+MD_ITEM_CACHE_SIZE = 4096
+
+## Number of AGOL item updates sent at the same time by meta.updateMetadataBatch.
+METADATA_PUSH_WORKERS = 8
+
+## Number of worker processes used by a parallel Backup Services run, and the seed that fixes how layers are split between them.
+BACKUP_WORKERS = 4
+
+BACKUP_PARTITION_SEED = 203
+
+## Average, minimum and maximum size of the content-defined chunks BackupStore splits backup files into. The average must be a power of two.
+BACKUP_STORE_CHUNK_SIZE = 1024 * 1024
+
+BACKUP_STORE_MIN_CHUNK_SIZE = 256 * 1024
+
+BACKUP_STORE_MAX_CHUNK_SIZE = 4 * 1024 * 1024
+
+## Threads used to compress archive members (None uses every core), the zlib level, and when a file is stored instead of deflated:
+# a file is deflated only if a sample of its first ARCHIVE_SAMPLE_SIZE bytes compresses below ARCHIVE_STORE_RATIO of its size.
+ARCHIVE_WORKERS = None
+
+ARCHIVE_COMPRESS_LEVEL = 6
+
+ARCHIVE_STORE_RATIO = 0.9
+
+ARCHIVE_SAMPLE_SIZE = 1024 * 1024
+
+## Compressed members larger than this are spooled to a temporary file instead of memory while they wait to be written.
+ARCHIVE_SPOOL_SIZE = 64 * 1024 * 1024
+
+## Chunk size and number of parallel streams used by transfer.copyFile, and how many times (and how many seconds apart, times the attempt) a chunk is retried.
+COPY_CHUNK_SIZE = 32 * 1024 * 1024
+
+COPY_STREAMS = 4
+
+COPY_RETRIES = 5
+
+COPY_RETRY_SECONDS = 10
+
+## Number of times transfer.copyFileOrDiscard resumes an interrupted copy in the same run before it gives up and deletes the partial file.
+COPY_ATTEMPTS = 3
+
+## Seconds between status checks of an asynchronous extractChanges request, and how long to wait before giving up on it.
+EXTRACT_CHANGES_POLL_SECONDS = 5
+
+EXTRACT_CHANGES_TIMEOUT = 900
+
+## Number of records read per REST query page by ServiceLayer.iterRecordChunks.
+RECORD_CHUNK_SIZE = 2000
+
+## pandas dtypes used for each Esri field type when layer records are read into DataFrames. Unlisted types are read as object.
+FIELD_DTYPES = {"esriFieldTypeOID":"Int64",
+                "esriFieldTypeSmallInteger":"Int16",
+                "esriFieldTypeInteger":"Int32",
+                "esriFieldTypeBigInteger":"Int64",
+                "esriFieldTypeSingle":"float32",
+                "esriFieldTypeDouble":"float64",
+                "esriFieldTypeString":"string",
+                "esriFieldTypeGUID":"string",
+                "esriFieldTypeGlobalID":"string",
+                "esriFieldTypeDate":"datetime64[ms]"}
+
+METADATA_STATUS_COLUMNS = ["Table Name", "AGOL Item ID", "Local Status", "Local Fields", "Service Status", "Service Fields"]
 
 DF_COLUMNS = ["Local - Exist",  
               "Service - Exist", 
@@ -0,0 +1,241 @@
+#######################################################################################################################################################
+## Logging
+import logging
+logger = logging.getLogger("root.archive")
+#######################################################################################################################################################
+## Libraries
+import os
+import sys
+import zlib
+import time
+import struct
+import datetime
+import tempfile
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+if str(Path(__file__).resolve().parents[2]) not in sys.path:
+    sys.path.insert(0,str(Path(__file__).resolve().parents[2]))
+
+from src.constants.values import ARCHIVE_WORKERS, ARCHIVE_COMPRESS_LEVEL, ARCHIVE_STORE_RATIO, ARCHIVE_SAMPLE_SIZE, ARCHIVE_SPOOL_SIZE
+#######################################################################################################################################################
+## ZIP record layouts (APPNOTE 6.3). Every archive is written with ZIP64 records wherever a size, offset or count needs them.
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+_UTF8_FLAG = 0x800
+_VERSION = 45 ## ZIP64
+_LIMIT = 0xFFFFFFFF ## Values at or above this are written as 0xFFFFFFFF with the real value in the ZIP64 record
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_ZIP64_END = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_LOCATOR = struct.Struct("<IIQI")
+_END = struct.Struct("<IHHHHIIH")
+_READ_SIZE = 1024 * 1024
+#######################################################################################################################################################
+## Functions
+def fgdbMembers(gdb_path:str, prefix:str=None)->list:
+    """
+    Lists the files of a File GDB to archive. Lock files are skipped.
+    Args: File GDB Path, Folder name inside the archive (defaults to the GDB name, "" for none)
+    Returns: List of (File Path, Archive Name)
+    """
+    prefix = os.path.basename(gdb_path.rstrip("\\/")) if prefix is None else prefix
+    members = []
+    for root, dirs, files in os.walk(gdb_path):
+        for file in sorted(files):
+            if not file.endswith(".lock"):
+                file_path = os.path.join(root, file)
+                members.append((file_path, Path(prefix, os.path.relpath(file_path, gdb_path)).as_posix()))
+
+    return members
+
+
+def _dosDateTime(timestamp:float)->tuple:
+    stamp = datetime.datetime.fromtimestamp(max(timestamp, 315532800)) ## ZIP dates start at 1980
+    return (stamp.hour << 11) | (stamp.minute << 5) | (stamp.second // 2), ((stamp.year - 1980) << 9) | (stamp.month << 5) | stamp.day
+
+
+def _isCompressible(file_path:str, compresslevel:int)->bool:
+    ## Deflating a sample of the file tells us whether the whole file is worth deflating (compressed gdb tables aren't).
+    with open(file_path, "rb") as f:
+        sample = f.read(ARCHIVE_SAMPLE_SIZE)
+    if not sample:
+        return False
+
+    return len(zlib.compress(sample, compresslevel)) < len(sample) * ARCHIVE_STORE_RATIO
+
+
+def _prepareMember(file_path:str, arcname:str, compresslevel:int)->dict:
+    """
+    Runs in a worker thread (zlib releases the GIL, so the threads compress in parallel).
+    Deflated members are compressed into a spooled temporary file. Stored members are only read for their CRC here and
+    copied straight from the source when they are written.
+    """
+    member = {"path":file_path, "arcname":arcname, "crc":0, "size":0, "compressed_size":0, "method":ZIP_STORED, "spool":None}
+    member["time"], member["date"] = _dosDateTime(os.stat(file_path).st_mtime)
+
+    if _isCompressible(file_path, compresslevel):
+        spool = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE)
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+        with open(file_path, "rb") as f:
+            for data in iter(lambda: f.read(_READ_SIZE), b""):
+                member["crc"] = zlib.crc32(data, member["crc"])
+                member["size"] += len(data)
+                spool.write(compressor.compress(data))
+        spool.write(compressor.flush())
+        member["compressed_size"] = spool.tell()
+
+        ## The sample can be misleading. A member that didn't shrink is stored instead.
+        if member["compressed_size"] < member["size"]:
+            spool.seek(0)
+            member["method"] = ZIP_DEFLATED
+            member["spool"] = spool
+            return member
+        spool.close()
+
+    else:
+        with open(file_path, "rb") as f:
+            for data in iter(lambda: f.read(_READ_SIZE), b""):
+                member["crc"] = zlib.crc32(data, member["crc"])
+                member["size"] += len(data)
+
+    member["compressed_size"] = member["size"]
+
+    return member
+
+
+def _field(value:int)->int:
+    return 0xFFFFFFFF if value >= _LIMIT else value
+
+
+def _zip64Extra(values:list)->bytes:
+    return struct.pack("<HH", 0x0001, 8 * len(values)) + b"".join(struct.pack("<Q", v) for v in values)
+
+
+class _CountingWriter():
+    ## Tracks the number of bytes written so the archive can be streamed to a file that can't seek.
+    def __init__(self, file_obj):
+        self.file_obj = file_obj
+        self.offset = 0
+
+    def write(self, data:bytes)->None:
+        self.file_obj.write(data)
+        self.offset += len(data)
+
+
+def _writeMember(writer:_CountingWriter, member:dict)->None:
+    name = member["arcname"].encode("utf-8")
+    member["offset"] = writer.offset
+    zip64 = member["size"] >= _LIMIT or member["compressed_size"] >= _LIMIT
+    extra = _zip64Extra([member["size"], member["compressed_size"]]) if zip64 else b""
+
+    writer.write(_LOCAL_HEADER.pack(0x04034b50, _VERSION, _UTF8_FLAG, member["method"], member["time"], member["date"], member["crc"],
+                                    0xFFFFFFFF if zip64 else member["compressed_size"], 0xFFFFFFFF if zip64 else member["size"], len(name), len(extra)))
+    writer.write(name)
+    writer.write(extra)
+    member["data_offset"] = writer.offset
+
+    source = member["spool"] if member["spool"] else open(member["path"], "rb")
+    try:
+        for data in iter(lambda: source.read(_READ_SIZE), b""):
+            writer.write(data)
+    finally:
+        source.close()
+
+    return
+
+
+def _writeCentralDirectory(writer:_CountingWriter, members:list)->None:
+    cd_offset = writer.offset
+    for member in members:
+        name = member["arcname"].encode("utf-8")
+        zip64_values = [v for v in [member["size"], member["compressed_size"], member["offset"]] if v >= _LIMIT]
+        extra = _zip64Extra(zip64_values) if zip64_values else b""
+        writer.write(_CENTRAL_HEADER.pack(0x02014b50, _VERSION, _VERSION, _UTF8_FLAG, member["method"], member["time"], member["date"], member["crc"],
+                                          _field(member["compressed_size"]), _field(member["size"]), len(name), len(extra), 0, 0, 0,
+                                          0o100644 << 16, _field(member["offset"])))
+        writer.write(name)
+        writer.write(extra)
+
+    cd_size = writer.offset - cd_offset
+    count = len(members)
+    if count >= 0xFFFF or cd_size >= _LIMIT or cd_offset >= _LIMIT:
+        zip64_end_offset = writer.offset
+        writer.write(_ZIP64_END.pack(0x06064b50, 44, _VERSION, _VERSION, 0, 0, count, count, cd_size, cd_offset))
+        writer.write(_ZIP64_LOCATOR.pack(0x07064b50, 0, zip64_end_offset, 1))
+
+    writer.write(_END.pack(0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF), _field(cd_size), _field(cd_offset), 0))
+
+    return
+
+
+def _indexMember(arcname:str, data:bytes)->dict:
+    ## The index is built after the other members are written, so it is stored from memory as the last member.
+    member = {"path":None, "arcname":arcname, "crc":zlib.crc32(data), "size":len(data), "compressed_size":len(data), "method":ZIP_STORED,
+              "spool":tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE)}
+    member["time"], member["date"] = _dosDateTime(time.time())
+    member["spool"].write(data)
+    member["spool"].seek(0)
+
+    return member
+
+
+def writeArchive(destination, members:list, workers:int=ARCHIVE_WORKERS, compresslevel:int=ARCHIVE_COMPRESS_LEVEL, index=None)->dict:
+    """
+    Writes a ZIP archive in a single pass. Members are compressed in parallel threads, already-compressed files (e.g. compressed
+    gdb tables) are stored instead of deflated, and the archive is written front to back so it can be streamed straight to its
+    destination. Sizes and offsets past 4 GB are written as ZIP64.
+    Every written member records the offset of its data ('data_offset') so it can be read back without the zip module.
+    Args: Destination (path or writable binary file object), List of (File Path, Archive Name), Number of threads (None uses every core), zlib level,
+          Optional function called with the written members that returns (Archive Name, bytes) of an index written as the last member
+    Returns: Dictionary of the archive statistics
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    ## A path is written under a temporary name and renamed once complete, so a failed run never leaves a truncated archive.
+    temp_path = f"{destination}.tmp" if isinstance(destination, (str, Path)) else None
+    file_obj = open(temp_path, "wb") if temp_path else destination
+
+    written = []
+    try:
+        writer = _CountingWriter(file_obj)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            ## At most two members per thread are in flight, which keeps the spooled data bounded. They are written in order.
+            pending = deque()
+            for file_path, arcname in members:
+                pending.append(executor.submit(_prepareMember, file_path, arcname, compresslevel))
+                if len(pending) >= workers * 2:
+                    member = pending.popleft().result()
+                    _writeMember(writer, member)
+                    written.append(member)
+            while pending:
+                member = pending.popleft().result()
+                _writeMember(writer, member)
+                written.append(member)
+
+        if index:
+            member = _indexMember(*index(written))
+            _writeMember(writer, member)
+            written.append(member)
+
+        _writeCentralDirectory(writer, written)
+    except Exception:
+        if temp_path:
+            file_obj.close()
+            os.remove(temp_path)
+        raise
+
+    if temp_path:
+        file_obj.close()
+        os.replace(temp_path, destination)
+
+    stats = {"Members":len(written),
+             "Stored":len([m for m in written if m["method"] == ZIP_STORED]),
+             "Size":sum(m["size"] for m in written),
+             "Archive Size":writer.offset,
+             "Seconds":round(time.perf_counter() - start, 2)}
+    logger.info(f"Archive Written: {destination} | {stats}")
+
+    return stats
@@ -0,0 +1,145 @@
+#######################################################################################################################################################
+## Logging
+import logging
+logger = logging.getLogger("root.changetracking")
+#######################################################################################################################################################
+## Libraries
+import sys
+import json
+import time
+from pathlib import Path
+
+if str(Path(__file__).resolve().parents[2]) not in sys.path:
+    sys.path.insert(0,str(Path(__file__).resolve().parents[2]))
+
+from src.constants.values import RECORD_CHUNK_SIZE, EXTRACT_CHANGES_POLL_SECONDS, EXTRACT_CHANGES_TIMEOUT
+#######################################################################################################################################################
+## Functions
+## The REST side of a delta backup: reading server generations, requesting the change set and planning how it is applied.
+## Applying it to the baseline needs arcpy and lives in src/classes/deltabackup.py.
+def normaliseGlobalId(value)->str:
+    """
+    Purpose: GlobalIDs come back from REST with or without braces and in either case. They are compared as '{UPPER}'.
+    """
+    return "{" + str(value).strip("{}").upper() + "}"
+
+
+def serviceServerGens(gis_conn, service_url:str)->dict:
+    """
+    Reads the current server generation of every layer in a Feature Service with change tracking enabled.
+    Args: GIS Connection, Feature Service URL
+    Returns: Dictionary of Layer ID: serverGen. Empty if change tracking isn't enabled on the service.
+    """
+    try:
+        service_json = gis_conn._con.get(service_url.rstrip("/"), {"f":"json"})
+    except Exception as e:
+        logger.warning(f"!! Failed to retrieve Service Definition {service_url}...{e}")
+        return {}
+
+    if "ChangeTracking" not in service_json.get("capabilities", ""):
+        return {}
+
+    return {gen["id"]:gen["serverGen"] for gen in service_json.get("changeTrackingInfo", {}).get("layerServerGens", [])}
+
+
+def supportsDelta(sl_obj)->bool:
+    ## Changes are applied by GlobalID, so layers without GlobalIDs always get a full export.
+    return bool(sl_obj.layerProperties["hasGlobalIds"]) if hasattr(sl_obj.layerProperties, "hasGlobalIds") else False
+
+
+def _envelopeFilter(sl_obj)->dict:
+    return {"geometry":json.dumps(sl_obj.projectBoundary.envelopeJson()),
+            "geometryType":"esriGeometryEnvelope",
+            "inSR":sl_obj.layerSpatialReferenceWkid}
+
+
+def _waitForResult(gis_conn, result:dict)->dict:
+    ## Large change sets are returned asynchronously. The status is polled until the result file is ready.
+    start = time.time()
+    while "statusUrl" in result:
+        status = gis_conn._con.get(result["statusUrl"], {"f":"json"})
+        if status.get("status") == "Completed":
+            return gis_conn._con.get(status["resultUrl"], {"f":"json"})
+        if status.get("status") in ["Failed", "CompletedWithErrors"]:
+            raise RuntimeError(f"extractChanges Failed: {status}")
+        if time.time() - start > EXTRACT_CHANGES_TIMEOUT:
+            raise TimeoutError(f"extractChanges Timed Out: {result['statusUrl']}")
+        time.sleep(EXTRACT_CHANGES_POLL_SECONDS)
+
+    return result
+
+
+def extractChanges(gis_conn, sl_obj, server_gen:int)->dict:
+    """
+    Requests the adds, updates and deletes made to the layer since server_gen, inside the project boundary envelope.
+    Args: GIS Connection, ServiceLayer, serverGen of the baseline
+    Returns: Dictionary with the layer's new 'serverGen' and its 'adds', 'updates' and 'deleteIds'
+    """
+    params = {"layers":json.dumps([sl_obj.layerId]),
+              "layerServerGens":json.dumps([{"id":sl_obj.layerId, "serverGen":server_gen}]),
+              "returnInserts":"true",
+              "returnUpdates":"true",
+              "returnDeletes":"true",
+              "returnIdsOnly":"false",
+              "dataFormat":"json",
+              "f":"json"}
+    params.update(_envelopeFilter(sl_obj))
+
+    result = gis_conn._con.post(f"{sl_obj.parentServiceUrl.rstrip('/')}/extractChanges", params)
+    if "error" in result:
+        raise RuntimeError(f"extractChanges Failed: {sl_obj.layerUrl} {result['error']}")
+    result = _waitForResult(gis_conn, result)
+
+    new_gen = [g["serverGen"] for g in result.get("layerServerGens", []) if g["id"] == sl_obj.layerId]
+    edits = [e for e in result.get("edits", []) if e["id"] == sl_obj.layerId]
+    features = edits[0].get("features", {}) if edits else {}
+
+    return {"serverGen":new_gen[0] if new_gen else server_gen,
+            "adds":features.get("adds", []),
+            "updates":features.get("updates", []),
+            "deleteIds":features.get("deleteIds", [])}
+
+
+def planChanges(changes:dict, deleted_global_ids:list, global_id_field:str)->tuple:
+    """
+    Turns a change set into the rows to remove from the baseline and the features to append to it.
+    Updated and added features are removed by GlobalID before they are appended, so replaying a change set gives the same baseline.
+    Args: Change set from extractChanges, GlobalIDs of the deleted features, GlobalID field name
+    Returns: (Set of GlobalIDs to remove, List of features to append)
+    """
+    features = changes["adds"] + changes["updates"]
+    remove = {normaliseGlobalId(g) for g in deleted_global_ids}
+    remove.update([normaliseGlobalId(f["attributes"][global_id_field]) for f in features])
+
+    return remove, features
+
+
+def objectIdPairs(gis_conn, sl_obj):
+    """
+    Purpose: Pages through the ObjectIDs and GlobalIDs of the features inside the project boundary envelope. Yields (ObjectID, GlobalID).
+    """
+    object_id_field = sl_obj.layerProperties["objectIdField"]
+    global_id_field = sl_obj.layerProperties["globalIdField"]
+    query = {"where":"1=1",
+             "outFields":f"{object_id_field},{global_id_field}",
+             "returnGeometry":"false",
+             "spatialRel":"esriSpatialRelEnvelopeIntersects",
+             "orderByFields":object_id_field,
+             "resultRecordCount":RECORD_CHUNK_SIZE,
+             "f":"json"}
+    query.update(_envelopeFilter(sl_obj))
+
+    offset = 0
+    while True:
+        query["resultOffset"] = offset
+        result = gis_conn._con.post(f"{sl_obj.layerUrl}/query", query)
+        if "error" in result:
+            raise RuntimeError(f"Query Failed: {sl_obj.layerUrl} {result['error']}")
+
+        features = result.get("features", [])
+        for feature in features:
+            yield feature["attributes"][object_id_field], feature["attributes"][global_id_field]
+
+        offset += len(features)
+        if not features or not result.get("exceededTransferLimit", False):
+            break
@@ -0,0 +1,94 @@
+#######################################################################################################################################################
+## Logging
+import logging
+logger = logging.getLogger("root.lint")
+#######################################################################################################################################################
+## Libraries
+import os
+import re
+import sys
+from pathlib import Path
+
+import pandas as pd
+from pandas import DataFrame
+
+if str(Path(__file__).resolve().parents[2]) not in sys.path:
+    sys.path.insert(0,str(Path(__file__).resolve().parents[2]))
+
+from src.constants.values import SPECIAL_CHARACTERS, LINT_SHEET_NAME
+#######################################################################################################################################################
+## Compiled Patterns
+SPECIAL_CHARACTERS_RE = re.compile(f"[{re.escape(SPECIAL_CHARACTERS)}]")
+AGOL_ITEM_ID_RE = re.compile(r"^[0-9a-fA-F]{32}$")
+
+LINT_COLUMNS = ["Excel Index", "Table Name", "Column", "Rule", "Severity", "Problem"]
+#######################################################################################################################################################
+## Functions
+def hasSpecialCharacters(text)->bool:
+    return bool(SPECIAL_CHARACTERS_RE.search(str(text)))
+
+
+def _asText(series:pd.Series)->pd.Series:
+    ## Missing values become empty strings so every rule can run as a single string operation over the column.
+    return series.astype("object").where(series.notna(), "").astype(str).str.strip()
+
+
+def lintCatalog(catalog_df:DataFrame)->DataFrame:
+    """
+    Runs every catalog rule over whole columns at once.
+    Rules: special characters in 'Table Name', duplicate 'Table Name', malformed 'AGOL Item ID' (not 32 hex characters)
+    and missing 'Initial Screening Criteria'.
+    Args: Data Catalog DataFrame
+    Returns: DataFrame with one row per problem (LINT_COLUMNS). Severity is 'Error' for problems that stop a tool and 'Warning' otherwise.
+    """
+    table_names = _asText(catalog_df["Table Name"])
+    item_ids = _asText(catalog_df["AGOL Item ID"])
+    categories = _asText(catalog_df["Initial Screening Criteria"])
+
+    rules = [
+        ("Special Characters", "Table Name", "Error", "'Table Name' Contains invalid Characters.",
+         table_names.str.contains(SPECIAL_CHARACTERS_RE)),
+        ("Duplicate Table Name", "Table Name", "Warning", "'Table Name' is listed more than once.",
+         (table_names != "") & table_names.duplicated(keep=False)),
+        ("Malformed Item ID", "AGOL Item ID", "Error", "'AGOL Item ID' is not a 32 character hexadecimal ID.",
+         (item_ids != "") & ~item_ids.str.match(AGOL_ITEM_ID_RE)),
+        ("Missing Screening Criteria", "Initial Screening Criteria", "Warning", "'Initial Screening Criteria' is empty.",
+         categories == ""),
+    ]
+
+    excel_index = pd.Series(catalog_df.index, index=catalog_df.index) + 2
+    lint_frames = []
+    for rule, column, severity, problem, mask in rules:
+        mask = mask.to_numpy(dtype=bool)
+        if not mask.any():
+            continue
+        rule_excel_index = excel_index[mask].astype(int)
+        lint_frames.append(DataFrame({"Excel Index":rule_excel_index,
+                                      "Table Name":catalog_df["Table Name"][mask],
+                                      "Column":column,
+                                      "Rule":rule,
+                                      "Severity":severity,
+                                      "Problem":"The input at index: " + rule_excel_index.astype(str) + " " + problem}))
+
+    if not lint_frames:
+        return DataFrame(columns=LINT_COLUMNS)
+
+    lint_df = pd.concat(lint_frames, ignore_index=True)[LINT_COLUMNS]
+    logger.info(f"Catalog Lint: {(lint_df['Severity'] == 'Error').sum()} Errors, {(lint_df['Severity'] == 'Warning').sum()} Warnings")
+
+    return lint_df.sort_values(["Excel Index", "Rule"], kind="stable").reset_index(drop=True)
+
+
+def exportLintReport(lint_df:DataFrame, excel_path, sheet_name:str=LINT_SHEET_NAME)->None:
+    """
+    Purpose: Writes the lint results to their own sheet. The sheet is added to the workbook if it already exists.
+    """
+    logger.info(f"Exporting Catalog Lint Sheet...")
+    if os.path.exists(excel_path):
+        with pd.ExcelWriter(excel_path, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
+            lint_df.to_excel(writer, sheet_name=sheet_name, index=False)
+    else:
+        with pd.ExcelWriter(excel_path) as writer:
+            lint_df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    return
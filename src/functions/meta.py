@@ -5,8 +5,12 @@ logger = logging.getLogger("root.meta")
 #######################################################################################################################################################
 ## Libraries
 import sys
-import re
+import shelve
+import hashlib
 from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pandas import DataFrame
 from bs4 import BeautifulSoup
 from bs4.element import Tag
 
@@ -17,103 +21,247 @@ if str(Path(__file__).resolve().parents[2]) not in sys.path:
 
 
 from src.classes.datacatalog import DataCatalogRow
+from src.classes.metadatacomparison import MetadataComparison, DOES_NOT_EXIST, MISSING
+from src.classes.pushledger import MetadataPushLedger, metadataHash
 from src.constants.values import *
+from src.constants.paths import MD_ITEM_CACHE_PATH
 
+#######################################################################################################################################################
+## Caches
+## Converted metadata text keyed by a hash of (text, md_item, text_type). Boilerplate credits and license text repeats across most items.
+_MD_ITEM_CACHE = OrderedDict()
+
+## Optional persistent tier. Opened with enableMdItemDiskCache().
+_MD_ITEM_DISK_CACHE = None
+
+## Bump when the conversion in _convertMdItem changes so stale disk entries are not reused.
+_MD_ITEM_CACHE_VERSION = 1
+
+_HTML_MD_ITEMS = ["description", "accessconstraints", "licenseinfo"]
+
+## Write statuses returned by the update functions.
+UPDATED = "Updated"
+UNCHANGED = "Unchanged"
+FAILED = "Failed"
+NOT_FOUND = "Not Found"
+SKIPPED = "Skipped"
 
 #######################################################################################################################################################
 ## Functions
-def updateMetadataObjects(row_obj:DataCatalogRow)->None:
+def updateMetadataObjects(row_obj:DataCatalogRow, diff_first:bool=False)->None:
     """
-    This 
+    This updates the File GDB item's metadata and then pushes it to the AGOL item.
+    With diff_first only the fields that differ from the current values are written.
     """
-    if row_obj.local_exist:
-        try:
-            md_ = md.Metadata(row_obj.gdb_item_path)
+    updateLocalMetadata(row_obj, diff_first=diff_first)
 
-            logger.info("-- Updating Master Metadata")
-            
-            md_.title = row_obj.formatTitle()
-            md_.description = row_obj.md_description
-            md_.summary = row_obj.formatSummary()
-            md_.tags = row_obj.formatTags_str()
-            md_.credits = row_obj.formatCredits()
-            md_.accessConstraints = row_obj.formatAccessConstraints()
+    if row_obj.service_exist:
+        updateServiceMetadata(row_obj.getServiceObject(), row_obj.createServiceMetadataDictionary(), diff_first=diff_first)
 
-            md_.save()
-        except Exception as e:
-            logger.warning(f"!! Failed to update Metadata...{e}")
+    return 
 
-    if row_obj.service_exist:
-        try:
-            logger.info("-- Updating Service Metadata")
 
-            item = row_obj.getServiceObject()
-            print(item.id, item)
-            print(f"Updating Service")
-            print(row_obj.createServiceMetadataDictionary())
-            item.update(item_properties=row_obj.createServiceMetadataDictionary())
+def updateLocalMetadata(row_obj:DataCatalogRow, diff_first:bool=False)->tuple:
+    """
+    Saves the formatted metadata to the File GDB item. arcpy.metadata isn't thread safe so this stays on the calling thread.
+    Args: DataCatalogRow, Only write the fields that differ from the current metadata
+    Returns: Tuple of the write status and the list of fields written
+    """
+    if not row_obj.local_exist:
+        return NOT_FOUND, []
 
-        except Exception as e:
-            logger.warning(f"!! Failed to update Metadata...{e}")
+    target = localMetadataTarget(row_obj)
 
+    if diff_first:
+        current = row_obj.md_snapshot
+        target = {md_item:value for md_item, value in target.items() if not _sameMetadataValue(getattr(current, md_item), value, md_item)}
+        if not target:
+            logger.info("-- Master Metadata Unchanged")
+            return UNCHANGED, []
 
+    try:
+        md_ = md.Metadata(row_obj.gdb_item_path)
 
-    return 
+        logger.info(f"-- Updating Master Metadata: {', '.join(target.keys())}")
+        
+        for md_item, value in target.items():
+            setattr(md_, md_item, value)
 
+        md_.save()
+        return UPDATED, list(target.keys())
+    except Exception as e:
+        logger.warning(f"!! Failed to update Metadata...{e}")
+        return FAILED, []
+    finally:
+        ## The row's metadata snapshot no longer reflects the saved item.
+        row_obj.invalidateMetadata()
 
 
-def getMetadata(row_obj:DataCatalogRow, md_items:list, text_type:str)->dict:
+def localMetadataTarget(row_obj:DataCatalogRow)->dict:
+    """
+    Purpose: The metadata the File GDB item should have, built from the Data Catalog row.
+    """
+    return {"title":row_obj.formatTitle(),
+            "description":row_obj.md_description,
+            "summary":row_obj.formatSummary(),
+            "tags":row_obj.formatTags_str(),
+            "credits":row_obj.formatCredits(),
+            "accessConstraints":row_obj.formatAccessConstraints()}
+
+
+def updateServiceMetadata(item, metadata_dictionary:dict, diff_first:bool=False)->tuple:
+    """
+    Pushes the metadata dictionary to the AGOL item. Only makes the portal request so it can be run from a worker thread.
+    Args: AGOL Item, Item properties, Only push the properties that differ from the item's current values
+    Returns: Tuple of the write status and the list of properties pushed
+    """
+    if diff_first:
+        metadata_dictionary = {key:value for key, value in metadata_dictionary.items() if not _sameMetadataValue(getattr(item, key, None), value, key)}
+        if not metadata_dictionary:
+            logger.info(f"-- Service Metadata Unchanged: {item.id}")
+            return UNCHANGED, []
+
+    try:
+        logger.info(f"-- Updating Service Metadata: {item.id} | {', '.join(metadata_dictionary.keys())}")
+        logger.debug(metadata_dictionary)
+        result = item.update(item_properties=metadata_dictionary)
+        return (UPDATED, list(metadata_dictionary.keys())) if result else (FAILED, [])
+
+    except Exception as e:
+        logger.warning(f"!! Failed to update Service Metadata {item.id}...{e}")
+        return FAILED, []
+
+
+def _sameMetadataValue(current, target, md_item:str)->bool:
+    """
+    Purpose: Compares a current and target metadata value. Empty values are equal and tags are compared as sorted, stripped lists.
+    """
+    if md_item == "tags":
+        current_tags = current.split(",") if isinstance(current, str) else list(current or [])
+        target_tags = target.split(",") if isinstance(target, str) else list(target or [])
+        return sorted([t.strip() for t in current_tags if t and t.strip()]) == sorted([t.strip() for t in target_tags if t and t.strip()])
+
+    return (current or "") == (target or "")
 
+
+def updateMetadataBatch(row_objs, max_workers:int=METADATA_PUSH_WORKERS, diff_first:bool=False, ledger:MetadataPushLedger=None, run_id:str=None, skip_unchanged:bool=True)->DataFrame:
+    """
+    Updates the metadata of every row in two stages. The local metadata is saved on the calling thread, and the
+    portal updates are handed to a bounded thread pool as each row is finished so they overlap with the local saves.
+    When a ledger is given every push is recorded, and with skip_unchanged rows whose source metadata and AGOL item haven't changed since the last push are skipped.
+    Args: Iterable of DataCatalogRow, Number of concurrent portal updates, Only write fields that have changed, MetadataPushLedger, Run ID, Skip rows the ledger shows as current
+    Returns: DataFrame with one status row per Data Catalog row (METADATA_STATUS_COLUMNS)
+    """
+    status = {}
+    futures = {}
+    hashes = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        for row_obj in row_objs:
+            logger.info(f"Table: {row_obj.table_name}")
+            item = row_obj.getServiceObject() if row_obj.service_exist else None
+
+            if ledger is not None and item is not None and row_obj.local_exist:
+                hashes[row_obj.table_name] = metadataHash(localMetadataTarget(row_obj))
+                if skip_unchanged and ledger.isCurrent(row_obj.table_name, item.id, hashes[row_obj.table_name], item.modified):
+                    logger.info("-- Unchanged Since Last Push")
+                    status[row_obj.table_name] = {"Table Name":row_obj.table_name,
+                                                  "AGOL Item ID":row_obj.agol_item_id,
+                                                  "Local Status":SKIPPED,
+                                                  "Local Fields":"",
+                                                  "Service Status":SKIPPED,
+                                                  "Service Fields":""}
+                    continue
+
+            local_status, local_fields = updateLocalMetadata(row_obj, diff_first=diff_first)
+            status[row_obj.table_name] = {"Table Name":row_obj.table_name,
+                                          "AGOL Item ID":row_obj.agol_item_id,
+                                          "Local Status":local_status,
+                                          "Local Fields":", ".join(local_fields),
+                                          "Service Status":NOT_FOUND,
+                                          "Service Fields":""}
+
+            if item is not None:
+                future = executor.submit(_pushServiceMetadata, item, row_obj.createServiceMetadataDictionary(), diff_first)
+                futures[future] = (row_obj.table_name, item.id)
+
+        for future in as_completed(futures):
+            table_name, item_id = futures[future]
+            service_status, service_fields, item_modified = future.result()
+            status[table_name]["Service Status"] = service_status
+            status[table_name]["Service Fields"] = ", ".join(service_fields)
+
+            ## The ledger is only written from this thread.
+            if ledger is not None and table_name in hashes and service_status in [UPDATED, UNCHANGED] and status[table_name]["Local Status"] != FAILED:
+                ledger.record(table_name, item_id, hashes[table_name], item_modified, run_id)
+
+    if ledger is not None:
+        ledger.commit()
+
+    status_df = DataFrame(list(status.values()), columns=METADATA_STATUS_COLUMNS)
+    logger.info(f"Metadata Updated: Local {(status_df['Local Status'] == UPDATED).sum()}/{len(status_df)} | Service {(status_df['Service Status'] == UPDATED).sum()}/{len(futures)}")
+    logger.info(f"Skipped Writes: Local {(status_df['Local Status'] == UNCHANGED).sum()} | Service {(status_df['Service Status'] == UNCHANGED).sum()} | Ledger {(status_df['Service Status'] == SKIPPED).sum()}")
+
+    return status_df
+
+
+def _pushServiceMetadata(item, metadata_dictionary:dict, diff_first:bool)->tuple:
+    ## Worker thread. Returns the item's modified stamp after the update so the ledger matches what the next run will see.
+    service_status, service_fields = updateServiceMetadata(item, metadata_dictionary, diff_first=diff_first)
+    try:
+        item_modified = item.modified
+    except Exception:
+        item_modified = None
+
+    return service_status, service_fields, item_modified
+
+
+
+def collectMetadata(row_obj:DataCatalogRow, md_items:list, text_type:str)->dict:
+    """
+    Reads the formatted Local and Service value of each metadata item for a row. Each attribute is read once.
+    Args: DataCatalogRow, List of metadata items (SERVICE_ITEM_LOOKUP keys), Output Text Type
+    Returns: Dictionary of the 'Exist', 'Local - <md_item>' and 'Service - <md_item>' values
+    """
     out_dictionary = {}
 
-    local_md_obj =md.Metadata(row_obj.gdb_item_path)
-    service_obj = row_obj.getServiceObject()
-    
     local_exist = row_obj.local_exist
     service_exist = row_obj.service_exist
 
     out_dictionary[f"Local - Exist"] = local_exist
     out_dictionary[f"Service - Exist"] = service_exist
 
+    local_md_obj = row_obj.md_snapshot if local_exist else None
+    service_obj = row_obj.getServiceObject() if service_exist else None
+
     for md_item in md_items:
-        if not local_exist:
-            local_md_attr = "Dataset Doesn't Exist"
+        if local_md_obj is None:
+            local_md_attr = DOES_NOT_EXIST
         else:
-            if hasattr(local_md_obj, md_item):
-                local_md_attr = formatMdItem(getattr(local_md_obj, md_item),md_item, text_type) if getattr(local_md_obj, md_item) else "Missing"
+            local_value = getattr(local_md_obj, md_item, None)
+            local_md_attr = formatMdItem(local_value, md_item, text_type) if local_value else MISSING
 
-        if not service_exist:
-            service_md_attr = "Dataset Doesn't Exist"
+        if service_obj is None:
+            service_md_attr = DOES_NOT_EXIST
         else:
-            if hasattr(service_obj, SERVICE_ITEM_LOOKUP[md_item]):
-                service_md_attr = formatMdItem(getattr(service_obj, SERVICE_ITEM_LOOKUP[md_item]),SERVICE_ITEM_LOOKUP[md_item], text_type) if getattr(service_obj, SERVICE_ITEM_LOOKUP[md_item]) else "Missing"
-
-
+            service_value = getattr(service_obj, SERVICE_ITEM_LOOKUP[md_item], None)
+            service_md_attr = formatMdItem(service_value, SERVICE_ITEM_LOOKUP[md_item], text_type) if service_value else MISSING
 
         out_dictionary[f"Local - {md_item}"] = local_md_attr
         out_dictionary[f"Service - {md_item}"] = service_md_attr
 
-        
-        local_md_item_check = _cleanCheckText(local_md_attr) if local_md_attr else None
-        service_md_item_check = _cleanCheckText(service_md_attr) if service_md_attr else None
-
-
-        check_list = [i for i in [local_md_item_check, service_md_item_check] if i is not None and i != "dataset doesn't exist"]
-        check_set = set(check_list)
-        result = len(check_set)
+    return out_dictionary
 
-        if result == 1 and [i for i in check_list][0] == "missing":
-            check_bool = False
-            
-        elif result <= 1:
-            check_bool = True
 
-        else:
-            check_bool = False
+def getMetadata(row_obj:DataCatalogRow, md_items:list, text_type:str)->dict:
+    """
+    Purpose: Returns the Local and Service metadata of a single row along with the '<md_item> - Match' results.
+    """
+    comparison = MetadataComparison(md_items=md_items)
+    comparison.addRecord(row_obj.table_name, collectMetadata(row_obj, md_items, text_type))
+    columns = ["Local - Exist", "Service - Exist"] + [f"{side}{md_item}{suffix}" for md_item in md_items for side, suffix in [("Local - ", ""), ("Service - ", ""), ("", " - Match")]]
 
-        out_dictionary[f"{md_item} - Match"] = check_bool
-
-    return out_dictionary
+    return comparison.toDataFrame(columns=columns).iloc[0].to_dict()
 
 
 
@@ -122,9 +270,75 @@ def formatMdItem(text:str, md_item:str, text_type:str)->str:
     """
     Using ReGex to strip HTML Tags from the Description, Summary, and Access Constraints.
     The Item Tags are also formatted from a string to a list and all spaces are striped and the list is sorted.
+    HTML conversions are cached, and text without any markup is returned without being parsed.
     """
+    if not (text and isinstance(text, str) and text_type.lower() == "plain" and md_item.lower().replace(" ","") in _HTML_MD_ITEMS):
+        return _convertMdItem(text, md_item, text_type)
+
+    ## Fast path. Without tags or entities BeautifulSoup returns the text unchanged.
+    if "<" not in text and "&" not in text:
+        return text
+
+    key = _mdItemCacheKey(text, md_item, text_type)
+    if key in _MD_ITEM_CACHE:
+        _MD_ITEM_CACHE.move_to_end(key)
+        return _MD_ITEM_CACHE[key]
+
+    clean_text = None
+    if _MD_ITEM_DISK_CACHE is not None:
+        clean_text = _MD_ITEM_DISK_CACHE.get(key)
+
+    if clean_text is None:
+        clean_text = _convertMdItem(text, md_item, text_type)
+        if _MD_ITEM_DISK_CACHE is not None:
+            _MD_ITEM_DISK_CACHE[key] = clean_text
+
+    _MD_ITEM_CACHE[key] = clean_text
+    if len(_MD_ITEM_CACHE) > MD_ITEM_CACHE_SIZE:
+        _MD_ITEM_CACHE.popitem(last=False)
+
+    return clean_text
 
-    if text and text_type.lower() == "plain" and md_item.lower().replace(" ","") in ["description", "accessconstraints", "licenseinfo"]:
+
+def _mdItemCacheKey(text:str, md_item:str, text_type:str)->str:
+    key = "\x1f".join([str(_MD_ITEM_CACHE_VERSION), md_item.lower().replace(" ",""), text_type.lower(), text])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def enableMdItemDiskCache(cache_path=MD_ITEM_CACHE_PATH)->None:
+    """
+    Purpose: Opens the persistent tier of the formatMdItem cache so conversions are reused between runs.
+    """
+    global _MD_ITEM_DISK_CACHE
+    if _MD_ITEM_DISK_CACHE is not None:
+        return
+
+    try:
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        _MD_ITEM_DISK_CACHE = shelve.open(str(cache_path))
+        logger.info(f"Metadata Text Cache Opened: {cache_path}")
+    except Exception as e:
+        logger.warning(f"!! Failed to open Metadata Text Cache...{e}")
+        _MD_ITEM_DISK_CACHE = None
+
+    return
+
+
+def closeMdItemDiskCache()->None:
+    global _MD_ITEM_DISK_CACHE
+    if _MD_ITEM_DISK_CACHE is not None:
+        _MD_ITEM_DISK_CACHE.close()
+        _MD_ITEM_DISK_CACHE = None
+
+    return
+
+
+def clearMdItemCache()->None:
+    _MD_ITEM_CACHE.clear()
+
+
+def _convertMdItem(text:str, md_item:str, text_type:str)->str:
+    if text and text_type.lower() == "plain" and md_item.lower().replace(" ","") in _HTML_MD_ITEMS:
         bs = BeautifulSoup(text,'html.parser')
 
         a_tags = bs.find_all('a', href=True)
@@ -170,16 +384,3 @@ def formatMdItem(text:str, md_item:str, text_type:str)->str:
 
 
     return clean_text
-    
-
-def _cleanCheckText(text):
-    notags_text = re.sub(r'<.*?>', '', text)
-    lower_text = notags_text.lower()
-    
-    #nofollow_text = lower_text.replace(" rel='nofollow ugc'", "")
-    standard_quotes = lower_text.replace('"',"'")
-    text_strip = standard_quotes.strip()
-    clean_text = text_strip
-    
-    return clean_text
-
@@ -0,0 +1,119 @@
+#######################################################################################################################################################
+## Logging
+import logging
+logger = logging.getLogger("root.parallelexport")
+#######################################################################################################################################################
+## Libraries
+import os
+import sys
+import random
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import arcpy
+
+if str(Path(__file__).resolve().parents[2]) not in sys.path:
+    sys.path.insert(0,str(Path(__file__).resolve().parents[2]))
+
+from src.classes.servicelayer import exportFeatures
+from src.constants.values import BACKUP_WORKERS, BACKUP_PARTITION_SEED
+#######################################################################################################################################################
+## Functions
+def _setExecutable()->None:
+    """
+    Purpose: Inside ArcGIS Pro sys.executable is ArcGISPro.exe, which can't start worker processes. The workers are pointed at the environment's python.exe.
+    """
+    if os.path.basename(sys.executable).lower() == "arcgispro.exe":
+        multiprocessing.set_executable(os.path.join(sys.exec_prefix, "python.exe"))
+
+    return
+
+
+def partitionTasks(tasks:list, worker_count:int, seed:int=BACKUP_PARTITION_SEED)->list:
+    """
+    Splits the export tasks between the workers. The tasks are shuffled with a fixed seed, so large services are spread across
+    workers and the same inputs always give the same partitions.
+    Args: List of export tasks, Number of workers, Shuffle seed
+    Returns: List of task lists (empty partitions are dropped)
+    """
+    order = list(range(len(tasks)))
+    random.Random(seed).shuffle(order)
+
+    partitions = [[tasks[i] for i in order[worker::worker_count]] for worker in range(max(1, worker_count))]
+
+    return [p for p in partitions if p]
+
+
+def _exportPartition(worker_index:int, tasks:list, scratch_dir:str)->list:
+    ## Runs in a worker process. Each worker writes to its own scratch File GDB so no two processes write to the same GDB.
+    gdb_name = f"Worker_{worker_index}.gdb"
+    scratch_gdb = os.path.join(scratch_dir, gdb_name)
+    if not arcpy.Exists(scratch_gdb):
+        arcpy.management.CreateFileGDB(scratch_dir, gdb_name)
+
+    results = []
+    for task in tasks:
+        result = dict(task)
+        result["Scratch Path"] = os.path.join(scratch_gdb, task["Feature Class Name"])
+        result["Error"] = None
+        try:
+            exportFeatures(task["Layer URL"], result["Scratch Path"], task["Spatial Reference"])
+        except Exception as e:
+            result["Error"] = str(e)
+        results.append(result)
+
+    return results
+
+
+def exportLayersParallel(tasks:list, scratch_dir:str, worker_count:int=BACKUP_WORKERS, seed:int=BACKUP_PARTITION_SEED)->list:
+    """
+    Exports the layers in worker processes. Each worker exports its partition into a scratch File GDB in scratch_dir.
+    Args: List of export tasks (ServiceLayer.exportTask dictionaries with a 'Task Index'), Scratch Directory, Number of workers, Shuffle seed
+    Returns: List of result dictionaries in task order. Each has the 'Scratch Path' of the export and an 'Error' (None if it succeeded).
+    """
+    os.makedirs(scratch_dir, exist_ok=True)
+    partitions = partitionTasks(tasks, worker_count, seed)
+    logger.info(f"Exporting {len(tasks)} Layers with {len(partitions)} Workers...")
+
+    _setExecutable()
+    results = []
+    with ProcessPoolExecutor(max_workers=max(1, len(partitions)), mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [(executor.submit(_exportPartition, index, partition, scratch_dir), partition) for index, partition in enumerate(partitions)]
+        for future, partition in futures:
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                logger.error(f"Export Worker Failed: {e}")
+                results.extend([dict(task, **{"Scratch Path":None, "Error":f"Worker Failed: {e}"}) for task in partition])
+
+    return sorted(results, key=lambda r: r["Task Index"])
+
+
+def mergeExports(results:list)->list:
+    """
+    Copies each successful worker export from its scratch File GDB to its 'Feature Class Path'.
+    Args: Results from exportLayersParallel
+    Returns: The results, with 'Error' set for any export that couldn't be merged
+    """
+    logger.info(f"Merging {len(results)} Worker Exports...")
+    for result in results:
+        if result["Error"]:
+            continue
+        try:
+            arcpy.management.Copy(result["Scratch Path"], result["Feature Class Path"])
+        except Exception as e:
+            logger.error(f"Failed to Merge {result['Scratch Path']}: {e}")
+            result["Error"] = f"Merge Failed: {e}"
+
+    return results
+
+
+def deleteScratch(scratch_dir:str)->None:
+    for gdb_name in os.listdir(scratch_dir) if os.path.exists(scratch_dir) else []:
+        try:
+            arcpy.management.Delete(os.path.join(scratch_dir, gdb_name))
+        except Exception as e:
+            logger.warning(f"!! Failed to Delete Scratch GDB {gdb_name}...{e}")
+
+    return
@@ -0,0 +1,190 @@
+#######################################################################################################################################################
+## Logging
+import logging
+logger = logging.getLogger("root.transfer")
+#######################################################################################################################################################
+## Libraries
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+if str(Path(__file__).resolve().parents[2]) not in sys.path:
+    sys.path.insert(0,str(Path(__file__).resolve().parents[2]))
+
+from src.constants.values import COPY_CHUNK_SIZE, COPY_STREAMS, COPY_RETRIES, COPY_RETRY_SECONDS, COPY_ATTEMPTS
+#######################################################################################################################################################
+_READ_SIZE = 1024 * 1024
+#######################################################################################################################################################
+## Functions
+def fileHash(file_path:str)->str:
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for data in iter(lambda: f.read(_READ_SIZE), b""):
+            sha.update(data)
+
+    return sha.hexdigest()
+
+
+def _partialPaths(dst:str)->tuple:
+    return f"{dst}.partial", f"{dst}.partial.json"
+
+
+def _loadProgress(sidecar_path:str, source:dict)->dict:
+    ## The chunks recorded in the sidecar are only reused if they came from the same version of the same source file.
+    if not os.path.exists(sidecar_path):
+        return {}
+    try:
+        with open(sidecar_path) as f:
+            progress = json.load(f)
+    except Exception as e:
+        logger.warning(f"!! Failed to read Copy Progress...{e}")
+        return {}
+
+    if progress.get("source") != source:
+        logger.info(f"Source Changed Since the Partial Copy. Starting Over...")
+        return {}
+
+    return progress.get("chunks", {})
+
+
+def _saveProgress(sidecar_path:str, source:dict, chunks:dict)->None:
+    temp_path = f"{sidecar_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"source":source, "chunks":chunks}, f)
+    os.replace(temp_path, sidecar_path)
+
+    return
+
+
+def _copyChunk(src:str, partial_path:str, index:int, chunk_size:int, retries:int)->str:
+    """
+    Runs in a stream thread. Copies one chunk to its offset in the partial file, flushed to disk, and returns its SHA-256.
+    The chunk is retried on errors (e.g. a dropped VPN connection) before the copy gives up.
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            with open(src, "rb") as s:
+                s.seek(index * chunk_size)
+                data = s.read(chunk_size)
+            with open(partial_path, "r+b") as d:
+                d.seek(index * chunk_size)
+                d.write(data)
+                d.flush()
+                os.fsync(d.fileno())
+
+            return hashlib.sha256(data).hexdigest()
+
+        except OSError as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"!! Chunk {index} Failed (Attempt {attempt}/{retries})...{e}")
+            time.sleep(COPY_RETRY_SECONDS * attempt)
+
+
+def _chunkHashes(file_path:str, chunk_size:int)->dict:
+    hashes = {}
+    with open(file_path, "rb") as f:
+        for index, data in enumerate(iter(lambda: f.read(chunk_size), b"")):
+            hashes[str(index)] = hashlib.sha256(data).hexdigest()
+
+    return hashes
+
+
+def copyFile(src:str, dst:str, chunk_size:int=COPY_CHUNK_SIZE, streams:int=COPY_STREAMS, retries:int=COPY_RETRIES)->dict:
+    """
+    Copies a file in chunks over parallel streams to '<dst>.partial', checks its SHA-256 against the source and renames it to dst.
+    Finished chunks are recorded in '<dst>.partial.json', so an interrupted copy resumes from the chunks already written.
+    Args: Source Path, Destination Path, Chunk size in bytes, Number of parallel streams, Attempts per chunk
+    Returns: Dictionary of the copy details. Raises an error if the copy couldn't be completed and verified.
+    """
+    start = time.perf_counter()
+    partial_path, sidecar_path = _partialPaths(dst)
+    stat = os.stat(src)
+    source = {"path":os.path.abspath(src), "size":stat.st_size, "mtime":stat.st_mtime, "chunk_size":chunk_size}
+    chunk_count = max(1, -(-stat.st_size // chunk_size))
+
+    chunks = _loadProgress(sidecar_path, source) if os.path.exists(partial_path) else {}
+    resumed = len(chunks)
+    if resumed:
+        logger.info(f"Resuming Copy: {dst} | Chunks Done: {resumed}/{chunk_count}")
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+        with open(partial_path, "wb") as d:
+            d.truncate(stat.st_size)
+        _saveProgress(sidecar_path, source, chunks)
+
+    lock = threading.Lock()
+
+    def copyChunk(index:int)->None:
+        chunk_hash = _copyChunk(src, partial_path, index, chunk_size, retries)
+        with lock:
+            chunks[str(index)] = chunk_hash
+            _saveProgress(sidecar_path, source, chunks)
+
+    def copyChunks(indexes:list)->None:
+        with ThreadPoolExecutor(max_workers=max(1, streams)) as executor:
+            for future in [executor.submit(copyChunk, index) for index in indexes]:
+                future.result()
+
+    copyChunks([i for i in range(chunk_count) if str(i) not in chunks])
+
+    ## The destination is read back and compared to the source. Chunks that don't match are copied once more.
+    source_hash = fileHash(src)
+    if fileHash(partial_path) != source_hash:
+        source_chunks = _chunkHashes(src, chunk_size)
+        bad_chunks = [int(i) for i, h in _chunkHashes(partial_path, chunk_size).items() if source_chunks.get(i) != h]
+        logger.warning(f"!! Copy Failed Verification. Recopying Chunks: {bad_chunks}")
+        for index in bad_chunks:
+            chunks.pop(str(index), None)
+        copyChunks(bad_chunks)
+        if fileHash(partial_path) != source_hash:
+            raise RuntimeError(f"Copy Failed SHA-256 Verification: {dst}")
+
+    os.replace(partial_path, dst)
+    os.remove(sidecar_path)
+    try:
+        shutil.copymode(src, dst)
+    except OSError:
+        pass
+
+    result = {"Source":src, "Destination":dst, "Size":stat.st_size, "SHA256":source_hash, "Resumed Chunks":resumed,
+              "Seconds":round(time.perf_counter() - start, 2)}
+    logger.info(f"Copy Verified: {result}")
+
+    return result
+
+
+def discardPartial(dst:str)->None:
+    """
+    Purpose: Deletes the partial file and progress sidecar of a copy that won't be resumed.
+    """
+    for path in _partialPaths(dst):
+        if os.path.exists(path):
+            os.remove(path)
+            logger.info(f"Partial Copy Removed: {path}")
+
+    return
+
+
+def copyFileOrDiscard(src:str, dst:str, attempts:int=COPY_ATTEMPTS, **kwargs)->dict:
+    """
+    Runs copyFile, resuming from the chunks already written if an attempt fails. For destinations that are never copied to again
+    (e.g. a timestamped backup archive) the partial file and sidecar are deleted once every attempt has failed, rather than being left on the share.
+    Args: Source Path, Destination Path, Number of attempts, copyFile keyword arguments
+    Returns: Dictionary of the copy details. Raises the last error if every attempt failed.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return copyFile(src, dst, **kwargs)
+        except Exception as e:
+            logger.warning(f"!! Copy Failed (Attempt {attempt}/{attempts})...{e}")
+            if attempt == attempts:
+                discardPartial(dst)
+                raise
+            time.sleep(COPY_RETRY_SECONDS * attempt)
@@ -6,6 +6,7 @@ import datetime
 import pandas as pd
 from pathlib import Path
 from importlib import reload
+from openpyxl import Workbook
 
 from arcgis.gis import GIS, ItemTypeEnum
 
@@ -14,7 +15,7 @@ from arcgis.gis import GIS, ItemTypeEnum
 sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
 from src.functions import utility, email
-from src.classes.servicelayer import ServiceLayer
+from src.classes.servicelayer import serviceLayers
 #############################################################################################################################
 ## Globals
 DATETIME_STR = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -30,7 +31,7 @@ def main(gis_conn:GIS, agol_folders:list, include_exclude_flag:str, output_excel
     #########################################################################################################################
     ## Empty lists used later in the process
     property_list = [] ## Holds the Items that will populate the Overview Sheet of the report. 
-    record_list = [] ## If the report is to include the records from the Feature Layer. This Holds a dictionary with the Excel Sheet Name and a Pandas DataFrame of the layers attribute table
+    record_sheets = [] ## If the report is to include the records from the Feature Layer. This Holds the Excel Sheet Names the layers attribute tables were written to
     item_list = [] ## Holds the AGOL Item Objects.
     #########################################################################################################################
 
@@ -54,20 +55,22 @@ def main(gis_conn:GIS, agol_folders:list, include_exclude_flag:str, output_excel
     logger.info(f"Item Count: {len(item_list)}")
     logger.info(f"Iterating Portal Item List...")
 
+    ## The layer records are written to a write-only workbook chunk by chunk as they are read. Write-only sheets stream their rows to disk,
+    # so only one chunk is held in memory at a time. The PropertiesOverview sheet is written last and inserted at the front.
+    workbook = Workbook(write_only=True)
+
     ## Here we are starting to iterate over the AGOL Item Objects from the previously generated list. 
     # This object will be passed into the ServiceLayer class
     for item in item_list:
         arcpy.AddMessage(f"Item: {item}")
         logger.info(f"Item: {item}")
-        item_layers = item.layers ## Retrieve the Services sublayers
-        arcpy.AddMessage(f"Layer Count: {len(item_layers)}")
-        logger.info(f"Layer Count: {len(item_layers)}")
+        service_layers = serviceLayers(gis_conn, item) ## Creates a ServiceLayer for each of the Services sublayers from one request
+        arcpy.AddMessage(f"Layer Count: {len(service_layers)}")
+        logger.info(f"Layer Count: {len(service_layers)}")
         ## Iterate over the layers contained in the Service/Portal Item.
-        for layer in item_layers:
-            arcpy.AddMessage(f"Layer: {layer}")
-            logger.info(f"Layer: {layer}")
-            ## Creates an instance of the ServicLayer class
-            sl = ServiceLayer(gis_conn, layer, item)
+        for sl in service_layers:
+            arcpy.AddMessage(f"Layer: {sl.layerName}")
+            logger.info(f"Layer: {sl.layerName}")
             logger.debug(f"Service Layer Object: {sl}")
 
             ## Here we are creating a dictionary of the properties used in the Overview sheet of the out report. 
@@ -85,19 +88,25 @@ def main(gis_conn:GIS, agol_folders:list, include_exclude_flag:str, output_excel
 
                 property_dict = new_dict ## reassign the property_dict variable to the new_dict. I did this for when we append the property_dict toe the property_list.
                 
-                logger.info(f"Creating Record DataFrame...")
-                record_df = sl.recordDf() ## Method that creates a Pandas DataFrame of the layers attribute table.
-
-                logger.debug(record_df.head())
-                logger.info(f"Appending Record DF to RECORD_LIST...")
-
-                record_list.append({"sheet_name":sl.excelSheetName, "df":record_df}) 
+                logger.info(f"Writing Record Sheet...")
+                record_sheet = workbook.create_sheet(sl.excelSheetName)
+                record_count = 0
+                header_written = False
+                for record_df in sl.iterRecordChunks(): ## Streams the layers attribute table as Pandas DataFrames.
+                    appendRows(record_sheet, record_df, header=not header_written)
+                    header_written = True
+                    record_count += len(record_df)
+                if not header_written: ## A layer without records still gets the header row.
+                    appendRows(record_sheet, pd.DataFrame(columns=sl.recordColumns))
+
+                logger.info(f"Records Written: {record_count}")
+                record_sheets.append(sl.excelSheetName)
 
             logger.info("Appending property_dict to PROPERTY_LIST...")
             property_list.append(property_dict)
 
     logger.info(f"PROPERTY_LIST Count: {len(property_list)}")
-    logger.info(f"RECORD_LIST Count: {len(record_list)}")
+    logger.info(f"RECORD_SHEETS Count: {len(record_sheets)}")
 
     arcpy.AddMessage(f"Exporting Excel Report...")
     logger.info(f"Exporting Excel Report...")
@@ -105,13 +114,22 @@ def main(gis_conn:GIS, agol_folders:list, include_exclude_flag:str, output_excel
     ## Here is the creation and export of the Pandas Dataframes and excel workbooks
     df_properties = pd.DataFrame(property_list)
     logger.info(df_properties.head())
-    with pd.ExcelWriter(output_excel) as writer:
-        df_properties.to_excel(writer, sheet_name="PropertiesOverview", index=False)
-        if include_records == "Include Records":
-            for j in record_list:
-                j["df"].to_excel(writer, sheet_name=j["sheet_name"], index=False)
+    appendRows(workbook.create_sheet("PropertiesOverview", 0), df_properties)
+    workbook.save(output_excel)
 
 
 
     return 
 
+
+def appendRows(sheet, df:pd.DataFrame, header:bool=True)->None:
+    """
+    Purpose: Appends a DataFrame to a write-only worksheet. Missing values are written as empty cells.
+    """
+    if header:
+        sheet.append([str(c) for c in df.columns])
+    for row in df.astype("object").where(df.notna(), None).itertuples(index=False, name=None):
+        sheet.append(row)
+
+    return
+
@@ -3,12 +3,10 @@ import re
 import sys
 import json
 import logging
-import shutil
 import datetime
 import pandas as pd
 from pathlib import Path
 from importlib import reload  
-from zipfile import ZipFile
 
 import arcpy
 from arcpy import metadata as md
@@ -18,9 +16,18 @@ from arcgis.gis import GIS, ItemTypeEnum
 sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
 from src.constants.paths import OUTPUTS_DIR, LOG_DIR
-from src.functions import utility
+from src.constants.values import BACKUP_PARTITION_SEED
 from src.functions import email
-from src.classes.servicelayer import ServiceLayer
+from src.functions import parallelexport
+from src.functions import archive
+from src.functions import transfer
+from src.classes import deltabackup
+from src.classes import backupindex
+from src.classes.servicelayer import serviceLayers, exportFeatures
+from src.classes.nameregistry import FeatureClassNameRegistry
+from src.classes.projectboundary import writeProjectBoundaries
+from src.classes.backupstore import BackupStore
+from src.classes.backupmanifest import BackupManifest, EXPORTED, DELTA, UNCHANGED
 ########################################################################################################################################
 ## Environments
 arcpy.env.overwriteOutput=True
@@ -32,6 +39,7 @@ REPORT_DIR = os.path.join(OUTPUTS_DIR, "BackupServices", "report")
 OUTPUT_REPORT = os.path.join(REPORT_DIR, f"BackupServices_{DATETIME_STR}.xlsx")
 ZIP_DIR = os.path.join(OUTPUTS_DIR, "BackupServices", "zip")
 ZIPPED_FILE = os.path.join(ZIP_DIR, f"BackupServices_{DATETIME_STR}.zip")
+SCRATCH_DIR = os.path.join(OUTPUTS_DIR, "BackupServices", "scratch", DATETIME_STR)
 ########################################################################################################################################
 ## Logging
 logger = logging.getLogger(f"root.TOOL_BackupServices")
@@ -49,7 +57,41 @@ def createFeatureDataset(gdb_path:str, dataset_name:str, spatial_reference:arcpy
     return
 
 
-def main(gis_conn:GIS,spatial_reference:arcpy.SpatialReference, agol_folder_objs:list,backup_dir:str,include_exclude_flag:str, scheduled:bool,include_exclude_list:list=None)->None:
+def relatedTables(featureclass_path:str)->list:
+    """
+    Purpose: Returns the names of the tables and Feature Classes related to the Feature Class through its relationship classes. The attachment table is included.
+    """
+    gdb_path = featureclass_path.split(".gdb")[0] + ".gdb"
+    related = []
+    for relationship_name in arcpy.Describe(featureclass_path).relationshipClassNames:
+        try:
+            relationship = arcpy.Describe(os.path.join(gdb_path, relationship_name))
+            related.extend(relationship.originClassNames + relationship.destinationClassNames)
+        except Exception as r:
+            logger.warning(f"Failed to Describe Relationship Class: {relationship_name}. {r}")
+
+    return list(dict.fromkeys(related))
+
+
+def updateFeatureClassMetadata(out_dict:dict)->Exception:
+    """
+    Purpose: Writes the backup details to the exported Feature Class metadata. Returns the error if the metadata failed to save.
+    """
+    try:
+        meta = md.Metadata(out_dict["Feature Class Path"])
+        meta.summary = f"Created as part of a backup on {DATETIME_STR.split('-')[0]} performed by {os.getlogin()}"
+        meta.tags = f"Layer Name:{out_dict['Layer Name']}, Layer URL:{out_dict['Layer URL']}, Service Item Id:{out_dict['Service Item Id']}"
+        meta.credits = out_dict["Service Credits"]
+        meta.save()
+        logger.info(f"Save Successfull...")
+    except Exception as m:
+        logger.error(f"Failed To Update Layer Metadata: {m}")
+        return m
+
+    return None
+
+
+def main(gis_conn:GIS,spatial_reference:arcpy.SpatialReference, agol_folder_objs:list,backup_dir:str,include_exclude_flag:str, scheduled:bool,include_exclude_list:list=None, workers:int=1, seed:int=BACKUP_PARTITION_SEED, incremental:bool=False, delta:bool=False, store_dir:str=None)->None:
     logger.info(f"Scheduled: {scheduled}")
     logger.info(f"GIS Connection: {gis_conn}")
     logger.info(f"Geodatabase Path: {GDB_DIR}")
@@ -58,12 +100,27 @@ def main(gis_conn:GIS,spatial_reference:arcpy.SpatialReference, agol_folder_objs
     logger.info(f"Backup Directory: {backup_dir}")
     logger.info(f"Include/Exclude Flag: {include_exclude_flag}")
     logger.info(f"Service List: {include_exclude_list}")
+    logger.info(f"Export Workers: {workers}")
+    logger.info(f"Incremental: {incremental}")
+    logger.info(f"Delta: {delta}")
+    logger.info(f"Backup Store: {store_dir}")
     logger.info("~~"*100)
     logger.info("~~"*100)
 #############################################################################################################################
     ## Output Data Frame Lists 
     df_list = []
     failed = []
+    unchanged_list = []
+#############################################################################################################################
+    ## The manifest holds the edit dates of every layer in the last successful backup.
+    # It is updated on every run so a full backup seeds the next incremental one.
+    manifest = BackupManifest()
+    if store_dir:
+        backup_archive = BackupStore(store_dir).manifestPath(f"BackupServices_{DATETIME_STR}")
+    else:
+        backup_archive = os.path.join(backup_dir, os.path.basename(ZIPPED_FILE)) if backup_dir else ZIPPED_FILE
+    edit_dates = {} ## Layer URL: (Data Edit Date, Schema Edit Date) read before the export
+    tracked_layers = {} ## Layer URL: (Service Layer, serverGen) of the change tracking layers, read before the export
 #############################################################################################################################
     ## Creating the Local File GDB. If the Overwrite Outputs environment is set to False, this will fail
     logger.info(f"Creating Local File GDB...")
@@ -75,7 +132,11 @@ def main(gis_conn:GIS,spatial_reference:arcpy.SpatialReference, agol_folder_objs
     ## Change the default workspace to the New File GDB
     arcpy.env.workspace = local_gdb_path
 
+    ## Every exported Feature Class name is handed out by this registry so the GDB is only listed once.
+    name_registry = FeatureClassNameRegistry.fromWorkspace(local_gdb_path)
+
     ## Iterate over the input folders and create a corresponding Feature Dataset. The Dataset Names are cleaned so as to not raise errors.
+    layer_list = [] ## Holds the (AGOL Folder, Feature Dataset Name, Service Layer) of every layer to export
     for folder_obj in agol_folder_objs:
         logger.info(f"AGOL Folder: {folder_obj}")
 
@@ -93,41 +154,140 @@ def main(gis_conn:GIS,spatial_reference:arcpy.SpatialReference, agol_folder_objs
             dataset_name = folder_obj.name.translate({ord(c): "" for c in "!@#$%^&*()[] {};:,./<>?\|`~-=_+"}) ## Removes any special characters
             logger.info(f"Formatted AGOL Folder Name: {dataset_name}")
             createFeatureDataset(gdb_path=local_gdb_path, dataset_name=dataset_name, spatial_reference=spatial_reference) 
+            name_registry.record(dataset_name)
             logger.info(f"Building Portal Item List...")
 
             ## Iterates over the Item Obj and creates a Service Layer Object for each of the layers in the service. 
             # This Class is stored in src/classes/servicelayer.py
-            arcpy.AddMessage(f"Exporting Services...")
             for item_obj in item_obj_list:
                 logger.info(f"AGOL Item: {item_obj}")
-                logger.info(f"Layer Count: {len(item_obj.layers)}")
-                for layer_obj in item_obj.layers:
-                    sl_obj = ServiceLayer(gis_conn, layer_obj, item_obj)
-                    logger.debug(sl_obj)
-                    logger.info(f"Layer: {sl_obj.layerName}")
-                    ## Exports the Service Layer to the Local GDB.
-                    # The export method will only export features that intersect with the extent of the study area. 
-                    # returns a dictionary of items to update the backedup feature class metadata.
-                    try:
-                        out_dict = sl_obj.exportLayer(out_workspace=os.path.join(local_gdb_path, dataset_name))
-                    except Exception as e:
-                        failed.append({"Layer":sl_obj.layerName, "Action":"Export Layer", "Error":e})
-
-                    out_dict["Folder Name"] = folder_obj.name
-
-                    df_list.append(out_dict)
-                    logger.debug(f"Layer Metadata Dictionary:\n{out_dict}")
-                    logger.info(f"Updating Layer Metadata...")
-                    try:
-                        meta = md.Metadata(out_dict["Feature Class Path"])
-                        meta.summary = f"Created as part of a backup on {DATETIME_STR.split('-')[0]} performed by {os.getlogin()}"
-                        meta.tags = f"Layer Name:{out_dict['Layer Name']}, Layer URL:{out_dict['Layer URL']}, Service Item Id:{out_dict['Service Item Id']}"
-                        meta.credits = out_dict["Service Credits"]
-                        meta.save()
-                        logger.info(f"Save Successfull...")
-                    except Exception as m:
-                        logger.error(f"Failed To Update Layer Metadata: {m}")
-                        failed.append({"Layer":sl_obj.layerName, "Action":"Update Feature Class Metadata", "Error":m})
+                service_layers = serviceLayers(gis_conn, item_obj)
+                logger.info(f"Layer Count: {len(service_layers)}")
+                server_gens = deltabackup.serviceServerGens(gis_conn, item_obj.url) if delta else {}
+                for sl_obj in service_layers:
+                    if sl_obj.layerId in server_gens and deltabackup.supportsDelta(sl_obj):
+                        tracked_layers[sl_obj.layerUrl] = (sl_obj, server_gens[sl_obj.layerId])
+
+                    ## The dates are read before the export. An edit made during the export is picked up by the next run.
+                    edit_dates[sl_obj.layerUrl] = (sl_obj.layerDataEditDate, sl_obj.layerSchemaEditDate)
+                    if incremental and manifest.isUnchanged(sl_obj.layerUrl, *edit_dates[sl_obj.layerUrl]):
+                        previous = manifest.previous(sl_obj.layerUrl)
+                        logger.info(f"Unchanged Since {previous['Backup Run']}: {sl_obj.layerName}")
+                        unchanged_list.append({"Feature Class Name":previous["Feature Class Name"],
+                                               "Layer Name":sl_obj.layerName,
+                                               "Folder Name":folder_obj.name,
+                                               "Service Item Id":sl_obj.parentId,
+                                               "Feature Class Path":previous["Feature Class Path"],
+                                               "Layer URL":sl_obj.layerUrl,
+                                               "Backup Status":UNCHANGED,
+                                               "Backup Archive":previous["Backup Archive"]})
+                        continue
+
+                    layer_list.append((folder_obj, dataset_name, sl_obj))
+
+    ## Exports the Service Layers to the Local GDB.
+    # The export will only export features that intersect with the extent of the study area. 
+    # Each export returns a dictionary of items to update the backedup feature class metadata.
+    arcpy.AddMessage(f"Exporting Services...")
+    logger.info(f"Layer Count: {len(layer_list)} | Unchanged: {len(unchanged_list)} | Change Tracking: {len(tracked_layers)} | Workers: {workers}")
+
+    ## The project boundary is written to disk for every spatial reference in the run before any export starts, so the export workers only read it.
+    writeProjectBoundaries([sl_obj.layerSpatialReferenceWkid for folder_obj, dataset_name, sl_obj in layer_list])
+
+    ## Change tracking layers with a baseline from an earlier run only pull the adds, updates and deletes since that run.
+    # Every other layer (and any layer whose delta fails) gets a full export below.
+    ledger = deltabackup.ChangeTrackingLedger() if delta else None
+    if delta:
+        export_list = []
+        for folder_obj, dataset_name, sl_obj in layer_list:
+            if sl_obj.layerUrl not in tracked_layers or ledger.generation(sl_obj.layerUrl) is None:
+                export_list.append((folder_obj, dataset_name, sl_obj))
+                continue
+
+            logger.info(f"Delta Layer: {sl_obj.layerName}")
+            out_dict = sl_obj.exportTask(out_workspace=os.path.join(local_gdb_path, dataset_name), name_registry=name_registry)
+            out_dict["Folder Name"] = folder_obj.name
+            try:
+                deltabackup.deltaBackup(gis_conn, sl_obj, out_dict["Feature Class Path"], ledger)
+                out_dict["Backup Status"] = DELTA
+            except Exception as e:
+                logger.warning(f"!! Delta Backup Failed, Exporting Full Layer: {sl_obj.layerName}...{e}")
+                try:
+                    exportFeatures(sl_obj.layerUrl, out_dict["Feature Class Path"], sl_obj.layerSpatialReferenceWkid)
+                except Exception as f:
+                    arcpy.AddWarning(f"Layer Failed to Export:\n{sl_obj.layerName:30s} {sl_obj.parentId:30s}")
+                    failed.append({"Layer":sl_obj.layerName, "Action":"Export Layer", "Error":f})
+                    continue
+
+            df_list.append(out_dict)
+
+        layer_list = export_list
+
+    if workers > 1:
+        ## The names are reserved here, before the layers are split between the workers, so they don't depend on the worker count.
+        tasks = []
+        for index, (folder_obj, dataset_name, sl_obj) in enumerate(layer_list):
+            task = sl_obj.exportTask(out_workspace=os.path.join(local_gdb_path, dataset_name), name_registry=name_registry)
+            task["Folder Name"] = folder_obj.name
+            task["Task Index"] = index
+            tasks.append(task)
+
+        results = parallelexport.exportLayersParallel(tasks, scratch_dir=SCRATCH_DIR, worker_count=workers, seed=seed)
+        results = parallelexport.mergeExports(results)
+        parallelexport.deleteScratch(SCRATCH_DIR)
+
+        for out_dict in results:
+            if out_dict["Error"]:
+                arcpy.AddWarning(f"Layer Failed to Export:\n{out_dict['Layer Name']:30s} {out_dict['Service Item Id']:30s}")
+                failed.append({"Layer":out_dict["Layer Name"], "Action":"Export Layer", "Error":out_dict["Error"]})
+                continue
+            df_list.append(out_dict)
+
+    else:
+        for folder_obj, dataset_name, sl_obj in layer_list:
+            logger.debug(sl_obj)
+            logger.info(f"Layer: {sl_obj.layerName}")
+            try:
+                out_dict = sl_obj.exportLayer(out_workspace=os.path.join(local_gdb_path, dataset_name), name_registry=name_registry)
+            except Exception as e:
+                failed.append({"Layer":sl_obj.layerName, "Action":"Export Layer", "Error":e})
+                continue
+
+            out_dict["Folder Name"] = folder_obj.name
+            df_list.append(out_dict)
+
+    ## A layer is only reported and recorded in the manifest as backed up if its Feature Class made it into the GDB.
+    exported = []
+    for out_dict in df_list:
+        if arcpy.Exists(out_dict["Feature Class Path"]):
+            exported.append(out_dict)
+        else:
+            logger.error(f"Feature Class Not Found After Export: {out_dict['Feature Class Path']}")
+            failed.append({"Layer":out_dict["Layer Name"], "Action":"Export Layer", "Error":f"Feature Class Not Found: {out_dict['Feature Class Path']}"})
+    df_list = exported
+
+    for out_dict in df_list:
+        logger.debug(f"Layer Metadata Dictionary:\n{out_dict}")
+        logger.info(f"Updating Layer Metadata: {out_dict['Feature Class Name']}...")
+        error = updateFeatureClassMetadata(out_dict)
+        if error:
+            failed.append({"Layer":out_dict["Layer Name"], "Action":"Update Feature Class Metadata", "Error":error})
+
+        ## Full exports of change tracking layers become the baseline for the next delta.
+        if delta and out_dict["Layer URL"] in tracked_layers and out_dict.get("Backup Status") != DELTA:
+            sl_obj, server_gen = tracked_layers[out_dict["Layer URL"]]
+            try:
+                deltabackup.seedBaseline(gis_conn, sl_obj, out_dict["Feature Class Path"], server_gen, ledger)
+            except Exception as b:
+                logger.error(f"Failed to Seed Change Tracking Baseline: {b}")
+                failed.append({"Layer":out_dict["Layer Name"], "Action":"Seed Change Tracking Baseline", "Error":b})
+
+        out_dict.setdefault("Backup Status", EXPORTED)
+        out_dict["Backup Archive"] = backup_archive
+        manifest.record(out_dict, *edit_dates[out_dict["Layer URL"]], backup_archive=backup_archive, run_id=DATETIME_STR)
+
+    if ledger:
+        ledger.close()
 
 
     ## Here we are compressing the file gdb this is a lossl_objess function. We want to add this process to make sure that the archived records are unable to be editied.
@@ -154,7 +314,11 @@ def main(gis_conn:GIS,spatial_reference:arcpy.SpatialReference, agol_folder_objs
     "Folders":[f.name for f in agol_folder_objs],
     "Service List":include_exclude_list,
     "Spatial Reference":str(spatial_reference.factoryCode),
-    "Compression":compression_status
+    "Compression":compression_status,
+    "Incremental":incremental,
+    "Delta":delta,
+    "Backup Store":store_dir,
+    "Unchanged Layers":len(unchanged_list)
     }
 
     meta.description = json.dumps(param_dict, indent=1)
@@ -168,7 +332,7 @@ def main(gis_conn:GIS,spatial_reference:arcpy.SpatialReference, agol_folder_objs
     ## 
     logger.info(f"Creating Pandas Data Frames...")
     param_df = pd.DataFrame.from_dict(param_dict, orient="index", columns=["Value"])
-    update_df = pd.DataFrame(df_list, columns=["Feature Class Name","Layer Name", "Folder Name","Service Item Id","Feature Class Path", "Layer URL"])
+    update_df = pd.DataFrame(df_list + unchanged_list, columns=["Feature Class Name","Layer Name", "Folder Name","Service Item Id","Feature Class Path", "Layer URL", "Backup Status", "Backup Archive"])
     failed_df = pd.DataFrame(failed)
 
     logger.debug(param_df.head())
@@ -187,41 +351,76 @@ def main(gis_conn:GIS,spatial_reference:arcpy.SpatialReference, agol_folder_objs
         logger.error(f"Failed to Export Excel Report. {e}")
 
 
-    ## Here we are compress together the excel report and the local filegdb. zipping these items will make it more efficient to send from local machine to the backup directory. 
-    logger.info(f"Zipping Local GDB and Excel Reports...")
-    arcpy.AddMessage(f"Zipping Local GDB and Excel Reports...")
+    ## With a Backup Store the GDB and report are chunked into the store. Only chunks the store hasn't seen before are written.
+    if store_dir:
+        logger.info(f"Writing Backup to Store...")
+        arcpy.AddMessage(f"Writing Backup to Store...")
+        backup_successful = True
+        try:
+            backup_archive = BackupStore(store_dir).putBackup(f"BackupServices_{DATETIME_STR}", local_gdb_path, extra_files=[OUTPUT_REPORT], properties=param_dict)
+        except Exception as r:
+            arcpy.AddError(f"Failed to Write Backup to Store.\n{r}")
+            logger.error(f"Failed to Write Backup to Store.\n{r}")
+            backup_successful = False
+
+    else:
+        ## Here we are compress together the excel report and the local filegdb. zipping these items will make it more efficient to send from local machine to the backup directory. 
+        # The GDB folder and the report are written to one archive in a single pass. Compressed gdb tables are stored rather than deflated again.
+        logger.info(f"Zipping Local GDB and Excel Reports...")
+        arcpy.AddMessage(f"Zipping Local GDB and Excel Reports...")
     
-    try:
-        zipped_fgdb = utility.zip_fgdb(local_gdb_path, os.path.join(ZIP_DIR, "Zipped_FGDB"))
-        with ZipFile(ZIPPED_FILE, 'w') as zip:
-            zip.write(zipped_fgdb, os.path.basename(zipped_fgdb))
-            zip.write(OUTPUT_REPORT, os.path.basename(OUTPUT_REPORT))
+        ## The last member is an index of Folder -> Layer -> Feature Class -> byte ranges of its gdb tables, so one layer can be restored without unzipping the archive.
+        def layerIndex(entries:list)->tuple:
+            try:
+                catalog = backupindex.readSystemCatalog(local_gdb_path)
+            except Exception as c:
+                logger.warning(f"Failed to Read FGDB System Catalog. Layers Not Indexed...{c}")
+                catalog = {}
+            for out_dict in df_list:
+                try:
+                    out_dict["Related Tables"] = relatedTables(out_dict["Feature Class Path"])
+                except Exception as r:
+                    logger.warning(f"Failed to List Related Tables: {out_dict['Feature Class Name']}. {r}")
+            index = backupindex.buildIndex(entries, os.path.basename(local_gdb_path), catalog, df_list)
+            return backupindex.INDEX_NAME, json.dumps(index, indent=1).encode("utf-8")
+
+        backup_successful = True
+        try:
+            archive.writeArchive(ZIPPED_FILE, archive.fgdbMembers(local_gdb_path) + [(OUTPUT_REPORT, os.path.basename(OUTPUT_REPORT))], index=layerIndex)
             logger.info('All files zipped successfully!')
-    except Exception as r:
-        arcpy.AddError(f"Failed to Zip Files.\n{r}")
-        logger.error(f"Failed to Zip Files.\n{r}")
+        except Exception as r:
+            arcpy.AddError(f"Failed to Zip Files.\n{r}")
+            logger.error(f"Failed to Zip Files.\n{r}")
+            backup_successful = False
 
 
 
-    ## Copies the zipped folder of the local file gdb to the designated directory to hold the weekly backups. 
-    ### If we want to I can add logic to unzip the folder...
-    if backup_dir:
-        logger.info("Copying Zipped Folder...")
-        try:
-            shutil.copy(ZIPPED_FILE, os.path.join(backup_dir, os.path.basename(ZIPPED_FILE)))
-        except Exception as u:
-            logger.error(f"Failed Copy: {u}")
-
-        # Checks if the zipped folder was successfully copied.
-        if os.path.exists(os.path.join(backup_dir, os.path.basename(ZIPPED_FILE))):
-            logger.info(f"Excel Report Has Been Exported to: {OUTPUT_REPORT}")
+        ## Copies the zipped folder of the local file gdb to the designated directory to hold the weekly backups. 
+        ### If we want to I can add logic to unzip the folder...
+        # The copy is chunked and checked against the source SHA-256. An interrupted attempt is resumed from the chunks already on the share within this run,
+        # since the timestamped archive name is never copied again. If every attempt fails the partial file is removed from the share.
+        if not backup_dir:
+            logger.info("No Backup Directory Named.")
+        elif not backup_successful:
+            logger.warning(f"Copy to Backup Directory Skipped. The Backup Failed: {backup_dir}")
         else:
-            logger.error(f"Excel Report Failed to Export to: {OUTPUT_REPORT}")
+            logger.info("Copying Zipped Folder...")
+            try:
+                transfer.copyFileOrDiscard(ZIPPED_FILE, os.path.join(backup_dir, os.path.basename(ZIPPED_FILE)))
+                logger.info(f"Excel Report Has Been Exported to: {OUTPUT_REPORT}")
+            except Exception as u:
+                logger.error(f"Failed Copy: {u}")
+                logger.error(f"Excel Report Failed to Export to: {OUTPUT_REPORT}")
+                backup_successful = False
+
+    ## The manifest only moves forward once the archive holding the exported layers exists.
+    if backup_successful:
+        manifest.commit()
     else:
-        logger.info("No Backup Directory Named.")
+        logger.warning(f"Backup Manifest Not Updated.")
 
     
-    return OUTPUT_REPORT, ZIPPED_FILE
+    return OUTPUT_REPORT, backup_archive if store_dir else ZIPPED_FILE
 
 
 
@@ -0,0 +1,97 @@
+import os
+import sys
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+import arcpy
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from src.classes.backupstore import BackupStore
+from src.classes import backupindex
+from src.constants.paths import INTRANET_BACKUP_STORE_DIR
+########################################################################################################################################
+## Logging
+logger = logging.getLogger(f"root.TOOL_RestoreBackup")
+########################################################################################################################################
+def main(store_dir:str, backup_name:str, out_dir:str, paths:list=None)->list:
+    """
+    Reassembles a backup from the Backup Store.
+    Args: Backup Store Directory, Backup Name (or Manifest Path), Output Directory, Optional list of archive paths to restore (e.g. the File GDB name)
+    Returns: List of restored file paths
+    """
+    logger.info(f"Backup Store: {store_dir}")
+    logger.info(f"Backup: {backup_name}")
+    logger.info(f"Output Directory: {out_dir}")
+    logger.info(f"Paths: {paths}")
+
+    store = BackupStore(store_dir)
+    arcpy.AddMessage(f"Restoring {backup_name}...")
+    restored = store.restoreBackup(backup_name, out_dir, paths=paths)
+    arcpy.AddMessage(f"Restored {len(restored)} Files to {out_dir}")
+
+    return restored
+
+
+def restoreLayer(archive_path:str, layer_name:str, out_gdb:str, folder_name:str=None)->str:
+    """
+    Restores one layer from a Backup Services archive using the archive's index. Only that Feature Class's gdb tables (and the small
+    system tables) are read from the archive, then the Feature Class is exported to the Output GDB.
+    Args: Archive Path, Layer Name (or Feature Class Name), Output File GDB (created if it doesn't exist), AGOL Folder Name if the layer name isn't unique
+    Returns: Restored Feature Class Path
+    """
+    logger.info(f"Archive: {archive_path}")
+    logger.info(f"Layer: {layer_name}")
+    logger.info(f"Folder: {folder_name}")
+    logger.info(f"Output GDB: {out_gdb}")
+
+    index = backupindex.readIndex(archive_path)
+    layer = backupindex.findLayer(index, layer_name, folder_name)
+
+    if not arcpy.Exists(out_gdb):
+        arcpy.management.CreateFileGDB(os.path.dirname(out_gdb), os.path.basename(out_gdb))
+
+    ## The extracted GDB only holds this layer's tables, so the Feature Class is copied out of it into a complete GDB.
+    arcpy.AddMessage(f"Restoring {layer_name}...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        partial_gdb = backupindex.restoreLayer(archive_path, temp_dir, layer_name, folder_name=folder_name, index=index)
+        in_features = os.path.join(partial_gdb, *[n for n in [layer["Feature Dataset"], layer["Feature Class"]] if n])
+        out_features = os.path.join(out_gdb, layer["Feature Class"])
+        arcpy.conversion.ExportFeatures(in_features=in_features, out_features=out_features)
+
+        ## Attachments are carried over by ExportFeatures. Other related tables are exported next to it. The relationship classes aren't recreated.
+        for table_name in layer.get("Related Tables", []):
+            if table_name.casefold() == f"{layer['Feature Class']}__ATTACH".casefold():
+                continue
+            arcpy.conversion.ExportTable(in_table=os.path.join(partial_gdb, table_name), out_table=os.path.join(out_gdb, table_name))
+            logger.warning(f"Related Table Restored Without Its Relationship Class: {table_name}")
+        arcpy.ClearWorkspaceCache_management()
+
+    arcpy.AddMessage(f"Restored {layer_name} to {out_features}")
+
+    return out_features
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Restores a backup from the Backup Store")
+    parser.add_argument("backup_name", nargs="?", help="Backup name or manifest path. Leave blank to list the stored backups.")
+    parser.add_argument("out_dir", nargs="?", help="Directory the backup files are restored to")
+    parser.add_argument("--store", default=INTRANET_BACKUP_STORE_DIR, help="Backup Store directory")
+    parser.add_argument("--path", action="append", help="Only restore this archive path (repeatable)")
+    parser.add_argument("--archive", help="Restore one layer from this Backup Services archive instead of the Backup Store. backup_name is the layer name and out_dir the output GDB.")
+    parser.add_argument("--folder", help="AGOL Folder of the layer (with --archive)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.archive:
+        if not args.backup_name:
+            for folder, layers in backupindex.readIndex(args.archive)["folders"].items():
+                print("\n".join(f"{folder} | {layer}" for layer in layers))
+        else:
+            restoreLayer(args.archive, args.backup_name, args.out_dir, folder_name=args.folder)
+    elif not args.backup_name:
+        print("\n".join(BackupStore(args.store).listBackups()))
+    else:
+        main(args.store, args.backup_name, args.out_dir or os.getcwd(), paths=args.path)
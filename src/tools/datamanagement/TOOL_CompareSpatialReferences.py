@@ -14,9 +14,10 @@ from arcgis.gis import GIS
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
-from src.classes.datacatalog import DataCatalogRow
+from src.classes.datacatalog import DataCatalogRow, checkCatalog, getCatalogRows, loadCatalog
 from src.constants.paths import PORTAL_ITEM_URL, LOG_DIR
 from src.constants.values import SHEET_NAME
+from src.functions import lint
 #################################################################################################################################################################################################################
 ## Globals
 DATETIME_STR = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -79,9 +80,9 @@ def getSpatialReferences(dataframe, gdb_path, gis_conn)->dict:
 
     arcpy.AddMessage("Retrieving Spatial References...")
 
-    for index, row in dataframe.iterrows():
+    for index, row in getCatalogRows(dataframe):
         temp_dict ={}
-        row_obj = DataCatalogRow(c_row=row, index=index, gdb_path=gdb_path, gis_conn=gis_conn)
+        row_obj = DataCatalogRow(c_row=row, index=index, gdb_path=gdb_path, gis_conn=gis_conn, validate=False)
         if row_obj.local_exist:
             file_path = row_obj.gdb_item_path
             if file_path:
@@ -113,7 +114,10 @@ def main(gis_conn:GIS, gdb_path:str, catalog_path:str, output_excel:str)->None:
 
 
     ## Converts the Data Catalog Excel to a Pandas DataFrame
-    catalog_df = pd.read_excel(io=catalog_path, sheet_name=SHEET_NAME,header=0,names=None)
+    catalog_df = loadCatalog(catalog_path=catalog_path, sheet_name=SHEET_NAME)
+
+    ## Validates every row up front. This also retrieves all of the catalog's AGOL Items into the shared item cache.
+    checkCatalog(catalog_df, gdb_path, gis_conn)
 
     df_dictionary = getSpatialReferences(catalog_df, gdb_path, gis_conn)
         
@@ -126,6 +130,10 @@ def main(gis_conn:GIS, gdb_path:str, catalog_path:str, output_excel:str)->None:
     arcpy.AddMessage("Exporting Excel...")
     df.to_excel(output_excel, na_rep="N/A" ,index_label="Table Name")
 
+    lint_df = lint.lintCatalog(catalog_df)
+    if not lint_df.empty:
+        lint.exportLintReport(lint_df, output_excel)
+
     excelFormatting(excel_path=output_excel)
 
     arcpy.AddMessage(f"Excel Report Has Been Exported to:\n{output_excel}")
@@ -19,7 +19,10 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
 from src.constants.paths import ROOT_DIR, PORTAL_ITEM_URL, LOG_DIR
 from src.constants.values import SHEET_NAME
+from src.functions import lint
 import src.classes.datacatalog as dc
+from src.classes.gdbinventory import getGdbInventory
+from src.classes.portalitems import getItemCache
 #################################################################################################################################################################################################################
 ##Globals
 DATETIME_STR = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -67,16 +70,12 @@ def createLocalList(gdb_path:Path)->list:
     """
     logger.info(f"Creating Local File GDB List...")
 
-    arcpy.env.workspace = str(gdb_path)
+    if not arcpy.Exists(str(gdb_path)):
+        logger.error("!! File GDB Doesn't Exist !!")
+        sys.exit("!! File GDB Doesn't Exist !!")
 
-    if arcpy.env.workspace != str(gdb_path):
-        logger.error("!! Workspaces Don't Match !!")
-        sys.exit("!! Workspaces Don't Match !!")
-    gdb_item_list = []
-    datasets = arcpy.ListDatasets(feature_type="Feature")
-    datasets.append(None)
-    [gdb_item_list.append(featureclass) for dataset in datasets for  featureclass in arcpy.ListFeatureClasses(feature_dataset=dataset)]
-    [gdb_item_list.append(raster) for raster in arcpy.ListRasters()]
+    ## Shares the inventory used by the DataCatalogRow existence checks, so the GDB is only listed once per run.
+    gdb_item_list = getGdbInventory(gdb_path).itemList()
 
 
     logger.debug(gdb_item_list)
@@ -132,17 +131,22 @@ def main(gis_conn:GIS, gdb_path:str, catalog_path:str, excel_path:str)->None:
 
     df_list = []
 
-    catalog_df = pd.read_excel(io=catalog_path, sheet_name=SHEET_NAME,header=0,names=None)
+    catalog_df = dc.loadCatalog(catalog_path=catalog_path, sheet_name=SHEET_NAME)
 
     local_list = createLocalList(gdb_path=gdb_path)
 
     service_list = createServicesList(gis_conn=gis_conn)
     service_id_list = [i.id for i in service_list]
 
+    ## The services search already returned most of the catalog's items. Anything else is resolved in batched searches.
+    item_cache = getItemCache(gis_conn)
+    item_cache.add(service_list)
+    dc.checkCatalog(catalog_df, gdb_path, gis_conn)
 
-    for index, row in catalog_df.iterrows():
+
+    for index, row in dc.getCatalogRows(catalog_df):
         temp_dict = {}
-        row_obj = dc.DataCatalogRow(c_row=row, index=index, gdb_path=gdb_path, gis_conn=gis_conn)
+        row_obj = dc.DataCatalogRow(c_row=row, index=index, gdb_path=gdb_path, gis_conn=gis_conn, validate=False)
         
         temp_dict["Table Name"] = row_obj.table_name
         temp_dict["Data Catalog - Exist"] = True
@@ -192,6 +196,10 @@ def main(gis_conn:GIS, gdb_path:str, catalog_path:str, excel_path:str)->None:
 
     df.to_excel(excel_path, sheet_name="StorageComparison", index=False)
 
+    lint_df = lint.lintCatalog(catalog_df)
+    if not lint_df.empty:
+        lint.exportLintReport(lint_df, excel_path)
+
     excelFormatting(excel_path)
 
     arcpy.AddMessage(f"Excel Report Has Been Exported to:\n{excel_path}")
@@ -14,7 +14,7 @@ from arcgis.gis import GIS, ItemTypeEnum
 sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
 from src.functions import utility, meta
-from src.classes.servicelayer import ServiceLayer
+from src.classes.servicelayer import serviceLayers
 from src.constants.values import EXTERNAL_GROUP_ITEMID
 from src.constants.paths import PORTAL_ITEM_URL
 #############################################################################################################################
@@ -26,9 +26,6 @@ logger = logging.getLogger(f"root.TOOL_DataCatalog")
 log_file = utility.getLogFile(logger)
 #############################################################################################################################
 def main(gis_conn:GIS, output_excel:str)->None:
-    ## Empty lists used later in the process
-    df_list = [] ## If the report is to include the records from the Feature Layer. This Holds a dictionary with the Excel Sheet Name and a Pandas DataFrame of the layers attribute table
-
     group_object = gis_conn.groups.get(EXTERNAL_GROUP_ITEMID)
 
     arcpy.AddMessage(f"Building Portal Item List...")
@@ -43,14 +40,42 @@ def main(gis_conn:GIS, output_excel:str)->None:
     arcpy.AddMessage(f"Iterating Hosted Item List...")
     logger.info(f"Iterating Hosted Item List...")
 
+    ## The converted Description/Credits/License text is kept between runs. Most items share the same boilerplate.
+    meta.enableMdItemDiskCache()
+    try:
+        df_list = _buildCatalogRecords(gis_conn, hosted_group_items)
+    finally:
+        meta.closeMdItemDiskCache()
+
+    logger.info(f"DF_LIST Count: {len(df_list)}")
+
+
+    arcpy.AddMessage(f"Exporting Excel Report...")
+    logger.info(f"Exporting Excel Report...")
+
+    ## Here is the creation and export of the Pandas Dataframes and excel workbooks
+    df_datacatalog = pd.DataFrame(df_list)
+    logger.info(df_datacatalog.head(25))
+    with pd.ExcelWriter(output_excel) as writer:
+        df_datacatalog.to_excel(writer, sheet_name="PropertiesOverview", index=False)
+
+    return
+
+
+def _buildCatalogRecords(gis_conn:GIS, hosted_group_items:list)->list:
+    """
+    Purpose: Returns one record for each Hosted Item and one for each of its layers.
+    """
+    df_list = [] ## If the report is to include the records from the Feature Layer. This Holds a dictionary with the Excel Sheet Name and a Pandas DataFrame of the layers attribute table
+
     ## Here we are starting to iterate over the AGOL Item Objects from the previously generated list. 
     # This object will be passed into the ServiceLayer class
     for item in hosted_group_items:
         arcpy.AddMessage(f"Item: {item}")
         logger.info(f"Item: {item}")
-        item_layers = item.layers ## Retrieve the Services sublayers
-        arcpy.AddMessage(f"Layer Count: {len(item_layers)}")
-        logger.info(f"Layer Count: {len(item_layers)}")
+        service_layers = serviceLayers(gis_conn, item) ## Creates a ServiceLayer for each of the Services sublayers from one request
+        arcpy.AddMessage(f"Layer Count: {len(service_layers)}")
+        logger.info(f"Layer Count: {len(service_layers)}")
         ## Iterate over the layers contained in the Service/Portal Item.
         item_category = item.categories[0].split("/")[-1] if item.categories else None
         service_name = item.name if item.name else item.url.split("/")[-2]
@@ -74,11 +99,9 @@ def main(gis_conn:GIS, output_excel:str)->None:
         df_list.append(item_dictionary)
 
 
-        for layer in item_layers:
-            arcpy.AddMessage(f"Layer: {layer}")
-            logger.info(f"Layer: {layer}")
-            ## Creates an instance of the ServicLayer class
-            sl = ServiceLayer(gis_conn, layer, item)
+        for sl in service_layers:
+            arcpy.AddMessage(f"Layer: {sl.layerName}")
+            logger.info(f"Layer: {sl.layerName}")
             logger.info(f"Service Layer Object: {sl}")
 
             ## Here we are creating a dictionary of the properties used in the Overview sheet of the out report. 
@@ -89,17 +112,4 @@ def main(gis_conn:GIS, output_excel:str)->None:
             logger.info("Appending datacalog_dict to PROPERTY_LIST...")
             df_list.append(datacatalog_dict)
 
-    logger.info(f"DF_LIST Count: {len(df_list)}")
-
-
-    arcpy.AddMessage(f"Exporting Excel Report...")
-    logger.info(f"Exporting Excel Report...")
-
-    ## Here is the creation and export of the Pandas Dataframes and excel workbooks
-    df_datacatalog = pd.DataFrame(df_list)
-    logger.info(df_datacatalog.head(25))
-    with pd.ExcelWriter(output_excel) as writer:
-        df_datacatalog.to_excel(writer, sheet_name="PropertiesOverview", index=False)
-
-    return 
-
+    return df_list
@@ -15,6 +15,7 @@ from importlib import reload
 sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
 from src.constants.paths import LOG_DIR
+from src.classes.gdbinventory import getGdbInventory
 #######################################################################################################################################################################################################
 ## Global Parameters
 DATETIME_STR = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -58,16 +59,12 @@ def checkGdb(gdb_path:Path, workspace):
         sys.exit("!!! Workspace and FGDB Path Dont Match !!!")
     
     
-def generateFeatureClassList()->list:
-    datasets = arcpy.ListDatasets(feature_type="Feature")
+def generateFeatureClassList(gdb_path:str)->list:
+    inventory = getGdbInventory(gdb_path)
 
-    feature_class_list = []
-    arcpy.AddMessage(f"'DataSetList:{datasets}")
-    datasets.append(None)
-    for dataset in datasets:
-        [feature_class_list.append(feature_class) for feature_class in arcpy.ListFeatureClasses(feature_dataset=dataset)]
+    arcpy.AddMessage(f"'DataSetList:{inventory.datasets}")
+    feature_class_list = inventory.featureClassList()
 
-    
     return feature_class_list
 
 #######################################################################################################################################################################################################
@@ -86,7 +83,7 @@ def main(gdb_list:list, excel_path:Path, timezone:str)->DataFrame:
         logger.info(f"----- {arcpy.env.workspace} -----")
         checkGdb(gdb, arcpy.env.workspace)
         
-        feature_class_list = generateFeatureClassList()
+        feature_class_list = generateFeatureClassList(gdb)
         logger.info(f"Feature Class Count: {len(feature_class_list)}\n")
         arcpy.AddMessage(f"Feature Class Count: {len(feature_class_list)}\n")
         for feature_class in feature_class_list:
@@ -2,7 +2,6 @@
 ## Libraries
 import os
 import sys
-import pandas as pd
 import logging
 import datetime
 import itertools
@@ -19,7 +18,9 @@ from openpyxl.worksheet.table import Table, TableStyleInfo
 sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
 import  src.classes.datacatalog as dc 
-from src.functions import meta
+from src.classes.catalogsnapshot import CatalogSnapshot
+from src.classes.metadatacomparison import MetadataComparison
+from src.functions import meta, lint
 from src.constants.paths import LOG_DIR
 from src.constants.values import DF_COLUMNS, SERVICE_ITEM_LOOKUP, SHEET_NAME
 
@@ -44,9 +45,9 @@ logger.addHandler(file_handler)
 logger.setLevel(logging.INFO)
 ##################################################################################################################################################################
 ## Main
-def main(gis_conn:GIS, gdb_path:Path, catalog_path:Path, output_excel:Path, text_type:str, web_app_categories:list=None, include_exclude:str=None)->None:
-    DF_DICTIONARY = {}
-    DF_LIST = []
+def main(gis_conn:GIS, gdb_path:Path, catalog_path:Path, output_excel:Path, text_type:str, web_app_categories:list=None, include_exclude:str=None, changed_only:bool=False)->None:
+    md_items = list(SERVICE_ITEM_LOOKUP.keys())
+    comparison = MetadataComparison(md_items=md_items)
 
     EXCEL_COLS = {}
 
@@ -56,27 +57,41 @@ def main(gis_conn:GIS, gdb_path:Path, catalog_path:Path, output_excel:Path, text
     logger.info(f"Web App Categories: {web_app_categories}")
     logger.info(f"Output Excel Path: {output_excel}")
     logger.info(f"Output Text Type: {text_type}")
+    logger.info(f"Only Changed Rows: {changed_only}")
     
 
 
-    catalog_df = pd.read_excel(io=catalog_path, sheet_name=SHEET_NAME,header=0,names=None)
+    catalog_df = dc.loadCatalog(catalog_path=catalog_path, sheet_name=SHEET_NAME)
 
-    catalog_rows = dc.getCatalogRows(catalog_df, web_app_categories, include_exclude)
+    ## The diff is taken over the whole catalog so rows outside the category filter aren't reported as removed.
+    snapshot = CatalogSnapshot(tool_name="CompareMetadata", catalog_path=catalog_path)
+    changes = snapshot.diff(catalog_df)
+
+    catalog_df = dc.filterCatalog(catalog_df, web_app_categories, include_exclude)
+
+    if changed_only:
+        catalog_df = snapshot.filterChanged(catalog_df, changes)
+        arcpy.AddMessage(f"Only Changed Rows: Added {len(changes['added'])} | Changed {len(changes['changed'])} | Removed {len(changes['removed'])}")
+
+    ## Validates every row (and resolves the AGOL Items) before any metadata is read. All problems are reported together.
+    logger.info(f"Validating Data Catalog...")
+    dc.checkCatalog(catalog_df, gdb_path, gis_conn)
+
+    catalog_rows = dc.getCatalogRows(catalog_df)
 
     logger.info(f"Checking Metadata...")
 
     for index, row in catalog_rows:
-        row_obj = dc.DataCatalogRow(row, index, gdb_path, gis_conn)
+        row_obj = dc.DataCatalogRow(row, index, gdb_path, gis_conn, validate=False)
 
         logger.info(row_obj.table_name)
         arcpy.AddMessage(row_obj.table_name)
 
-        out_dictionary= meta.getMetadata(row_obj=row_obj, md_items=list(SERVICE_ITEM_LOOKUP.keys()), text_type=text_type)
-
-        DF_DICTIONARY[row_obj.table_name] = out_dictionary
+        comparison.addRecord(row_obj.table_name, meta.collectMetadata(row_obj=row_obj, md_items=md_items, text_type=text_type))
         
+    ## The normalising and matching is done over whole columns once every row has been read.
     logger.info(f"Creating DataFrame... {datetime.datetime.now()}")
-    df = pd.DataFrame.from_dict(DF_DICTIONARY, "index", columns=DF_COLUMNS)
+    df = comparison.toDataFrame(columns=DF_COLUMNS)
 
 
     ## I sort the Pandas DataFrame for ease of reading. This can be commented out to keep the original order of the Data Catalog.
@@ -148,6 +163,14 @@ def main(gis_conn:GIS, gdb_path:Path, catalog_path:Path, output_excel:Path, text
     wb.save(output_excel)
     del wb
 
+    ## Adds the catalog lint results as a second sheet.
+    lint_df = lint.lintCatalog(catalog_df)
+    if not lint_df.empty:
+        lint.exportLintReport(lint_df, output_excel)
+
+    snapshot.update(catalog_df, changes["removed"])
+    snapshot.save()
+
     arcpy.AddMessage(f"Excel Report Has Been Exported to:\n{output_excel}")
     arcpy.AddMessage(f"Opening Excel Report...")
     try:
@@ -1,7 +1,6 @@
 #################################################################################################################################################################################################################
 ## Libraries
 import sys
-import pandas as pd
 from pandas import DataFrame
 import logging
 import datetime
@@ -14,10 +13,12 @@ from arcgis.gis import GIS
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
-from src.classes.datacatalog import DataCatalogRow, getCatalogRows
+from src.classes.datacatalog import DataCatalogRow, checkCatalog, filterCatalog, getCatalogRows, loadCatalog
+from src.classes.catalogsnapshot import CatalogSnapshot
+from src.classes.pushledger import MetadataPushLedger
 from src.functions import meta
 from src.constants.paths import LOG_DIR
-from src.constants.values import SHEET_NAME
+from src.constants.values import SHEET_NAME, METADATA_PUSH_WORKERS
 #################################################################################################################################################################################################################
 ## Globals
 DATETIME_STR = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -40,7 +41,7 @@ logger.setLevel(logging.INFO)
 #################################################################################################################################################################################################################
 ## Functions
 
-def main(gis_conn:GIS, gdb_path:Path, catalog_path:Path, include_exclude:str=None, web_app_categories:list=None)->None:
+def main(gis_conn:GIS, gdb_path:Path, catalog_path:Path, include_exclude:str=None, web_app_categories:list=None, changed_only:bool=False, diff_first:bool=False, use_ledger:bool=True, max_workers:int=METADATA_PUSH_WORKERS)->None:
     logger.info(f"Run by: {os.getlogin()}")
     logger.info(f"Run on: {datetime.datetime.now().strftime('%Y/%m/%d')}")
     logger.info(f"File GDB Path: {gdb_path}")
@@ -51,26 +52,43 @@ def main(gis_conn:GIS, gdb_path:Path, catalog_path:Path, include_exclude:str=Non
         logger.info(f"Web App Categories Not Included: {web_app_categories}")
     else:
         logger.info(f"Web App Categories Included: {web_app_categories}")
-
+    logger.info(f"Only Changed Rows: {changed_only}")
+    logger.info(f"Only Write Changed Fields: {diff_first}")
+    logger.info(f"Skip Items Unchanged Since Last Push: {use_ledger}")
 
     logger.info("Creating Pandas DataFrame from Data Catalog Excel...")
     arcpy.AddMessage("Creating Pandas DataFrame from Data Catalog Excel...")
-    catalog_df = pd.read_excel(io=catalog_path, sheet_name=SHEET_NAME, header=0)
-    if web_app_categories:
-        if include_exclude == "Include":
-            update_df = catalog_df.loc[(catalog_df["Initial Screening Criteria"].isin(web_app_categories))]
-        elif include_exclude == "Exclude":
-            update_df = catalog_df.loc[(~catalog_df["Initial Screening Criteria"].isin(web_app_categories))]
-    else:
-        update_df = catalog_df
-    
+    catalog_df = loadCatalog(catalog_path=catalog_path, sheet_name=SHEET_NAME)
+    update_df = filterCatalog(catalog_df, web_app_categories, include_exclude)
+
+    ## The diff is taken over the whole catalog so rows outside the category filter aren't reported as removed.
+    snapshot = CatalogSnapshot(tool_name="UpdateMetadataBatch", catalog_path=catalog_path)
+    changes = snapshot.diff(catalog_df)
+    if changed_only:
+        update_df = snapshot.filterChanged(update_df, changes)
+        arcpy.AddMessage(f"Only Changed Rows: Added {len(changes['added'])} | Changed {len(changes['changed'])} | Removed {len(changes['removed'])}")
+
     arcpy.AddMessage(len(update_df))
 
-    for index, row in update_df.iterrows():
-        row_obj = DataCatalogRow(c_row=row, index=index, gdb_path=gdb_path, gis_conn=gis_conn)
-        logger.info(f"Table: {row_obj.table_name}")
+    logger.info("Validating Data Catalog...")
+    checkCatalog(update_df, gdb_path, gis_conn)
+
+    ## Local metadata is saved row by row while the AGOL item updates run concurrently.
+    row_objs = (DataCatalogRow(c_row=row, index=index, gdb_path=gdb_path, gis_conn=gis_conn, validate=False) for index, row in getCatalogRows(update_df))
+    ## The ledger is always kept up to date. It's only used to skip rows when use_ledger is True.
+    with MetadataPushLedger() as ledger:
+        status_df = meta.updateMetadataBatch(row_objs, max_workers=max_workers, diff_first=diff_first, ledger=ledger, run_id=DATETIME_STR, skip_unchanged=use_ledger)
+
+    logger.info(f"Update Status:\n{status_df.to_string(index=False)}")
+    arcpy.AddMessage(f"Local Updated: {(status_df['Local Status'] == meta.UPDATED).sum()} | Service Updated: {(status_df['Service Status'] == meta.UPDATED).sum()} | Rows: {len(status_df)}")
+    arcpy.AddMessage(f"Skipped Writes: Local {(status_df['Local Status'] == meta.UNCHANGED).sum()} | Service {(status_df['Service Status'] == meta.UNCHANGED).sum()} | Unchanged Since Last Push {(status_df['Service Status'] == meta.SKIPPED).sum()}")
+    failed = list(status_df.loc[(status_df["Local Status"] == meta.FAILED) | (status_df["Service Status"] == meta.FAILED), "Table Name"])
+    for table_name in failed:
+        arcpy.AddWarning(f"Metadata Update Failed: {table_name}")
 
-        meta.updateMetadataObjects(row_obj=row_obj)
+    ## Failed rows are left out of the snapshot so an Only Changed Rows run retries them.
+    snapshot.update(update_df, changes["removed"], failed=failed)
+    snapshot.save()
 
     logger.info(f"Finished: {datetime.datetime.now()}")
         
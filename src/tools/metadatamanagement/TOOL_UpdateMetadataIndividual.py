@@ -2,7 +2,6 @@
 ## Libraries
 import sys
 import os
-import pandas as pd
 import logging
 import datetime
 from pathlib import Path
@@ -13,7 +12,7 @@ from arcgis.gis import GIS
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
-from src.classes.datacatalog import DataCatalogRow
+from src.classes.datacatalog import DataCatalogRow, checkCatalog, getCatalogRows, loadCatalog, normaliseCategories
 from src.functions import meta
 from src.constants.paths import LOG_DIR
 from src.constants.values import SHEET_NAME
@@ -52,11 +51,11 @@ def main(gis_conn:GIS, gdb_path:Path, catalog_path:Path, item_list:list)->None:
     
     logger.info("Creating Pandas DataFrame from Data Catalog Excel and Filtering for Input Values...")
 
-    catalog_df = pd.read_excel(io=catalog_path, sheet_name=SHEET_NAME, header=0)
+    catalog_df = loadCatalog(catalog_path=catalog_path, sheet_name=SHEET_NAME)
 
     df_filter_list = ["\\".join(item.split("\\")[-2:]) for item in item_list]
 
-    catalog_df["stripped_category"] = catalog_df["Initial Screening Criteria"].str.replace(' ', '').str.replace('&','')
+    catalog_df["stripped_category"] = normaliseCategories(catalog_df["Initial Screening Criteria"])
     catalog_df["dataset_path"] = catalog_df["stripped_category"]+ "\\"+catalog_df["Table Name"]
 
     filtered_df = catalog_df.loc[(catalog_df['dataset_path']).isin(df_filter_list)]
@@ -65,9 +64,11 @@ def main(gis_conn:GIS, gdb_path:Path, catalog_path:Path, item_list:list)->None:
     arcpy.AddMessage(filtered_df)
     logger.info(f"Filtered DataFrame Length: {len(filtered_df)}")
 
-    for index, row in filtered_df.iterrows():
+    checkCatalog(filtered_df, gdb_path, gis_conn)
 
-        row_obj = DataCatalogRow(c_row=row, index=index, gdb_path=gdb_path, gis_conn=gis_conn)
+    for index, row in getCatalogRows(filtered_df):
+
+        row_obj = DataCatalogRow(c_row=row, index=index, gdb_path=gdb_path, gis_conn=gis_conn, validate=False)
         logger.info(f"Table: {row_obj.table_name}")
 
         meta.updateMetadataObjects(row_obj=row_obj)
@@ -0,0 +1,138 @@
+"""
+Throughput benchmark for the Backup Services archive step.
+
+Builds a synthetic File GDB folder and times:
+    - nested:  the previous approach. utility.zip_fgdb deflates every file on one thread, then the FGDB zip and the report are
+               wrapped in a second zip.
+    - archive: archive.writeArchive. One pass, members compressed in parallel threads, incompressible tables stored.
+
+The synthetic GDB mixes compressible tables (repeating attribute records) with incompressible ones (random bytes, standing in for
+tables written by CompressFileGeodatabaseData), plus small system tables.
+
+Run from the ArcGIS Pro Python environment:
+    python testing/benchmarks/benchmark_archive.py --size-gb 4 --compressed-fraction 0.6
+"""
+import os
+import sys
+import time
+import shutil
+import random
+import zipfile
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.functions import archive
+#################################################################################################################################################################################
+BLOCK_SIZE = 1024 * 1024
+#################################################################################################################################################################################
+
+def _recordBlock(rng:random.Random)->bytes:
+    ## Attribute-table-like data: repeated field layouts with varying values.
+    rows = []
+    while sum(len(r) for r in rows) < BLOCK_SIZE:
+        rows.append(f"{rng.randint(1, 10**6):08d}|Structure {rng.randint(1, 500)}|Harris County|{rng.random():.6f}|{rng.choice(['Active', 'Removed', 'Proposed'])}\n".encode("utf-8"))
+
+    return b"".join(rows)[:BLOCK_SIZE]
+
+
+def buildSyntheticGdb(out_dir:str, size_gb:float, compressed_fraction:float, table_mb:int=64, seed:int=203)->str:
+    """
+    Purpose: Writes a synthetic File GDB folder of roughly size_gb. Returns its path.
+    """
+    rng = random.Random(seed)
+    gdb_path = os.path.join(out_dir, "Synthetic.gdb")
+    os.makedirs(gdb_path, exist_ok=True)
+
+    record_block = _recordBlock(rng)
+    table_count = max(1, int(size_gb * 1024 / table_mb))
+    for table in range(table_count):
+        compressed = table < table_count * compressed_fraction
+        with open(os.path.join(gdb_path, f"a{table + 9:08x}.gdbtable"), "wb") as f:
+            for block in range(table_mb):
+                if compressed:
+                    f.write(os.urandom(BLOCK_SIZE))
+                else:
+                    f.write(record_block[block % 97:] + record_block[:block % 97])
+        with open(os.path.join(gdb_path, f"a{table + 9:08x}.gdbtablx"), "wb") as f:
+            f.write(os.urandom(5 * table_mb * 1024))
+
+    for system_table in range(1, 9):
+        with open(os.path.join(gdb_path, f"a{system_table:08x}.gdbtable"), "wb") as f:
+            f.write(record_block[:64 * 1024])
+
+    return gdb_path
+
+
+def nestedZip(gdb_path:str, report_path:str, out_dir:str)->str:
+    ## The previous utility.zip_fgdb followed by the outer ZipFile in TOOL_BackupServices.
+    inner_zip = os.path.join(out_dir, f"{os.path.basename(gdb_path)}.zip")
+    with zipfile.ZipFile(inner_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(gdb_path):
+            for file in files:
+                if not file.endswith(".lock"):
+                    file_path = os.path.join(root, file)
+                    zipf.write(file_path, os.path.relpath(file_path, gdb_path))
+
+    outer_zip = os.path.join(out_dir, "nested.zip")
+    with zipfile.ZipFile(outer_zip, 'w') as zip:
+        zip.write(inner_zip, os.path.basename(inner_zip))
+        zip.write(report_path, os.path.basename(report_path))
+
+    return outer_zip
+
+
+def singlePassZip(gdb_path:str, report_path:str, out_dir:str, workers:int)->str:
+    out_zip = os.path.join(out_dir, "archive.zip")
+    archive.writeArchive(out_zip, archive.fgdbMembers(gdb_path) + [(report_path, os.path.basename(report_path))], workers=workers)
+
+    return out_zip
+
+
+def runCase(name:str, func, *args)->None:
+    start = time.perf_counter()
+    out_zip = func(*args)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(out_zip)
+
+    with zipfile.ZipFile(out_zip) as z:
+        bad = z.testzip()
+
+    print(f"{name:8s} | Time: {elapsed:8.2f}s | Archive: {size/1024/1024:10.1f} MB | Verified: {bad is None}")
+
+    return
+
+
+def main(size_gb:float, compressed_fraction:float, workers:int, work_dir:str, keep:bool)->None:
+    work_dir = work_dir or tempfile.mkdtemp(prefix="benchmark_archive_")
+    print(f"Building {size_gb} GB synthetic FGDB in {work_dir}...")
+    gdb_path = buildSyntheticGdb(work_dir, size_gb, compressed_fraction)
+    report_path = os.path.join(work_dir, "BackupServices_Report.xlsx")
+    with open(report_path, "wb") as f:
+        f.write(os.urandom(256 * 1024))
+
+    gdb_size = sum(os.path.getsize(os.path.join(gdb_path, f)) for f in os.listdir(gdb_path))
+    print(f"FGDB: {gdb_size/1024/1024:.1f} MB | Compressed Fraction: {compressed_fraction} | Workers: {workers or os.cpu_count()}")
+
+    try:
+        runCase("nested", nestedZip, gdb_path, report_path, work_dir)
+        runCase("archive", singlePassZip, gdb_path, report_path, work_dir, workers)
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backup Services archive benchmark")
+    parser.add_argument("--size-gb", type=float, default=2, help="Approximate size of the synthetic FGDB")
+    parser.add_argument("--compressed-fraction", type=float, default=0.6, help="Fraction of the tables that are incompressible")
+    parser.add_argument("--workers", type=int, default=None, help="Compression threads (default: every core)")
+    parser.add_argument("--work-dir", default=None, help="Directory for the synthetic FGDB and archives (default: a temp directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic FGDB and archives")
+    args = parser.parse_args()
+
+    main(args.size_gb, args.compressed_fraction, args.workers, args.work_dir, args.keep)
@@ -0,0 +1,122 @@
+"""
+Deduplication benchmark for the Backup Store.
+
+Stores two backups of a synthetic File GDB folder: the second run has rows inserted and edited part way through each table, as a
+fresh export of an edited layer would. Reports the bytes written for the second backup with:
+    - fixed:    chunks at fixed offsets (the first Backup Store layout)
+    - content:  content-defined chunks (backupstore.chunkBoundaries)
+
+Run from the ArcGIS Pro Python environment:
+    python testing/benchmarks/benchmark_backupstore.py --tables 16 --table-mb 32
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.classes.backupstore import BackupStore
+#################################################################################################################################################################################
+
+class FixedChunkStore(BackupStore):
+    ## The store with the chunk boundaries at fixed offsets.
+    def putFile(self, file_path:str)->dict:
+        chunks = []
+        size = 0
+        written = 0
+        with open(file_path, "rb") as f:
+            for data in iter(lambda: f.read(self.chunk_size), b""):
+                chunk_hash, chunk_written = self.putChunk(data)
+                chunks.append(chunk_hash)
+                size += len(data)
+                written += chunk_written
+
+        return {"size":size, "chunks":chunks}, written
+
+
+def _records(rng:random.Random, size:int)->bytes:
+    ## Attribute-table-like rows. Random enough that zlib can't hide the difference between the two chunkings.
+    rows = []
+    total = 0
+    while total < size:
+        rows.append(f"{rng.randint(1, 10**9):010d}|Structure {rng.randint(1, 5000)}|{rng.random():.9f}|{rng.getrandbits(64):016x}\n".encode("utf-8"))
+        total += len(rows[-1])
+
+    return b"".join(rows)[:size]
+
+
+def buildRuns(out_dir:str, tables:int, table_mb:int, edits:int, seed:int=203)->tuple:
+    """
+    Purpose: Writes the first and second run of a synthetic GDB folder. Returns both paths.
+    """
+    rng = random.Random(seed)
+    first = os.path.join(out_dir, "Run1", "Synthetic.gdb")
+    second = os.path.join(out_dir, "Run2", "Synthetic.gdb")
+    os.makedirs(first)
+    os.makedirs(second)
+
+    for table in range(tables):
+        data = _records(rng, table_mb * 1024 * 1024)
+        with open(os.path.join(first, f"a{table + 9:08x}.gdbtable"), "wb") as f:
+            f.write(data)
+
+        ## Inserts shift everything after them. Edits change a row in place.
+        changed = bytearray(data)
+        for _ in range(edits):
+            position = rng.randrange(len(changed))
+            if rng.random() < 0.5:
+                changed[position:position] = _records(rng, rng.randint(100, 4000))
+            else:
+                changed[position:position + 64] = os.urandom(64)
+        with open(os.path.join(second, f"a{table + 9:08x}.gdbtable"), "wb") as f:
+            f.write(changed)
+
+    return first, second
+
+
+def runCase(name:str, store_class, store_dir:str, first:str, second:str)->None:
+    store = store_class(store_dir)
+    store.putBackup("Run1", first)
+    before = sum(f.stat().st_size for f in Path(store_dir, "chunks").rglob("*") if f.is_file())
+
+    start = time.perf_counter()
+    store.putBackup("Run2", second)
+    elapsed = time.perf_counter() - start
+    after = sum(f.stat().st_size for f in Path(store_dir, "chunks").rglob("*") if f.is_file())
+
+    gdb_size = sum(f.stat().st_size for f in Path(second).iterdir())
+    print(f"{name:8s} | Run 2: {gdb_size/1024/1024:8.1f} MB | Written: {(after - before)/1024/1024:8.1f} MB | Store: {after/1024/1024:8.1f} MB | Time: {elapsed:6.2f}s")
+
+    return
+
+
+def main(tables:int, table_mb:int, edits:int, work_dir:str, keep:bool)->None:
+    work_dir = work_dir or tempfile.mkdtemp(prefix="benchmark_backupstore_")
+    print(f"Building {tables} x {table_mb} MB synthetic tables with {edits} edits each in {work_dir}...")
+    first, second = buildRuns(work_dir, tables, table_mb, edits)
+
+    try:
+        runCase("fixed", FixedChunkStore, os.path.join(work_dir, "store_fixed"), first, second)
+        runCase("content", BackupStore, os.path.join(work_dir, "store_content"), first, second)
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backup Store deduplication benchmark")
+    parser.add_argument("--tables", type=int, default=8, help="Number of synthetic tables")
+    parser.add_argument("--table-mb", type=int, default=32, help="Size of each table")
+    parser.add_argument("--edits", type=int, default=3, help="Inserts and in-place edits per table in the second run")
+    parser.add_argument("--work-dir", default=None, help="Directory for the synthetic runs and stores (default: a temp directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic runs and stores")
+    args = parser.parse_args()
+
+    main(args.tables, args.table_mb, args.edits, args.work_dir, args.keep)
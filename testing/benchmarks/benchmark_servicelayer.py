@@ -0,0 +1,97 @@
+"""
+Memory/throughput micro-benchmark for ServiceLayer.
+
+Builds ServiceLayer objects from synthetic layer and portal item JSON (no portal requests are made) and reports the time and
+peak traced memory for:
+    - construct:  building the objects only
+    - catalog:    building the objects and reading the attributes used by dataCatalogDictionary
+    - eager:      building the objects and reading every derived attribute (what the old eager __init__ paid for)
+
+Run from the ArcGIS Pro Python environment:
+    python testing/benchmarks/benchmark_servicelayer.py --layers 5000
+"""
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from arcgis._impl.common._mixins import PropertyMap
+
+from src.classes.servicelayer import ServiceLayer, _LAZY_ATTRIBUTES
+#################################################################################################################################################################################
+CATALOG_ATTRIBUTES = ["parentServiceName", "parentId", "layerName", "layerId", "layerDataEditDate", "portalCategory", "layerDescription",
+                      "portalSummary", "portalTags", "layerCredits", "portalTermsOfUse", "layerPortalUrl"]
+#################################################################################################################################################################################
+
+class _SyntheticItem(dict):
+    ## Stands in for an arcgis Item. Supports both item["key"] and item.key access.
+    def __getattr__(self, key):
+        return self[key]
+
+
+def syntheticItem(index:int)->_SyntheticItem:
+    return _SyntheticItem(id=f"{index:032x}", name=f"Service_{index}", url=f"https://services.example.com/Service_{index}/FeatureServer",
+                          title=f"Service {index}", typeKeywords=["Data", "Service", "Hosted Service", "Multilayer"],
+                          categories=["/Categories/Flood Risk"], created=1700000000000, modified=1710000000000,
+                          description="<p>Service description</p>", snippet="Summary", tags=["safer", "hcfcd"],
+                          accessInformation="Credits", licenseInfo="<p>License</p>")
+
+
+def syntheticLayerJson(layer_id:int)->PropertyMap:
+    return PropertyMap({"id":layer_id, "name":f"Layer {layer_id}", "description":"<p>Layer description</p>", "copyrightText":"Credits",
+                        "editingInfo":{"schemaLastEditDate":1700000000000, "dataLastEditDate":1710000000000, "lastEditDate":1710000000000},
+                        "spatialReference":{"wkid":102100, "latestWkid":3857},
+                        "fields":[{"name":f"FIELD_{f}", "alias":f"Field {f}", "type":"esriFieldTypeString"} for f in range(25)]})
+
+
+def buildPayloads(layer_count:int, layers_per_service:int)->list:
+    ## The synthetic JSON is built before timing starts so only the ServiceLayer cost is measured.
+    payloads = []
+    for index in range(0, layer_count, layers_per_service):
+        item = syntheticItem(index)
+        for layer_id in range(min(layers_per_service, layer_count - index)):
+            payloads.append((SimpleNamespace(url=f"{item.url}/{layer_id}"), item, syntheticLayerJson(layer_id)))
+
+    return payloads
+
+
+def runCase(name:str, payloads:list, attributes:list)->None:
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    service_layers = [ServiceLayer(None, layer_obj, item, layer_properties=layer_json) for layer_obj, item, layer_json in payloads]
+    for sl in service_layers:
+        for attribute in attributes:
+            getattr(sl, attribute)
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:10s} | Layers: {len(payloads):7d} | Time: {elapsed:8.3f}s | {len(payloads)/elapsed:10.0f} layers/s | Peak Memory: {peak/1024/1024:8.2f} MB")
+
+    return
+
+
+def main(layer_count:int, layers_per_service:int)->None:
+    payloads = buildPayloads(layer_count, layers_per_service)
+
+    runCase("construct", payloads, [])
+    runCase("catalog", payloads, CATALOG_ATTRIBUTES)
+    ## The project boundary is shared per WKID (and needs arcpy I/O), so it isn't part of the per-layer cost.
+    runCase("eager", payloads, [a for a in _LAZY_ATTRIBUTES if a != "projectBoundary"])
+
+    return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ServiceLayer memory/throughput micro-benchmark")
+    parser.add_argument("--layers", type=int, default=5000, help="Number of ServiceLayer objects to build")
+    parser.add_argument("--layers-per-service", type=int, default=10, help="Number of layers sharing a portal item")
+    args = parser.parse_args()
+
+    main(args.layers, args.layers_per_service)
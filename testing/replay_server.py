@@ -0,0 +1,114 @@
+"""
+Local stand-in for a Feature Service that replays recorded REST responses.
+
+Each request is answered with a JSON file from the recordings directory. The file name is the path after 'FeatureServer'
+with '/' replaced by '_' ('service' for the service itself):
+    .../FeatureServer                  -> service.json
+    .../FeatureServer/extractChanges   -> extractChanges.json
+    .../FeatureServer/0/query          -> 0_query.json
+Numbered recordings ('extractChanges_1.json', 'extractChanges_2.json', ...) are returned in order, one per request, so a
+sequence of backup runs can be replayed. The last numbered recording is repeated once the sequence runs out.
+'{server}' in a recording is replaced with the server's own address (http://localhost:<port>), so a recorded statusUrl or
+resultUrl points back at the replay server.
+
+Point a delta backup at it by using http://localhost:<port>/arcgis/rest/services/<Service>/FeatureServer as the service URL.
+
+Run:
+    python testing/replay_server.py testing/data/replay --port 8765
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+import urllib.parse
+import urllib.request
+from urllib.parse import urlparse, parse_qs
+from http.server import HTTPServer, BaseHTTPRequestHandler
+#################################################################################################################################################################################
+logger = logging.getLogger("root.replay_server")
+#################################################################################################################################################################################
+
+def recordingName(path:str)->str:
+    route = urlparse(path).path.split("FeatureServer", 1)[-1].strip("/")
+
+    return route.replace("/", "_") if route else "service"
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    recordings_dir = None
+    calls = {}
+
+    def _recording(self)->str:
+        name = recordingName(self.path)
+        count = self.calls.get(name, 0) + 1
+        self.calls[name] = count
+
+        numbered = sorted([f for f in os.listdir(self.recordings_dir) if f.startswith(f"{name}_") and f[len(name)+1:-5].isdigit()],
+                          key=lambda f: int(f[len(name)+1:-5]))
+        if numbered:
+            return os.path.join(self.recordings_dir, numbered[min(count, len(numbered)) - 1])
+
+        return os.path.join(self.recordings_dir, f"{name}.json")
+
+    def _reply(self, params:dict)->None:
+        recording = self._recording()
+        logger.info(f"{self.command} {self.path} {json.dumps(params)} -> {os.path.basename(recording)}")
+        if os.path.exists(recording):
+            with open(recording, "rb") as f:
+                body = f.read().replace(b"{server}", f"http://localhost:{self.server.server_address[1]}".encode("utf-8"))
+            status = 200
+        else:
+            body = json.dumps({"error":{"code":404, "message":f"No Recording: {os.path.basename(recording)}"}}).encode("utf-8")
+            status = 404
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply({k:v[0] for k, v in parse_qs(urlparse(self.path).query).items()})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self._reply({k:v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()})
+
+    def log_message(self, format, *args):
+        return
+
+
+class ReplayConnection():
+    ## Stands in for a GIS connection's _con. Only the get and post calls made by the backup tools are needed.
+    def get(self, url:str, params:dict)->dict:
+        with urllib.request.urlopen(f"{url}?{urllib.parse.urlencode(params)}") as response:
+            return json.load(response)
+
+    def post(self, url:str, params:dict)->dict:
+        with urllib.request.urlopen(url, urllib.parse.urlencode(params).encode("utf-8")) as response:
+            return json.load(response)
+
+
+def serve(recordings_dir:str, port:int=8765)->HTTPServer:
+    """
+    Purpose: Returns a server replaying the recordings in recordings_dir. Call serve_forever (or run it in a thread) to start it.
+    """
+    handler = type("Handler", (ReplayHandler,), {"recordings_dir":os.path.abspath(recordings_dir), "calls":{}})
+
+    return HTTPServer(("localhost", port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replays recorded Feature Service responses")
+    parser.add_argument("recordings_dir", help="Directory of recorded JSON responses")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", stream=sys.stdout)
+    server = serve(args.recordings_dir, args.port)
+    logger.info(f"Replaying {args.recordings_dir} on http://localhost:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,75 @@
+"""
+Replay server fixtures shared by the change tracking and delta backup tests. The recordings in testing/data/replay describe a point layer
+with three features at serverGen 120 (see test_changetracking.py).
+"""
+import sys
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from testing.replay_server import serve, ReplayConnection
+#################################################################################################################################################################################
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+REPLAY_DIR = DATA_DIR / "replay"
+LAYER_FIELDS = [{"name":"OBJECTID", "type":"esriFieldTypeOID", "alias":"OBJECTID"},
+                {"name":"GlobalID", "type":"esriFieldTypeGlobalID", "alias":"GlobalID", "length":38},
+                {"name":"NAME", "type":"esriFieldTypeString", "alias":"Name", "length":50}]
+#################################################################################################################################################################################
+
+class _LayerProperties(dict):
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+
+class _Boundary():
+    def envelopeJson(self)->dict:
+        return {"xmin":-10700000, "ymin":3400000, "xmax":-10500000, "ymax":3550000, "spatialReference":{"wkid":3857}}
+
+
+class _ServiceLayer():
+    ## The ServiceLayer attributes read by changetracking and deltabackup.
+    def __init__(self, service_url:str):
+        self.parentServiceUrl = service_url
+        self.layerId = 0
+        self.layerUrl = f"{service_url}/0"
+        self.layerName = "Structures"
+        self.layerSpatialReferenceWkid = 3857
+        self.layerFields = LAYER_FIELDS
+        self.projectBoundary = _Boundary()
+        self.layerProperties = _LayerProperties(objectIdField="OBJECTID", globalIdField="GlobalID", hasGlobalIds=True, geometryType="esriGeometryPoint")
+
+
+@pytest.fixture
+def serveReplay():
+    ## Starts a replay server for a recordings directory and returns a stand-in ServiceLayer on it. A new server starts from the first numbered recording.
+    servers = []
+    def start(recordings_dir=REPLAY_DIR)->_ServiceLayer:
+        server = serve(str(recordings_dir), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return _ServiceLayer(f"http://localhost:{server.server_address[1]}/arcgis/rest/services/Structures/FeatureServer")
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def gis_conn():
+    return type("GIS", (), {"_con":ReplayConnection()})()
+
+
+@pytest.fixture
+def recordedFeatures()->list:
+    ## The three features of the layer at serverGen 120 (0_query.json), with a name and a point geometry.
+    return [{"attributes":{"OBJECTID":f["attributes"]["OBJECTID"], "GlobalID":f["attributes"]["GlobalID"], "NAME":f"Pump Station {f['attributes']['OBJECTID']}"},
+             "geometry":{"x":-10616000.0 + 100 * f["attributes"]["OBJECTID"], "y":3470000.0}}
+            for f in json.loads((REPLAY_DIR / "0_query.json").read_text())["features"]]
@@ -0,0 +1,105 @@
+"""
+Reads the system catalog of the test File GDB (testing/data/gdb/QC_Test.gdb.zip, 10.x format), writes it to an indexed archive and
+restores single layers from it.
+
+Only the attachment test needs arcpy (to enable attachments). Run:
+    python -m pytest testing/tests
+"""
+import os
+import sys
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.classes import backupindex
+from src.functions import archive
+#################################################################################################################################################################################
+GDB_ZIP = Path(__file__).resolve().parents[1] / "data" / "gdb" / "QC_Test.gdb.zip"
+GDB_NAME = "QC_Test.gdb"
+LAYERS = ["bridges", "streams", "futureroads", "hh1", "dumpsites", "parcels"]
+#################################################################################################################################################################################
+
+@pytest.fixture
+def gdb(tmp_path)->str:
+    with zipfile.ZipFile(GDB_ZIP) as z:
+        z.extractall(tmp_path / "source")
+
+    return str(tmp_path / "source" / GDB_NAME)
+
+
+def _layers(gdb_path:str, names:list)->list:
+    return [{"Feature Class Name":name, "Layer Name":name.title(), "Folder Name":"QC", "Feature Class Path":os.path.join(gdb_path, name)} for name in names]
+
+
+def _tableFiles(gdb_path:str, table_id:int)->list:
+    return sorted(f for f in os.listdir(gdb_path) if f.startswith(f"a{table_id:08x}."))
+
+
+def _writeIndexedArchive(gdb_path:str, archive_path:str, layers:list)->dict:
+    catalog = backupindex.readSystemCatalog(gdb_path)
+    written = {}
+    def layerIndex(entries:list)->tuple:
+        written["index"] = backupindex.buildIndex(entries, GDB_NAME, catalog, layers)
+        return backupindex.INDEX_NAME, json.dumps(written["index"]).encode("utf-8")
+
+    archive.writeArchive(archive_path, archive.fgdbMembers(gdb_path), workers=2, index=layerIndex)
+
+    return written["index"]
+
+
+def test_readSystemCatalog(gdb):
+    catalog = backupindex.readSystemCatalog(gdb)
+
+    assert catalog["gdb_systemcatalog"] == 1
+    assert catalog["gdb_items"] == 4
+    assert [catalog[name] for name in LAYERS] == [11, 12, 13, 14, 15, 16]
+
+
+def test_buildIndex_includes_attachments_and_related_tables():
+    catalog = {"gdb_items":4, "bridges":11, "bridges__attach":12, "inspections":13, "streams":14}
+    entries = [{"arcname":f"{GDB_NAME}/a{table_id:08x}.gdbtable", "method":0, "data_offset":table_id, "compressed_size":1, "size":1, "crc":0}
+               for table_id in catalog.values()]
+    layers = _layers(GDB_NAME, ["bridges"])
+    layers[0]["Related Tables"] = ["Inspections", "Maintenance"]
+
+    layer = backupindex.buildIndex(entries, GDB_NAME, catalog, layers)["folders"]["QC"]["Bridges"]
+
+    assert layer["Related Tables"] == ["Inspections", "bridges__ATTACH"]
+    assert layer["Missing Tables"] == ["Maintenance"]
+    assert [f["data_offset"] for f in layer["Files"]] == [11, 13, 12]
+
+
+def test_restoreLayer_round_trip(gdb, tmp_path):
+    archive_path = str(tmp_path / "BackupServices.zip")
+    index = _writeIndexedArchive(gdb, archive_path, _layers(gdb, LAYERS))
+
+    with zipfile.ZipFile(archive_path) as z:
+        assert z.testzip() is None
+    assert backupindex.readIndex(archive_path) == index
+
+    restored = backupindex.restoreLayer(archive_path, str(tmp_path / "restored"), "Streams")
+
+    ## Only the system tables, the non-table files and the streams table come out of the archive. Each is byte for byte the original.
+    system_ids = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    expected = sorted([f for table_id in system_ids + [12] for f in _tableFiles(gdb, table_id)] + [f for f in os.listdir(gdb) if not backupindex._TABLE_FILE.match(f)])
+    assert sorted(os.listdir(restored)) == expected
+    for file in expected:
+        assert Path(restored, file).read_bytes() == Path(gdb, file).read_bytes()
+
+
+def test_restoreLayer_restores_attachments(gdb, tmp_path):
+    arcpy = pytest.importorskip("arcpy")
+    arcpy.management.EnableAttachments(os.path.join(gdb, "bridges"))
+    arcpy.ClearWorkspaceCache_management()
+    archive_path = str(tmp_path / "BackupServices.zip")
+    _writeIndexedArchive(gdb, archive_path, _layers(gdb, LAYERS))
+
+    restored = backupindex.restoreLayer(archive_path, str(tmp_path / "restored"), "Bridges")
+
+    assert arcpy.Exists(os.path.join(restored, "bridges"))
+    assert arcpy.Exists(os.path.join(restored, "bridges__ATTACH"))
+    assert not arcpy.Exists(os.path.join(restored, "streams"))
@@ -0,0 +1,115 @@
+"""
+Runs the REST side of a delta backup against the replay server (testing/replay_server.py). None of it needs arcpy.
+
+testing/data/replay: a point layer with three features at serverGen 120. extractChanges_1 adds feature 4, updates feature 2 and
+deletes feature 3 (serverGen 135). extractChanges_2 has no changes.
+testing/data/replay_async: the same change set returned asynchronously. The job status is Pending, then InProgress, then Completed.
+
+Run:
+    python -m pytest testing/tests
+"""
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.functions import changetracking
+from testing.replay_server import ReplayConnection
+#################################################################################################################################################################################
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+GLOBAL_ID = "{8C1A5A52-5C1B-4F62-9D0A-3B2B1A00000%d}"
+#################################################################################################################################################################################
+
+class _RecordingConnection(ReplayConnection):
+    ## Records each request as (method, path after 'FeatureServer', params).
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url:str, params:dict)->dict:
+        self.requests.append(("GET", url.split("FeatureServer", 1)[-1], params))
+        return super().get(url, params)
+
+    def post(self, url:str, params:dict)->dict:
+        self.requests.append(("POST", url.split("FeatureServer", 1)[-1], params))
+        return super().post(url, params)
+
+
+@pytest.fixture
+def recording_conn():
+    return type("GIS", (), {"_con":_RecordingConnection()})()
+
+
+@pytest.fixture(autouse=True)
+def noWait(monkeypatch):
+    monkeypatch.setattr(changetracking, "EXTRACT_CHANGES_POLL_SECONDS", 0)
+
+
+def test_serviceServerGens(serveReplay, gis_conn):
+    sl_obj = serveReplay()
+
+    assert changetracking.serviceServerGens(gis_conn, sl_obj.parentServiceUrl) == {0:120}
+    assert changetracking.supportsDelta(sl_obj)
+
+
+def test_extractChanges(serveReplay, recording_conn):
+    sl_obj = serveReplay()
+    changes = changetracking.extractChanges(recording_conn, sl_obj, 120)
+
+    assert changes["serverGen"] == 135
+    assert [f["attributes"]["OBJECTID"] for f in changes["adds"]] == [4]
+    assert [f["attributes"]["OBJECTID"] for f in changes["updates"]] == [2]
+    assert changes["deleteIds"] == [3]
+
+    ## One request, asking for the layer's changes since the baseline's serverGen inside the project boundary envelope.
+    [(method, path, params)] = recording_conn._con.requests
+    assert (method, path) == ("POST", "/extractChanges")
+    assert json.loads(params["layerServerGens"]) == [{"id":0, "serverGen":120}]
+    assert json.loads(params["geometry"])["xmin"] == -10700000
+
+    ## The second recording has no changes and leaves the serverGen where it was.
+    assert changetracking.extractChanges(recording_conn, sl_obj, 135) == {"serverGen":135, "adds":[], "updates":[], "deleteIds":[]}
+
+
+def test_extractChanges_polls_asynchronous_result(serveReplay, recording_conn):
+    sl_obj = serveReplay(DATA_DIR / "replay_async")
+    changes = changetracking.extractChanges(recording_conn, sl_obj, 120)
+
+    assert [(method, path) for method, path, params in recording_conn._con.requests] == [("POST", "/extractChanges"),
+                                                                                          ("GET", "/jobs/a1b2"),
+                                                                                          ("GET", "/jobs/a1b2"),
+                                                                                          ("GET", "/jobs/a1b2"),
+                                                                                          ("GET", "/jobs/a1b2/result")]
+    assert changes["serverGen"] == 135
+    assert changes["deleteIds"] == [3]
+
+
+def test_extractChanges_times_out(serveReplay, recording_conn, monkeypatch):
+    monkeypatch.setattr(changetracking, "EXTRACT_CHANGES_TIMEOUT", -1)
+    sl_obj = serveReplay(DATA_DIR / "replay_async")
+
+    with pytest.raises(TimeoutError):
+        changetracking.extractChanges(recording_conn, sl_obj, 120)
+    assert len(recording_conn._con.requests) == 2
+
+
+def test_objectIdPairs(serveReplay, gis_conn):
+    sl_obj = serveReplay()
+
+    assert list(changetracking.objectIdPairs(gis_conn, sl_obj)) == [(i, GLOBAL_ID % i) for i in [1, 2, 3]]
+
+
+def test_planChanges(serveReplay, gis_conn):
+    sl_obj = serveReplay()
+    pairs = dict(changetracking.objectIdPairs(gis_conn, sl_obj))
+    changes = changetracking.extractChanges(gis_conn, sl_obj, 120)
+
+    ## deleteIds are mapped to GlobalIDs through the recorded pairs. REST may return them without braces or in lower case.
+    deleted_global_ids = [pairs[i].strip("{}").lower() for i in changes["deleteIds"]]
+    remove, features = changetracking.planChanges(changes, deleted_global_ids, "GlobalID")
+
+    assert remove == {GLOBAL_ID % i for i in [2, 3, 4]}
+    assert [f["attributes"]["OBJECTID"] for f in features] == [4, 2]
+    assert changetracking.planChanges({"adds":[], "updates":[], "deleteIds":[]}, [], "GlobalID") == (set(), [])
@@ -0,0 +1,76 @@
+"""
+Runs deltaBackup against the replay server (testing/replay_server.py) and the recordings in testing/data/replay. Applying the change
+set to the baseline needs arcpy. The REST side is tested without it in test_changetracking.py.
+
+The recordings describe a point layer with three features at serverGen 120. extractChanges_1 adds feature 4, updates feature 2 and
+deletes feature 3 (serverGen 135). extractChanges_2 has no changes.
+
+Needs the ArcGIS Pro Python environment (arcpy). Run:
+    python -m pytest testing/tests
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+arcpy = pytest.importorskip("arcpy")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.classes import deltabackup
+#################################################################################################################################################################################
+
+@pytest.fixture
+def seeded(serveReplay, gis_conn, recordedFeatures, tmp_path):
+    sl_obj = serveReplay()
+
+    ## The exported layer: the three features recorded in 0_query.json.
+    gdb = str(arcpy.management.CreateFileGDB(str(tmp_path), "Export.gdb"))
+    export_fc = str(arcpy.management.CreateFeatureclass(gdb, "Structures", "POINT", spatial_reference=arcpy.SpatialReference(2278)))
+    arcpy.management.AddField(export_fc, "NAME", "TEXT", field_length=50)
+    arcpy.management.AddGlobalIDs(export_fc)
+    deltabackup._appendFeatures(export_fc, sl_obj, recordedFeatures)
+
+    server_gens = deltabackup.serviceServerGens(gis_conn, sl_obj.parentServiceUrl)
+    ledger = deltabackup.ChangeTrackingLedger(str(tmp_path / "ledger.sqlite"))
+    deltabackup.seedBaseline(gis_conn, sl_obj, export_fc, server_gens[0], ledger, baseline_gdb=str(tmp_path / "Baseline.gdb"))
+    yield gis_conn, sl_obj, ledger, gdb
+    ledger.close()
+
+
+def _rows(featureclass_path:str)->dict:
+    with arcpy.da.SearchCursor(featureclass_path, ["GlobalID", "NAME"]) as cursor:
+        return {deltabackup.normaliseGlobalId(g)[-3:-1]:name for g, name in cursor}
+
+
+def test_deltaBackup_applies_changes(seeded, tmp_path):
+    gis_conn, sl_obj, ledger, gdb = seeded
+    assert ledger.generation(sl_obj.layerUrl)[0] == 120
+
+    backup_fc = str(tmp_path / "Export.gdb" / "Structures_Delta")
+    counts = deltabackup.deltaBackup(gis_conn, sl_obj, backup_fc, ledger)
+
+    assert counts == {"Adds":1, "Updates":1, "Deletes":1, "serverGen":135}
+    assert _rows(backup_fc) == {"01":"Pump Station 1", "02":"Pump Station 2 (Rebuilt)", "04":"Pump Station 4"}
+    assert ledger.generation(sl_obj.layerUrl)[0] == 135
+
+    ## The second recording has no changes. Replaying it leaves the baseline as it was.
+    deltabackup.deltaBackup(gis_conn, sl_obj, str(tmp_path / "Export.gdb" / "Structures_Delta2"), ledger)
+    assert _rows(ledger.generation(sl_obj.layerUrl)[1]) == _rows(backup_fc)
+
+
+def test_failed_append_leaves_baseline_and_ledger(seeded, tmp_path, monkeypatch):
+    gis_conn, sl_obj, ledger, gdb = seeded
+    server_gen, baseline = ledger.generation(sl_obj.layerUrl)
+    before = _rows(baseline)
+
+    def failingAppend(*args, **kwargs):
+        raise arcpy.ExecuteError("Append Failed")
+
+    monkeypatch.setattr(arcpy.management, "Append", failingAppend)
+    with pytest.raises(arcpy.ExecuteError):
+        deltabackup.deltaBackup(gis_conn, sl_obj, str(tmp_path / "Export.gdb" / "Structures_Delta"), ledger)
+
+    assert ledger.generation(sl_obj.layerUrl) == (server_gen, baseline)
+    assert _rows(baseline) == before
+    assert not arcpy.Exists(f"{baseline}_pending")
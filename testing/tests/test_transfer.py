@@ -0,0 +1,111 @@
+"""
+Interrupts transfer.copyFile part way through and checks that the next call resumes from the chunks already written.
+
+Run:
+    python -m pytest testing/tests
+"""
+import os
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.functions import transfer
+#################################################################################################################################################################################
+CHUNK_SIZE = 64 * 1024
+#################################################################################################################################################################################
+
+@pytest.fixture
+def source(tmp_path)->str:
+    path = tmp_path / "source.zip"
+    path.write_bytes(os.urandom(CHUNK_SIZE * 5 + 123))
+
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def noWait(monkeypatch):
+    monkeypatch.setattr(transfer, "COPY_RETRY_SECONDS", 0)
+
+
+def _interruptAt(monkeypatch, fail_index:int)->list:
+    ## Fails the copy the first time chunk fail_index is copied. Returns the list of chunk indexes copied.
+    copied = []
+    interrupted = []
+    copy_chunk = transfer._copyChunk
+
+    def interruptedCopyChunk(src, partial_path, index, chunk_size, retries):
+        if index == fail_index and not interrupted:
+            interrupted.append(index)
+            copied.append(index)
+            raise OSError("Network path was not found")
+        copied.append(index)
+        return copy_chunk(src, partial_path, index, chunk_size, retries)
+
+    monkeypatch.setattr(transfer, "_copyChunk", interruptedCopyChunk)
+
+    return copied
+
+
+def test_interrupted_copy_resumes(source, tmp_path, monkeypatch):
+    dst = str(tmp_path / "share" / "BackupServices.zip")
+    partial_path, sidecar_path = transfer._partialPaths(dst)
+
+    copied = _interruptAt(monkeypatch, 3)
+    with pytest.raises(OSError):
+        transfer.copyFile(source, dst, chunk_size=CHUNK_SIZE, streams=1, retries=1)
+
+    assert not os.path.exists(dst)
+    assert os.path.exists(partial_path)
+    ## The chunks queued behind the failed one still finish, so only chunk 3 is missing from the sidecar.
+    with open(sidecar_path) as f:
+        assert sorted(json.load(f)["chunks"]) == ["0", "1", "2", "4", "5"]
+
+    copied.clear()
+    result = transfer.copyFile(source, dst, chunk_size=CHUNK_SIZE, streams=1, retries=1)
+
+    assert copied == [3]
+    assert result["Resumed Chunks"] == 5
+    assert result["SHA256"] == transfer.fileHash(dst) == transfer.fileHash(source)
+    assert not os.path.exists(partial_path) and not os.path.exists(sidecar_path)
+
+
+def test_changed_source_starts_over(source, tmp_path, monkeypatch):
+    dst = str(tmp_path / "BackupServices.zip")
+
+    _interruptAt(monkeypatch, 2)
+    with pytest.raises(OSError):
+        transfer.copyFile(source, dst, chunk_size=CHUNK_SIZE, streams=1, retries=1)
+
+    Path(source).write_bytes(os.urandom(CHUNK_SIZE * 4))
+    result = transfer.copyFile(source, dst, chunk_size=CHUNK_SIZE, streams=1, retries=1)
+
+    assert result["Resumed Chunks"] == 0
+    assert transfer.fileHash(dst) == transfer.fileHash(source)
+
+
+def test_copyFileOrDiscard_resumes_in_the_same_run(source, tmp_path, monkeypatch):
+    dst = str(tmp_path / "BackupServices.zip")
+
+    copied = _interruptAt(monkeypatch, 4)
+    result = transfer.copyFileOrDiscard(source, dst, attempts=2, chunk_size=CHUNK_SIZE, streams=1, retries=1)
+
+    assert result["Resumed Chunks"] == 5
+    assert sorted(copied) == [0, 1, 2, 3, 4, 4, 5]
+    assert transfer.fileHash(dst) == transfer.fileHash(source)
+
+
+def test_copyFileOrDiscard_removes_partial_after_last_attempt(source, tmp_path, monkeypatch):
+    dst = str(tmp_path / "BackupServices.zip")
+
+    def failingCopyChunk(src, partial_path, index, chunk_size, retries):
+        raise OSError("Network path was not found")
+
+    monkeypatch.setattr(transfer, "_copyChunk", failingCopyChunk)
+    with pytest.raises(OSError):
+        transfer.copyFileOrDiscard(source, dst, attempts=2, chunk_size=CHUNK_SIZE, streams=1, retries=1)
+
+    assert os.listdir(tmp_path) == ["source.zip"]